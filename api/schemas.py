@@ -101,4 +101,11 @@ class RAGCollectionResponse(RAGCollectionBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+
+class ChunkedUploadInit(BaseModel):
+    filename: str
+    size: int
+    checksum: Optional[str] = None  # Dosyanın tamamının sha256'sı (opsiyonel)
+    content_type: Optional[str] = None
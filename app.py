@@ -1,11 +1,16 @@
 # Path: chatbot_framework/app.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import assistants_router, rag_router, documents_router,auth
-from core.database import Base, engine
+from routers import assistants_router, rag_router, documents_router, chat_ws_router, batch_router, auth
+from core.database import Base, engine, async_session
+from core.database.models import Assistant as AssistantModel
+from sqlalchemy import select
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 from config.logger import app_logger
+from core.services.metrics import metrics
+from core.services.ollama_pool import ollama_pool, ollama_models_for
+from core.services.model_catalog import get_model_catalog
 
 app = FastAPI()
 
@@ -28,11 +33,39 @@ async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+# Ollama asistanlarının modellerini önceden yükle ve sıcak tut
+@app.on_event("startup")
+async def warm_ollama_models():
+    try:
+        async with async_session() as session:
+            result = await session.execute(select(AssistantModel))
+            for assistant in result.scalars().all():
+                ollama_pool.register(ollama_models_for(assistant.model_type, assistant.model_name, assistant.config))
+    except Exception as e:
+        app_logger.warning("Ollama asistanları okunamadı: %s", str(e))
+    # Yükleme arka planda sürer; başlangıç beklemez
+    ollama_pool.start()
+
+@app.on_event("shutdown")
+async def stop_ollama_pool():
+    await ollama_pool.stop()
+
+# Model kataloğunu arka planda doldur; /assistants/models bellekten döner
+@app.on_event("startup")
+async def start_model_catalog():
+    get_model_catalog().start()
+
+@app.on_event("shutdown")
+async def stop_model_catalog():
+    get_model_catalog().stop()
+
 # Routerları ekle
 app.include_router(auth.router)
 app.include_router(assistants_router)
 app.include_router(rag_router)
 app.include_router(documents_router)
+app.include_router(chat_ws_router)
+app.include_router(batch_router)
 
 # Root endpoint - index.html'i serve et
 @app.get("/")
@@ -44,6 +77,11 @@ async def root():
 async def api_root():
     return {"message": "Welcome to AI Chat API"}
 
+# Süreç içi metrikler (önbellek hit oranı vb.)
+@app.get("/api/metrics")
+async def api_metrics():
+    return metrics.snapshot()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     app_logger.error(
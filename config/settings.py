@@ -0,0 +1,170 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Settings:
+    """Uygulama ayarları (.env / ortam değişkenlerinden okunur)"""
+
+    # Veritabanı
+    DB_USER = os.getenv("DB_USER", "postgres")
+    DB_PASSWORD = os.getenv("DB_PASSWORD", "your_password")
+    DB_HOST = os.getenv("DB_HOST", "localhost")
+    DB_PORT = os.getenv("DB_PORT", "5432")
+    DB_NAME = os.getenv("DB_NAME", "chatbot_db")
+    DATABASE_URL = os.getenv(
+        "DATABASE_URL",
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
+
+    # OpenAI / Embedding
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "1536"))
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+    # Vector store
+    VECTOR_STORE_TYPE = os.getenv("VECTOR_STORE_TYPE", "pgvector")
+    # Filtreli HNSW aramasında indeks k sonucu bulana kadar taramaya devam etsin (pgvector >= 0.8)
+    VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "relaxed_order")
+    VECTOR_EF_SEARCH = int(os.getenv("VECTOR_EF_SEARCH", "100"))
+    # ANN indeksinin depolama katmanı: none (float32) | halfvec | binary
+    VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+    # Kompakt kodlarla bulunan k * faktör aday tam vektörlerle yeniden sıralanır
+    VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+    # RAGDocument.embeddings blob formatı: float32 | float16 | int8 | binary
+    EMBEDDING_BLOB_TIER = os.getenv("EMBEDDING_BLOB_TIER", "float32")
+
+    # Önbellekten yanıt oynatma (stream davranışı korunur)
+    CACHE_REPLAY_CHUNK_CHARS = int(os.getenv("CACHE_REPLAY_CHUNK_CHARS", "24"))
+    CACHE_REPLAY_DELAY_MS = float(os.getenv("CACHE_REPLAY_DELAY_MS", "0"))
+
+    # Birebir aynı prompt'lar için yanıt önbelleği: none | memory | disk
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "none")
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "cache/responses.sqlite3")
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Eşzamanlı aynı prompt'lar tek upstream üretimi paylaşsın (single-flight)
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    SINGLE_FLIGHT_QUEUE_SIZE = int(os.getenv("SINGLE_FLIGHT_QUEUE_SIZE", "256"))
+
+    # SSE istemcisi koptuğunda upstream üretimin iptali
+    DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+    TRUNCATION_MARKER = os.getenv("TRUNCATION_MARKER", "\n\n[truncated: client disconnected]")
+
+    # SSE frame birleştirme: token'lar bu pencere / boyut dolunca tek frame'de gönderilir (0 = kapalı)
+    SSE_COALESCE_WINDOW_MS = float(os.getenv("SSE_COALESCE_WINDOW_MS", "30"))
+    SSE_COALESCE_MAX_BYTES = int(os.getenv("SSE_COALESCE_MAX_BYTES", "1024"))
+
+    # Yeniden bağlanılabilir SSE: istemci koptuktan sonra üretimin açık tutulacağı süre
+    # ve Last-Event-ID ile tekrar gönderilebilecek son frame sayısı
+    STREAM_RESUME_GRACE_SECONDS = float(os.getenv("STREAM_RESUME_GRACE_SECONDS", "30"))
+    STREAM_RESUME_BUFFER_FRAMES = int(os.getenv("STREAM_RESUME_BUFFER_FRAMES", "512"))
+
+    # WebSocket sohbet: bağlantı başına gönderim kuyruğu (backpressure), eşzamanlı tur
+    # sınırı ve ilk auth mesajı için bekleme süresi
+    WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+    WS_MAX_CONCURRENT_TURNS = int(os.getenv("WS_MAX_CONCURRENT_TURNS", "8"))
+    WS_AUTH_TIMEOUT = float(os.getenv("WS_AUTH_TIMEOUT", "10"))
+
+    # Sağlayıcı hız sınırlayıcı: dakika başına istek/token bütçesi (0 = sınırsız),
+    # AIMD eşzamanlılık üst sınırı ve gecikme hedefi (saniye, ilk token / yanıt süresi)
+    OPENAI_RPM = float(os.getenv("OPENAI_RPM", "3500"))
+    OPENAI_TPM = float(os.getenv("OPENAI_TPM", "90000"))
+    OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+    OPENAI_TARGET_LATENCY = float(os.getenv("OPENAI_TARGET_LATENCY", "10"))
+    OLLAMA_RPM = float(os.getenv("OLLAMA_RPM", "0"))
+    OLLAMA_TPM = float(os.getenv("OLLAMA_TPM", "0"))
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+    OLLAMA_TARGET_LATENCY = float(os.getenv("OLLAMA_TARGET_LATENCY", "15"))
+    # Toplu (ingestion) isteklerin kullanabileceği eşzamanlılık payı
+    RATE_LIMIT_BATCH_SHARE = float(os.getenv("RATE_LIMIT_BATCH_SHARE", "0.75"))
+
+    # Model yönlendirme: ilk token bu süre içinde gelmezse sıradaki backend'e de istek
+    # atılır (hedge); art arda hata veren backend'in devresi bir süre açık kalır
+    MODEL_HEDGE_DELAY_MS = float(os.getenv("MODEL_HEDGE_DELAY_MS", "1500"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+    # Ollama: sunucu adresi, modellerin bellekte tutulma süresi (keep_alive) ve yenileme aralığı
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_KEEPALIVE_REFRESH_SECONDS = float(os.getenv("OLLAMA_KEEPALIVE_REFRESH_SECONDS", "600"))
+    # Ayrık zaman aşımları (saniye): bağlantı, ilk token, toplam yanıt ve model yükleme
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    OLLAMA_FIRST_TOKEN_TIMEOUT = float(os.getenv("OLLAMA_FIRST_TOKEN_TIMEOUT", "60"))
+    OLLAMA_TOTAL_TIMEOUT = float(os.getenv("OLLAMA_TOTAL_TIMEOUT", "600"))
+    OLLAMA_LOAD_TIMEOUT = float(os.getenv("OLLAMA_LOAD_TIMEOUT", "600"))
+
+    # /assistants/models listesi: önbellek süresi ve sağlayıcı başına sorgu zaman aşımı (saniye)
+    MODEL_CATALOG_TTL = float(os.getenv("MODEL_CATALOG_TTL", "300"))
+    MODEL_CATALOG_TIMEOUT = float(os.getenv("MODEL_CATALOG_TIMEOUT", "3"))
+
+    # Toplu (JSONL) çalıştırma işlerinin girdi/çıktı/checkpoint dizini ve varsayılan eşzamanlılık
+    BATCH_JOBS_DIR = os.getenv("BATCH_JOBS_DIR", "batch_jobs")
+    BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "4"))
+
+    # Dosya yükleme: tek istekte kabul edilen en büyük dosya ve diske yazma parça boyutu
+    UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(20 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    # Doküman kaydında saklanan metin önizlemesi; tam metin chunk'lardadır
+    UPLOAD_CONTENT_PREVIEW_CHARS = int(os.getenv("UPLOAD_CONTENT_PREVIEW_CHARS", "2000"))
+
+    # Parçalı (resumable) yükleme: büyük dokümanlar parça parça, sabit bellekle alınır
+    CHUNKED_UPLOAD_DIR = os.getenv("CHUNKED_UPLOAD_DIR", "chunked_uploads")
+    CHUNKED_UPLOAD_PART_SIZE = int(os.getenv("CHUNKED_UPLOAD_PART_SIZE", str(8 * 1024 * 1024)))
+    CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv("CHUNKED_UPLOAD_MAX_SIZE", str(2 * 1024 * 1024 * 1024)))
+    CHUNKED_UPLOAD_TTL_SECONDS = int(os.getenv("CHUNKED_UPLOAD_TTL_SECONDS", str(24 * 3600)))
+
+    # Doküman işleme pipeline'ı (ayrıştırma -> chunk -> embedding -> kayıt)
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+    INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "32"))
+    INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "2"))
+    INGEST_STORE_WORKERS = int(os.getenv("INGEST_STORE_WORKERS", "2"))
+    INGEST_STORE_BATCH = int(os.getenv("INGEST_STORE_BATCH", "64"))
+    INGEST_TEXT_BLOCK_CHARS = int(os.getenv("INGEST_TEXT_BLOCK_CHARS", "16000"))
+
+    # Ayrıştırma önbelleği: (dosya sha256, parser, strategy, sürüm) -> gzip'li JSONL öğeler
+    PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() == "true"
+    PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "cache/parse")
+    PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+    # PDF ayrıştırma yolu: auto (örnek sayfalara göre seç), text (pypdf), layout (unstructured)
+    PDF_PARSE_MODE = os.getenv("PDF_PARSE_MODE", "auto")
+    PDF_LAYOUT_STRATEGY = os.getenv("PDF_LAYOUT_STRATEGY", "hi_res")
+    PDF_STRATEGY_SAMPLE_PAGES = int(os.getenv("PDF_STRATEGY_SAMPLE_PAGES", "5"))
+    PDF_TEXT_MIN_DENSITY = float(os.getenv("PDF_TEXT_MIN_DENSITY", "0.2"))
+    PDF_LAYOUT_MAX_IMAGES = int(os.getenv("PDF_LAYOUT_MAX_IMAGES", "3"))
+    PDF_LAYOUT_SHORT_LINE_RATIO = float(os.getenv("PDF_LAYOUT_SHORT_LINE_RATIO", "0.6"))
+
+    # Metin dosyası kodlama tespiti: UTF-8 değilse örnek üzerinde dedektör, sonra yedek sıra
+    TEXT_DECODE_SAMPLE_BYTES = int(os.getenv("TEXT_DECODE_SAMPLE_BYTES", str(64 * 1024)))
+    TEXT_DECODE_FALLBACKS = os.getenv("TEXT_DECODE_FALLBACKS", "cp1254,iso-8859-9")
+
+    # Yakın kopya chunk eleme (MinHash + LSH); bant sayısı NEAR_DUP_NUM_PERM'i tam bölmeli
+    NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+    NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+    NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+    NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+    NEAR_DUP_SHINGLE = int(os.getenv("NEAR_DUP_SHINGLE", "3"))
+
+    # Dizin senkronizasyonu: manifest (yol, mtime, boyut, sha256) ile sadece yeni/değişen dosyalar işlenir
+    DIRECTORY_SYNC_STATE_DIR = os.getenv("DIRECTORY_SYNC_STATE_DIR", "sync_state")
+    DIRECTORY_SYNC_SCAN_WORKERS = int(os.getenv("DIRECTORY_SYNC_SCAN_WORKERS", "8"))
+    DIRECTORY_SYNC_HASH_WORKERS = int(os.getenv("DIRECTORY_SYNC_HASH_WORKERS", "4"))
+    DIRECTORY_SYNC_INGEST_WORKERS = int(os.getenv("DIRECTORY_SYNC_INGEST_WORKERS", "2"))
+    DIRECTORY_SYNC_CHECKPOINT_EVERY = int(os.getenv("DIRECTORY_SYNC_CHECKPOINT_EVERY", "20"))
+    DIRECTORY_SYNC_IGNORED_DIRS = os.getenv("DIRECTORY_SYNC_IGNORED_DIRS", ".git,__pycache__,venv,.venv,node_modules")
+
+    # Anlamsal yanıt önbelleği (asistan config'indeki "semantic_cache" ile ezilebilir)
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL", EMBEDDING_MODEL)
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+
+settings = Settings()
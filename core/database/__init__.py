@@ -7,7 +7,10 @@ from .models import (
     Message,
     RAGDocument,
     RAGCollection,
-    RAGDocumentCollection
+    RAGDocumentCollection,
+    RAGChunkSignature,
+    RAGChunkBand,
+    RAGFileTombstone
 )
 
 __all__ = [
@@ -22,6 +25,9 @@ __all__ = [
     'User',
     'RAGDocument',
     'RAGCollection',
-    'RAGDocumentCollection'
+    'RAGDocumentCollection',
+    'RAGChunkSignature',
+    'RAGChunkBand',
+    'RAGFileTombstone'
 ]
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, LargeBinary
+from sqlalchemy import Column, Integer, Float, String, Text, ForeignKey, DateTime, JSON, LargeBinary
 from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from .db_connection import Base
@@ -121,4 +121,45 @@ class RAGDocumentCollection(Base):
     __tablename__ = "rag_document_collections"
 
     document_id = Column(String, ForeignKey("rag_documents.id"), primary_key=True)
-    collection_id = Column(String, ForeignKey("rag_collections.id"), primary_key=True) 
\ No newline at end of file
+    collection_id = Column(String, ForeignKey("rag_collections.id"), primary_key=True)
+
+class RAGChunkSignature(Base):
+    """
+    Chunk'ın MinHash imzası. Kanonik chunk'larda document_id dolu; yakın
+    kopyalarda canonical_id eşleşen chunk'ı gösterir ve RAGDocument
+    satırı (dolayısıyla embedding / indeks kaydı) oluşturulmaz.
+    """
+    __tablename__ = "rag_chunk_signatures"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id = Column(String, ForeignKey("rag_documents.id"), index=True)
+    # FK yok: kanonik chunk eşzamanlı başka bir batch'te, henüz commit edilmemiş olabilir
+    canonical_id = Column(String, index=True)
+    similarity = Column(Float)
+    user_id = Column(String, ForeignKey("users.id"), index=True)
+    file_checksum = Column(String(64), index=True)
+    chunk_index = Column(Integer)
+    signature_version = Column(String(32))
+    minhash = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RAGChunkBand(Base):
+    """MinHash LSH bantları: aynı bant anahtarını paylaşan chunk'lar yakın kopya adayıdır"""
+    __tablename__ = "rag_chunk_lsh_bands"
+
+    band_key = Column(String(40), primary_key=True)
+    document_id = Column(String, ForeignKey("rag_documents.id"), primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), index=True)
+
+class RAGFileTombstone(Base):
+    """
+    Kaynağı silinmiş dosyanın işareti. Chunk satırları silinmez; bu
+    (kullanıcı, checksum) için kayıt varken chunk'lar listelenmez ve yakın
+    kopya adayı olmaz. Aynı içerik tekrar işlenirse işaret kaldırılır.
+    """
+    __tablename__ = "rag_file_tombstones"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    file_checksum = Column(String(64), primary_key=True)
+    file_path = Column(String(500))
+    deleted_at = Column(DateTime, default=datetime.utcnow)
@@ -2,24 +2,142 @@
 
 from typing import AsyncIterator, Optional, Dict, Any
 import json
+from config.settings import settings
+from core.services.semantic_cache import SemanticCache, assistant_fingerprint, create_semantic_cache
+from core.services.response_cache import ResponseCache, response_cache_key, get_response_cache
+from core.services.model_router import build_model
+from core.services.single_flight import stream_coalescer
+from core.services.streaming import replay_text
+
+# Yanıtı etkileyen ve önbellek anahtarına giren üretim parametreleri
+GENERATION_PARAMS = ("temperature", "top_p", "max_tokens", "seed", "stop")
+
 
 class Assistant:
-    def __init__(self, name: str, model, system_message: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
+    def __init__(
+        self,
+        name: str,
+        model,
+        system_message: Optional[str] = None,
+        config: Optional[Dict[str, Any]] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        response_cache: Optional[ResponseCache] = None
+    ):
         self.name = name
         self.model = model
         self.system_message = system_message
         self.config = config or {}
         self.rag_systems = []
+        self.semantic_cache = semantic_cache
+        self.response_cache = response_cache
+
+    def fingerprint(self) -> str:
+        """Sistem mesajı, model ve ekli RAG sistemlerinin adlarından türetilen önbellek parmak izi"""
+        rag_sources = [getattr(rag, "name", repr(rag)) for rag in self.rag_systems]
+        return assistant_fingerprint(self.system_message, getattr(self.model, "model", None), rag_sources)
+
+    def cache_key(self, message: str) -> str:
+        """(asistan, sistem mesajı, model, mesaj, parametreler) için birebir eşleşme anahtarı"""
+        return response_cache_key(
+            self.name,
+            self.system_message,
+            type(self.model).__name__,
+            getattr(self.model, "model", None),
+            message,
+            {key: self.config[key] for key in GENERATION_PARAMS if key in self.config}
+        )
+
+    async def _replay(self, text: str, stream: bool) -> AsyncIterator[str]:
+        if not stream:
+            yield text
+            return
+        async for chunk in replay_text(
+            text,
+            chunk_chars=settings.CACHE_REPLAY_CHUNK_CHARS,
+            delay=settings.CACHE_REPLAY_DELAY_MS / 1000
+        ):
+            yield chunk
+
+    def _model_stream(self, message: str, key: Optional[str] = None, coalesce: bool = True) -> AsyncIterator[str]:
+        """Model stream'i; aynı prompt için eşzamanlı istekler tek upstream üretimi paylaşır"""
+        if not (coalesce and settings.SINGLE_FLIGHT_ENABLED):
+            return self.model.chat_stream(message, self.system_message)
+        return stream_coalescer.stream(
+            key or self.cache_key(message),
+            lambda: self.model.chat_stream(message, self.system_message)
+        )
 
-    async def process_message(self, message: str, stream: bool = False) -> AsyncIterator[str]:
+    async def process_message(self, message: str, stream: bool = False, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        use_cache=False: önbellekler (okuma ve yazma) ve single-flight atlanır,
+        yanıt her zaman modelden üretilir (toplu değerlendirme / ölçüm için).
+        """
         try:
+            # Birebir aynı prompt daha önce yanıtlandıysa modeli hiç çağırma
+            exact_key = None
+            if use_cache and self.response_cache is not None:
+                exact_key = self.cache_key(message)
+                cached = await self.response_cache.get(exact_key)
+                if cached is not None:
+                    async for chunk in self._replay(cached, stream):
+                        yield chunk
+                    return
+
+            # Anlamsal önbellek: benzer bir soru daha önce yanıtlandıysa aynı yanıtı oynat
+            cache_vector = None
+            fingerprint = None
+            if use_cache and self.semantic_cache is not None:
+                fingerprint = self.fingerprint()
+                cached, cache_vector = await self.semantic_cache.lookup(message, fingerprint)
+                if cached is not None:
+                    async for chunk in self._replay(cached, stream):
+                        yield chunk
+                    return
+
+            chunks = []
             if stream:
-                async for chunk in self.model.chat_stream(message, self.system_message):
+                async for chunk in self._model_stream(message, exact_key, coalesce=use_cache):
+                    chunks.append(chunk)
                     yield chunk
             else:
                 response = await self.model.chat(message, self.system_message)
+                chunks.append(response)
                 yield response
+
+            # Sadece eksiksiz ve hatasız yanıtlar önbelleğe alınır
+            full_response = "".join(chunks)
+            if use_cache and full_response and not any(chunk.startswith("Error:") for chunk in chunks):
+                if self.response_cache is not None:
+                    await self.response_cache.set(exact_key, full_response)
+                if self.semantic_cache is not None:
+                    self.semantic_cache.store(message, full_response, cache_vector, fingerprint)
                 
         except Exception as e:
             print(f"Error in process_message: {str(e)}")
-            yield f"Error: {str(e)}"
\ No newline at end of file
+            yield f"Error: {str(e)}"
+
+
+def build_assistant(
+    name: str,
+    model_type: str,
+    model_name: Optional[str],
+    system_message: Optional[str] = None,
+    config: Optional[Dict[str, Any]] = None
+) -> Assistant:
+    """
+    DB kaydındaki alanlardan çalışma zamanı asistanını oluşturur.
+
+    Geçersiz model tipinde ValueError fırlatır.
+    """
+    config = config if isinstance(config, dict) else {}
+    # config["backends"] varsa hedge/failover yapan ModelRouter döner
+    model = build_model(model_type, model_name, config)
+    return Assistant(
+        name=name,
+        model=model,
+        system_message=system_message,
+        config=config,
+        semantic_cache=create_semantic_cache(name, config),
+        # Asistan bazında {"response_cache": false} ile kapatılabilir
+        response_cache=get_response_cache() if config.get("response_cache", True) else None
+    )
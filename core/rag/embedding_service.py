@@ -1,9 +1,112 @@
-from typing import List, Optional
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Union
 import numpy as np
 from openai import AsyncOpenAI
 import tiktoken
 from tenacity import retry, stop_after_attempt, wait_exponential
 from config.settings import settings
+from core.services.rate_limiter import get_limiter, estimate_tokens
+
+# Parça sonu için tercih sırası: paragraf, cümle, satır sonu
+_BOUNDARIES = ("\n\n", ". ", "! ", "? ", ".\n", "\n")
+
+
+def _snap_end(text: str, start: int, end: int) -> int:
+    """end'i [start, end] aralığının ikinci yarısındaki son paragraf/cümle sonuna çeker; yoksa aynen döner"""
+    floor = start + (end - start) // 2
+    for boundary in _BOUNDARIES:
+        position = text.rfind(boundary, floor, end)
+        if position != -1:
+            return position + len(boundary)
+    return end
+
+
+def _snap_start(text: str, start: int, limit: int) -> int:
+    """Örtüşme bölgesindeki ([start, limit)) ilk cümle başına ilerler; yoksa aynen döner"""
+    positions = [
+        position + len(boundary)
+        for boundary in _BOUNDARIES
+        if (position := text.find(boundary, start, limit)) != -1
+    ]
+    earliest = min(positions, default=limit)
+    return earliest if earliest < limit else start
+
+
+def iter_token_chunks(
+    tokenizer,
+    pieces: Iterable[str],
+    chunk_size: int,
+    overlap: int,
+    segment_chars: int = 256 * 1024
+) -> Iterator[str]:
+    """
+    Token sayısına göre örtüşmeli parçalar üretir.
+
+    Metin segment_chars büyüklüğünde (boşlukta kesilen) segmentler halinde
+    encode edilir; token'lar bir kez decode edilip her token'ın karakter
+    offset'i çıkarılır ve parçalar orijinal metinden dilimlenir. Örtüşen
+    token'lar tekrar decode edilmez, tüm metnin token listesi bellekte
+    tutulmaz. Parça sonu, parçanın ikinci yarısındaki son paragraf veya
+    cümle sonuna çekilir.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    pending = ""
+    pieces = iter(pieces)
+    exhausted = False
+    target = segment_chars
+    while not exhausted or pending:
+        # Segment dolana ya da kaynak bitene kadar oku
+        while not exhausted and len(pending) < target:
+            piece = next(pieces, None)
+            if piece is None:
+                exhausted = True
+            else:
+                pending += piece
+
+        if exhausted:
+            segment, pending = pending, ""
+        else:
+            # Token sınırı kaymasın diye segment boşlukta kesilir
+            cut = max(pending.rfind("\n", 0, target), pending.rfind(" ", 0, target))
+            cut = cut + 1 if cut > 0 else target
+            segment, pending = pending[:cut], pending[cut:]
+
+        tokens = tokenizer.encode(segment, disallowed_special=())
+        if not tokens:
+            continue
+        _, offsets = tokenizer.decode_with_offsets(tokens)
+        offsets.append(len(segment))
+        del tokens
+
+        start = 0
+        total = len(offsets) - 1
+        previous_end = 0
+        while start < total:
+            end = min(start + chunk_size, total)
+            char_start = offsets[start]
+            if start > 0:
+                # Örtüşme cümle ortasından başlamasın
+                char_start = _snap_start(segment, char_start, previous_end)
+            if end == total and not exhausted:
+                # Segmentin yarım kalan son parçası sonraki segmentle birlikte işlenir;
+                # segmentte tam bir parça bile yoksa segment büyütülür
+                pending = segment[char_start:] + pending
+                target = target * 2 if start == 0 else segment_chars
+                break
+            char_end = offsets[end]
+            if end < total:
+                char_end = _snap_end(segment, char_start, char_end)
+                # Kesilen noktayı içeren token'dan devam edilir
+                end = max(start + 1, bisect_right(offsets, char_end) - 1)
+            chunk = segment[char_start:char_end].strip()
+            if chunk:
+                yield chunk
+            if end >= total:
+                break
+            previous_end = char_end
+            start = max(start + 1, end - overlap)
 
 class EmbeddingService:
     def __init__(self, api_key: Optional[str] = None, model: str = None):
@@ -17,6 +120,7 @@ class EmbeddingService:
         self.client = AsyncOpenAI(api_key=api_key or settings.OPENAI_API_KEY)
         self.model = model or settings.EMBEDDING_MODEL
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.limiter = get_limiter("openai")
         
     def chunk_text(self, text: str, chunk_size: int = None, overlap: int = None) -> List[str]:
         """
@@ -27,23 +131,25 @@ class EmbeddingService:
             chunk_size: Parça boyutu (None ise settings'den alınır)
             overlap: Parçalar arası örtüşme miktarı (None ise settings'den alınır)
         """
-        chunk_size = chunk_size or settings.CHUNK_SIZE
-        overlap = overlap or settings.CHUNK_OVERLAP
-        
-        tokens = self.tokenizer.encode(text)
-        chunks = []
-        
-        i = 0
-        while i < len(tokens):
-            # Parça boyutu kadar token al
-            chunk_tokens = tokens[i:i + chunk_size]
-            # Token'ları metne çevir
-            chunk_text = self.tokenizer.decode(chunk_tokens)
-            chunks.append(chunk_text)
-            # Örtüşme miktarı kadar geri git
-            i += chunk_size - overlap
-            
-        return chunks
+        return list(self.iter_chunks(text, chunk_size, overlap))
+
+    def iter_chunks(
+        self,
+        source: Union[str, Iterable[str]],
+        chunk_size: int = None,
+        overlap: int = None
+    ) -> Iterator[str]:
+        """
+        chunk_text'in generator hali; parça parça gelen metni (ör. dosya satırları) de kabul eder.
+
+        Bkz. iter_token_chunks
+        """
+        yield from iter_token_chunks(
+            self.tokenizer,
+            [source] if isinstance(source, str) else source,
+            chunk_size or settings.CHUNK_SIZE,
+            overlap or settings.CHUNK_OVERLAP
+        )
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
@@ -57,10 +163,12 @@ class EmbeddingService:
             List[List[float]]: Embedding vektörleri listesi
         """
         try:
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=texts
-            )
+            # Öncelik çağıranın bağlamından gelir (ingestion: "batch", sorgu: "interactive")
+            async with self.limiter.slot(tokens=estimate_tokens(*texts)):
+                response = await self.client.embeddings.create(
+                    model=self.model,
+                    input=texts
+                )
             return [data.embedding for data in response.data]
         except Exception as e:
             print(f"Error in get_embeddings: {str(e)}")
@@ -0,0 +1,195 @@
+from typing import List, Optional, Callable, Awaitable
+import asyncio
+import hashlib
+import re
+from datetime import datetime
+from sqlalchemy import text
+from config.settings import settings
+
+# Space durumları:
+#   active      -> sorgular bu space'e yönlendirilir, yazmalar buraya yapılır
+#   backfilling -> yeni modele geçiş sürüyor; yazmalar dual-write ile buraya da yapılır
+#   retired     -> eski space, sadece silinmeyi bekler
+SPACE_STATUSES = ("active", "backfilling", "retired")
+
+# Varsayılan (OpenAI) space eski document_embeddings tablosunu kullanmaya devam eder
+DEFAULT_TABLE_NAME = "document_embeddings"
+
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def space_table_name(model_name: str, dimension: int) -> str:
+    """(model, boyut) çifti için tablo adı üretir; index adları 63 karakteri geçmesin diye kısa tutulur"""
+    if model_name == settings.EMBEDDING_MODEL and dimension == settings.EMBEDDING_DIMENSION:
+        return DEFAULT_TABLE_NAME
+    slug = re.sub(r"[^a-z0-9]+", "_", model_name.lower()).strip("_")[:16]
+    digest = hashlib.sha1(f"{model_name}:{dimension}".encode()).hexdigest()[:6]
+    return f"emb_{slug}_{dimension}_{digest}"
+
+
+class EmbeddingSpace:
+    """Bir embedding modelinin ürettiği vektörlerin yaşadığı tablo"""
+
+    def __init__(
+        self,
+        model_name: str,
+        dimension: int,
+        table_name: Optional[str] = None,
+        status: str = "active",
+        backfill_cursor: int = 0
+    ):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.table_name = table_name or space_table_name(model_name, dimension)
+        self.status = status
+        # Backfill'in kopyaladığı son kaynak satır id'si
+        self.backfill_cursor = backfill_cursor
+
+    def __repr__(self) -> str:
+        return f"EmbeddingSpace({self.model_name!r}, {self.dimension}, {self.status})"
+
+
+def default_space() -> EmbeddingSpace:
+    return EmbeddingSpace(settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION)
+
+
+class EmbeddingSpaceRegistry:
+    """Hangi modelin hangi tabloya, hangi boyutta vektör yazdığını tutan kayıt"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def init_db(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS embedding_spaces (
+                    model_name VARCHAR NOT NULL,
+                    dimension INTEGER NOT NULL,
+                    table_name VARCHAR NOT NULL UNIQUE,
+                    status VARCHAR NOT NULL DEFAULT 'active',
+                    backfill_cursor INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP NOT NULL DEFAULT now(),
+                    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+                    PRIMARY KEY (model_name, dimension)
+                )
+            '''))
+            # Aynı anda tek bir aktif space olabilir
+            await conn.execute(text('''
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_embedding_spaces_active
+                ON embedding_spaces (status) WHERE status = 'active'
+            '''))
+
+    @staticmethod
+    def _from_row(row) -> EmbeddingSpace:
+        return EmbeddingSpace(
+            model_name=row["model_name"],
+            dimension=row["dimension"],
+            table_name=row["table_name"],
+            status=row["status"],
+            backfill_cursor=row["backfill_cursor"]
+        )
+
+    async def list_spaces(self) -> List[EmbeddingSpace]:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text("SELECT * FROM embedding_spaces ORDER BY created_at"))
+            return [self._from_row(row) for row in result.mappings().all()]
+
+    async def get(self, model_name: str, dimension: Optional[int] = None) -> Optional[EmbeddingSpace]:
+        query = "SELECT * FROM embedding_spaces WHERE model_name = :model_name"
+        params = {"model_name": model_name}
+        if dimension is not None:
+            query += " AND dimension = :dimension"
+            params["dimension"] = dimension
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text(query + " ORDER BY created_at DESC LIMIT 1"), params)
+            row = result.mappings().first()
+            return self._from_row(row) if row else None
+
+    async def get_active(self) -> EmbeddingSpace:
+        """Aktif space; kayıt yoksa varsayılan space kaydedilip döndürülür"""
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text("SELECT * FROM embedding_spaces WHERE status = 'active'"))
+            row = result.mappings().first()
+        if row:
+            return self._from_row(row)
+        space = default_space()
+        await self.register(space)
+        return space
+
+    async def get_writable(self) -> List[EmbeddingSpace]:
+        """Yeni vektörlerin yazılacağı space'ler (aktif + backfill sürenler)"""
+        active = await self.get_active()
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text("SELECT * FROM embedding_spaces WHERE status = 'backfilling'"))
+            return [active] + [self._from_row(row) for row in result.mappings().all()]
+
+    async def register(self, space: EmbeddingSpace):
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text('''
+                    INSERT INTO embedding_spaces
+                        (model_name, dimension, table_name, status)
+                    VALUES (:model_name, :dimension, :table_name, :status)
+                    ON CONFLICT (model_name, dimension) DO NOTHING
+                '''),
+                {
+                    "model_name": space.model_name,
+                    "dimension": space.dimension,
+                    "table_name": space.table_name,
+                    "status": space.status
+                }
+            )
+
+    async def save_cursor(self, space: EmbeddingSpace, cursor: int):
+        space.backfill_cursor = cursor
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text('''
+                    UPDATE embedding_spaces SET backfill_cursor = :cursor, updated_at = :now
+                    WHERE model_name = :model_name AND dimension = :dimension
+                '''),
+                {"cursor": cursor, "now": datetime.utcnow(), "model_name": space.model_name, "dimension": space.dimension}
+            )
+
+    async def promote(self, space: EmbeddingSpace):
+        """Backfill'i biten space'i aktif yapar, eskisini emekliye ayırır (tek transaction)"""
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text("UPDATE embedding_spaces SET status = 'retired', updated_at = :now WHERE status = 'active'"),
+                {"now": datetime.utcnow()}
+            )
+            await conn.execute(
+                text('''
+                    UPDATE embedding_spaces SET status = 'active', updated_at = :now
+                    WHERE model_name = :model_name AND dimension = :dimension
+                '''),
+                {"now": datetime.utcnow(), "model_name": space.model_name, "dimension": space.dimension}
+            )
+        space.status = "active"
+
+
+def get_embedder(model_name: str) -> Embedder:
+    """
+    Model adına göre toplu embedding fonksiyonu döndürür.
+
+    - "ollama:<model>"            -> OllamaService.get_embeddings
+    - "sentence-transformers/..." -> yerel SentenceTransformer (thread'de)
+    - diğerleri                   -> OpenAI EmbeddingService
+    """
+    if model_name.startswith("ollama:"):
+        from core.services.ollama_service import OllamaService
+        service = OllamaService(model=model_name.split(":", 1)[1])
+        return service.get_embeddings
+
+    if model_name.startswith("sentence-transformers/"):
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+
+        async def embed(texts: List[str]) -> List[List[float]]:
+            vectors = await asyncio.to_thread(model.encode, texts)
+            return vectors.tolist()
+
+        return embed
+
+    from .embedding_service import EmbeddingService
+    return EmbeddingService(model=model_name).get_embeddings
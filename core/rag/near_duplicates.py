@@ -0,0 +1,91 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import re
+import zlib
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class MinHasher:
+    """
+    Kelime shingle'ları üzerinde MinHash imzası.
+
+    Shingle'lar crc32 ile (süreçten bağımsız, kalıcı) hash'lenir; num_perm
+    adet (a * x + b) mod p permütasyonu tek NumPy işlemiyle uygulanır. İki
+    imzanın eşit bileşen oranı Jaccard benzerliğinin tahminidir.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # a < 2^31 ve x < 2^32 olduğundan a * x + b uint64'e sığar
+        self.a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.version = f"minhash-{num_perm}-{shingle_size}-{seed}"
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return [self.signature(text) for text in texts]
+
+
+def jaccard(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    return float(np.mean(signature1 == signature2))
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return np.asarray(signature, dtype="<u4").tobytes()
+
+
+def signature_from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def band_keys(signature: np.ndarray, bands: int) -> List[str]:
+    """LSH bant anahtarları; J benzerliğindeki iki chunk'ın aday olma olasılığı 1 - (1 - J^r)^bands"""
+    rows = len(signature) // bands
+    return [
+        f"{band:02d}:{hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(bands)
+    ]
+
+
+class LSHIndex:
+    """Bellekte MinHash LSH indeksi (aynı ingestion içindeki kopyalar için)"""
+
+    def __init__(self, bands: int = 16):
+        self.bands = bands
+        self._buckets: Dict[str, List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def add(self, key: str, signature: np.ndarray, keys: Optional[List[str]] = None):
+        self._signatures[key] = signature
+        for band_key in keys or band_keys(signature, self.bands):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def query(self, signature: np.ndarray, threshold: float, keys: Optional[List[str]] = None) -> Optional[Tuple[str, float]]:
+        """Eşiği geçen en benzer kayıt (anahtar, benzerlik); yoksa None"""
+        best = None
+        seen = set()
+        for band_key in keys or band_keys(signature, self.bands):
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = jaccard(signature, self._signatures[candidate])
+                if similarity >= threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+        return best
@@ -0,0 +1,189 @@
+from typing import List, Optional, Tuple, Union
+import struct
+import numpy as np
+
+# Desteklenen depolama katmanları
+QUANTIZATION_TIERS = ("float32", "float16", "int8", "binary")
+
+# RAGDocument.embeddings blob başlığı: magic, tier kodu, boyut
+_BLOB_MAGIC = b"QE"
+_BLOB_HEADER = struct.Struct("<2sBI")
+_TIER_CODES = {tier: i for i, tier in enumerate(QUANTIZATION_TIERS)}
+_CODE_TIERS = {i: tier for tier, i in _TIER_CODES.items()}
+
+# 0-255 arası her bayt için set bit sayısı (Hamming mesafesi için)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def to_float16(vectors: np.ndarray) -> np.ndarray:
+    """float32 vektörleri yarı hassasiyete (halfvec) çevirir"""
+    return np.asarray(vectors, dtype=np.float32).astype(np.float16)
+
+
+def binary_quantize(vectors: np.ndarray) -> np.ndarray:
+    """Her boyutu işaretine göre 1 bit'e indirir ve baytlara paketler"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_distances(query_code: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Paketlenmiş bir sorgu kodu ile kod matrisi arasındaki Hamming mesafeleri"""
+    xor = np.bitwise_xor(codes, np.asarray(query_code, dtype=np.uint8).reshape(1, -1))
+    return _POPCOUNT_TABLE[xor].sum(axis=1, dtype=np.int32)
+
+
+class ScalarQuantizer:
+    """Boyut başına min/max aralığıyla float32 -> int8 skaler kuantizasyon"""
+
+    def __init__(self, minimums: Optional[np.ndarray] = None, maximums: Optional[np.ndarray] = None):
+        self.minimums = minimums
+        self.maximums = maximums
+
+    def fit(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        self.minimums = vectors.min(axis=0)
+        self.maximums = vectors.max(axis=0)
+        return self
+
+    @property
+    def _scale(self) -> np.ndarray:
+        return np.maximum(self.maximums - self.minimums, 1e-12) / 255.0
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.minimums is None:
+            raise ValueError("ScalarQuantizer önce fit edilmeli")
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        codes = np.round((vectors - self.minimums) / self._scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        codes = np.atleast_2d(np.asarray(codes, dtype=np.int8)).astype(np.float32)
+        return (codes + 128) * self._scale + self.minimums
+
+
+def encode_embedding_blob(embedding: Union[List[float], np.ndarray], tier: str = "float32") -> bytes:
+    """
+    Tek bir embedding'i RAGDocument.embeddings (LargeBinary) için kodlar.
+
+    int8 katmanında vektör kendi min/max aralığıyla ölçeklenir; aralık
+    bilgisi blob'a eklenir ki decode edilebilsin.
+    """
+    if tier not in _TIER_CODES:
+        raise ValueError(f"Desteklenmeyen kuantizasyon katmanı: {tier}")
+
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    header = _BLOB_HEADER.pack(_BLOB_MAGIC, _TIER_CODES[tier], vector.shape[0])
+
+    if tier == "float32":
+        payload = vector.tobytes()
+    elif tier == "float16":
+        payload = to_float16(vector).tobytes()
+    elif tier == "int8":
+        low, high = float(vector.min()), float(vector.max())
+        quantizer = ScalarQuantizer(np.float32(low), np.float32(high))
+        payload = struct.pack("<ff", low, high) + quantizer.encode(vector).tobytes()
+    else:
+        payload = binary_quantize(vector).tobytes()
+
+    return header + payload
+
+
+def decode_embedding_blob(blob: bytes) -> Tuple[str, np.ndarray]:
+    """
+    encode_embedding_blob çıktısını çözer; başlıksız eski blob'lar float32 kabul edilir.
+
+    Returns:
+        (katman, vektör) - binary katmanında vektör ±1 değerlerinden oluşur
+    """
+    if len(blob) < _BLOB_HEADER.size or blob[:2] != _BLOB_MAGIC:
+        return "float32", np.frombuffer(blob, dtype=np.float32)
+
+    _, tier_code, dims = _BLOB_HEADER.unpack_from(blob)
+    tier = _CODE_TIERS[tier_code]
+    payload = blob[_BLOB_HEADER.size:]
+
+    if tier == "float32":
+        return tier, np.frombuffer(payload, dtype=np.float32)
+    if tier == "float16":
+        return tier, np.frombuffer(payload, dtype=np.float16).astype(np.float32)
+    if tier == "int8":
+        low, high = struct.unpack_from("<ff", payload)
+        quantizer = ScalarQuantizer(np.float32(low), np.float32(high))
+        return tier, quantizer.decode(np.frombuffer(payload[8:], dtype=np.int8))[0]
+
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))[:dims]
+    return tier, bits.astype(np.float32) * 2 - 1
+
+
+class QuantizedIndex:
+    """
+    Bellek içi iki aşamalı arama indeksi.
+
+    İlk geçiş RAM'deki kompakt kodlar (float16 / int8 / binary) üzerinde
+    yapılır; en iyi `k * rescore_factor` aday tam hassasiyetli vektörlerle
+    yeniden sıralanır. Tam vektörler bir np.memmap olabilir, böylece RAM'de
+    sadece kodlar tutulur.
+    """
+
+    def __init__(self, tier: str = "int8", rescore_factor: int = 4):
+        if tier not in QUANTIZATION_TIERS:
+            raise ValueError(f"Desteklenmeyen kuantizasyon katmanı: {tier}")
+        self.tier = tier
+        self.rescore_factor = rescore_factor
+        self.quantizer: Optional[ScalarQuantizer] = None
+        self.codes: Optional[np.ndarray] = None
+        self.full_vectors: Optional[np.ndarray] = None
+
+    def build(self, vectors: np.ndarray) -> "QuantizedIndex":
+        vectors = np.atleast_2d(vectors)
+        self.full_vectors = vectors
+
+        if self.tier == "float32":
+            self.codes = np.asarray(vectors, dtype=np.float32)
+        elif self.tier == "float16":
+            self.codes = to_float16(vectors)
+        elif self.tier == "int8":
+            self.quantizer = ScalarQuantizer().fit(vectors)
+            self.codes = self.quantizer.encode(vectors)
+        else:
+            self.codes = binary_quantize(vectors)
+        return self
+
+    @property
+    def code_nbytes(self) -> int:
+        """Kompakt kodların RAM'de kapladığı bayt"""
+        return 0 if self.codes is None else int(self.codes.nbytes)
+
+    def _first_pass(self, query: np.ndarray) -> np.ndarray:
+        """Kodlar üzerinde yaklaşık mesafeler (küçük = yakın)"""
+        if self.tier == "binary":
+            return hamming_distances(binary_quantize(query)[0], self.codes)
+        if self.tier == "int8":
+            # Sorgu da aynı ölçekle kodlanır, mesafe int32 uzayında hesaplanır
+            query_codes = self.quantizer.encode(query)[0].astype(np.int32)
+            diff = self.codes.astype(np.int32) - query_codes
+            return np.einsum("ij,ij->i", diff, diff)
+        diff = self.codes.astype(np.float32) - query
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def search(self, query: Union[List[float], np.ndarray], k: int = 10, rescore: bool = True) -> List[Tuple[int, float]]:
+        """
+        Returns:
+            (satır indeksi, L2 mesafesi) listesi; rescore=False ise ikinci değer yaklaşık mesafedir
+        """
+        if self.codes is None:
+            raise ValueError("Index önce build edilmeli")
+
+        query = np.asarray(query, dtype=np.float32).ravel()
+        approx = self._first_pass(query)
+
+        n_candidates = min(len(approx), k * self.rescore_factor if rescore else k)
+        candidates = np.argpartition(approx, n_candidates - 1)[:n_candidates]
+
+        if not rescore:
+            order = candidates[np.argsort(approx[candidates])]
+            return [(int(i), float(approx[i])) for i in order[:k]]
+
+        exact = np.linalg.norm(np.asarray(self.full_vectors[candidates], dtype=np.float32) - query, axis=1)
+        order = np.argsort(exact)[:k]
+        return [(int(candidates[i]), float(exact[i])) for i in order]
@@ -1,19 +1,79 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
 from .embedding_service import EmbeddingService
+from .embedding_spaces import EmbeddingSpace, EmbeddingSpaceRegistry, get_embedder
 from .vector_store import get_vector_store
+from core.services.rate_limiter import request_priority
 from config.settings import settings
 
+# Model geçişinin yazma bariyeri (pg advisory lock anahtarı)
+_MIGRATION_LOCK_KEY = 0x52414701
+
 class RAGService:
     def __init__(self):
         self.embedding_service = EmbeddingService()
-        self.vector_store = get_vector_store()
-        
-    async def add_documents(self, documents: List[Dict[str, Any]]):
+        self.engine = create_async_engine(settings.DATABASE_URL)
+        self.registry = EmbeddingSpaceRegistry(self.engine)
+        # table_name -> vector store / model_name -> embedder
+        self._stores = {}
+        self._embedders = {}
+
+    def _store_for(self, space: EmbeddingSpace):
+        if space.table_name not in self._stores:
+            self._stores[space.table_name] = get_vector_store(space=space, engine=self.engine)
+        return self._stores[space.table_name]
+
+    def _embedder_for(self, space: EmbeddingSpace):
+        if space.model_name not in self._embedders:
+            if space.model_name == self.embedding_service.model:
+                self._embedders[space.model_name] = self.embedding_service.get_embeddings
+            else:
+                self._embedders[space.model_name] = get_embedder(space.model_name)
+        return self._embedders[space.model_name]
+
+    @asynccontextmanager
+    async def _write_barrier(self, exclusive: bool = False):
+        """
+        Yazmalar ile space geçişleri arasındaki bariyer (süreçler arası advisory lock).
+
+        add_documents paylaşımlı kilidi yazılabilir space listesini okumadan
+        yazma bitene kadar tutar; geçiş başlatma ve aktif yapma özel kilidi
+        alır. Böylece hiçbir yazma eski space listesiyle geçişin ortasına düşmez.
+        """
+        suffix = "" if exclusive else "_shared"
+        async with self.engine.connect() as conn:
+            await conn.execute(text(f"SELECT pg_advisory_lock{suffix}(:key)"), {"key": _MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                await conn.execute(text(f"SELECT pg_advisory_unlock{suffix}(:key)"), {"key": _MIGRATION_LOCK_KEY})
+
+    async def init_db(self):
+        """Space kaydını ve aktif space'in tablosunu hazırla"""
+        await self.registry.init_db()
+        active = await self.registry.get_active()
+        await self._store_for(active).init_db()
+
+    async def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        collection_ids: Optional[List[str]] = None
+    ):
         """
         Dökümanları işle ve vector store'a ekle
         
+        Model geçişi sürüyorsa (backfilling space varsa) chunk'lar her iki
+        modelle de embed edilip iki space'e birden yazılır (dual-write).
+        Önce aktif space'e yazılır; dönen satır id'leri hedef space'te
+        source_row_id olur, backfill aynı satırı tekrar kopyalamaz.
+        
         Args:
             documents: Her biri {'text': str, 'metadata': dict} formatında döküman listesi
+            user_id: Chunk'ların sahibi olan kullanıcı (filtreli arama için)
+            collection_ids: Chunk'ların ait olduğu koleksiyonlar
         """
         texts = [doc['text'] for doc in documents]
         metadata = [doc.get('metadata', {}) for doc in documents]
@@ -28,29 +88,153 @@ class RAGService:
             # Her chunk için metadata'yı kopyala
             all_metadata.extend([meta] * len(chunks))
         
-        # Tüm chunk'lar için embedding'leri al
-        embeddings = []
-        for chunk in all_chunks:
-            embedding = await self.embedding_service.get_embedding(chunk)
-            embeddings.append(embedding)
-        
-        # Vector store'a kaydet
-        await self.vector_store.add_embeddings(all_chunks, embeddings, all_metadata)
-    
-    async def query(self, question: str, k: int = 3) -> List[Dict[str, Any]]:
+        if not all_chunks:
+            return
+
+        async with self._write_barrier():
+            # get_writable'ın ilk elemanı aktif space
+            source, *targets = await self.registry.get_writable()
+            source_row_ids = None
+            for space in [source, *targets]:
+                # Ingestion embedding'leri sohbet isteklerinin önüne geçmesin
+                with request_priority("batch"):
+                    embeddings = await self._embedder_for(space)(all_chunks)
+                row_ids = await self._store_for(space).add_embeddings(
+                    all_chunks,
+                    embeddings,
+                    all_metadata,
+                    user_id=user_id,
+                    collection_ids=collection_ids,
+                    source_row_ids=source_row_ids
+                )
+                if space is source:
+                    source_row_ids = row_ids
+
+    async def create_collection(self, collection_id: str):
+        """Koleksiyonun partial HNSW index'ini yazılabilir tüm space'lerde kurar"""
+        for space in await self.registry.get_writable():
+            await self._store_for(space).ensure_collection_indexes([collection_id])
+
+    async def query(
+        self,
+        question: str,
+        k: int = 3,
+        collection_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Soru için en alakalı dökümanları bul
         
+        Sorgu aktif space'in modeliyle embed edilir ve o space'in tablosunda aranır.
+        
         Args:
             question: Sorgu metni
             k: Kaç sonuç döndürüleceği
+            collection_id: Sadece bu koleksiyonda ara
+            user_id: Sadece bu kullanıcının dökümanlarında ara
+            metadata_filter: Metadata'nın içermesi gereken alanlar (JSONB @> ile)
             
         Returns:
             List[Dict]: Her biri {'text': str, 'distance': float, 'metadata': dict} formatında sonuçlar
         """
+        space = await self.registry.get_active()
+
         # Soru için embedding al
-        query_embedding = await self.embedding_service.get_embedding(question)
+        query_embedding = (await self._embedder_for(space)([question]))[0]
         
         # En yakın dökümanları bul
-        results = await self.vector_store.search(query_embedding, k=k)
-        return results 
\ No newline at end of file
+        results = await self._store_for(space).search(
+            query_embedding,
+            k=k,
+            collection_id=collection_id,
+            user_id=user_id,
+            metadata_filter=metadata_filter
+        )
+        return results
+
+    async def start_migration(self, model_name: str, dimension: int) -> EmbeddingSpace:
+        """
+        Yeni bir embedding modeline geçişi başlatır.
+
+        Hedef space 'backfilling' olarak kaydedilir; bu andan itibaren yeni
+        dökümanlar iki space'e birden yazılır, eski satırlar backfill ile kopyalanır.
+        Kayıt yazma bariyeri arkasında yapılır: süren yazmalar önce biter,
+        sonrakiler hedef space'i görür.
+        """
+        existing = await self.registry.get(model_name, dimension)
+        if existing:
+            return existing
+
+        target = EmbeddingSpace(model_name, dimension, status="backfilling")
+        await self._store_for(target).init_db()
+        async with self._write_barrier(exclusive=True):
+            await self.registry.register(target)
+        return target
+
+    async def backfill(self, model_name: str, dimension: int, batch_size: int = 256) -> int:
+        """
+        Aktif space'teki satırları hedef modelle yeniden embed edip kopyalar.
+
+        Bir anlık görüntüyle sınırlı değildir; kaynakta okunacak satır
+        kalmayana kadar sürer. Dual-write ile zaten yazılmış satırlar
+        source_row_id çakışmasıyla atlanır. İlerleme kayıt tablosunda
+        tutulur; yarıda kesilirse kaldığı yerden devam eder.
+        Returns: kopyalanan satır sayısı
+        """
+        target = await self.registry.get(model_name, dimension)
+        if target is None or target.status != "backfilling":
+            raise ValueError(f"{model_name} ({dimension}) için sürmekte olan bir geçiş yok")
+
+        source = await self.registry.get_active()
+        source_store = self._store_for(source)
+        target_store = self._store_for(target)
+        embed = self._embedder_for(target)
+
+        copied = 0
+        while True:
+            rows = await source_store.fetch_rows_after(target.backfill_cursor, batch_size)
+            if not rows:
+                break
+
+            with request_priority("batch"):
+                embeddings = await embed([row["text"] for row in rows])
+
+            # Aynı sahip/koleksiyon/dokümana ait satırlar tek insert ile yazılır
+            groups: Dict[tuple, List[tuple]] = {}
+            for row, embedding in zip(rows, embeddings):
+                key = (row["user_id"], tuple(row["collection_ids"] or ()), row["document_id"])
+                groups.setdefault(key, []).append((row, embedding))
+
+            for (user_id, collection_ids, document_id), items in groups.items():
+                await target_store.add_embeddings(
+                    [row["text"] for row, _ in items],
+                    [embedding for _, embedding in items],
+                    [row["metadata"] for row, _ in items],
+                    user_id=user_id,
+                    collection_ids=list(collection_ids),
+                    document_id=document_id,
+                    source_row_ids=[row["id"] for row, _ in items]
+                )
+            copied += len(rows)
+            await self.registry.save_cursor(target, rows[-1]["id"])
+
+        return copied
+
+    async def promote(self, model_name: str, dimension: int) -> EmbeddingSpace:
+        """
+        Space'i aktif yapar; sorgular anında yeni tabloya yönlenir.
+
+        Yazmalar bariyerle durdurulur, backfill kalan son satırları kopyalar
+        ve geçiş aynı kilit altında yapılır; arada kaynağa tek başına yazılan
+        satır kalmaz. Önce backfill() ile büyük kısmı kopyalanmış olmalı,
+        kilit süresi kalan satır sayısıyla orantılıdır.
+        """
+        target = await self.registry.get(model_name, dimension)
+        if target is None:
+            raise ValueError(f"{model_name} ({dimension}) için kayıtlı space yok")
+        async with self._write_barrier(exclusive=True):
+            if target.status == "backfilling":
+                await self.backfill(model_name, dimension)
+            await self.registry.promote(target)
+        return target
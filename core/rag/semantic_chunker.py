@@ -0,0 +1,161 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+import re
+import numpy as np
+
+# Eşik türleri (langchain SemanticChunker ile aynı adlar ve varsayılanlar)
+THRESHOLD_DEFAULTS = {
+    "percentile": 95.0,
+    "standard_deviation": 3.0,
+    "interquartile": 1.5,
+    "gradient": 95.0
+}
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.?!])\s+")
+
+EmbedFn = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+def cosine_distances(vectors: np.ndarray) -> np.ndarray:
+    """Ardışık vektörler arasındaki kosinüs mesafeleri (n vektör -> n-1 mesafe)"""
+    if len(vectors) < 2:
+        return np.zeros(0, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.maximum(norms, 1e-12)
+    return 1.0 - np.einsum("ij,ij->i", unit[:-1], unit[1:])
+
+
+def pool(vectors: np.ndarray) -> np.ndarray:
+    """Cümle vektörlerinin ortalaması, birim uzunlukta (chunk embedding'i)"""
+    mean = vectors.mean(axis=0)
+    return mean / max(float(np.linalg.norm(mean)), 1e-12)
+
+
+class SemanticTextChunker:
+    """
+    Cümle embedding'lerinden anlamsal kırılım noktası bulan chunker.
+
+    Her cümle komşularıyla (buffer_size) birlikte gömülür, ardışık
+    cümleler arasındaki kosinüs mesafesi eşiği aşan yerlerden bölünür.
+    Eşik percentile / standard_deviation / interquartile / gradient
+    yöntemlerinden biriyle NumPy'da hesaplanır. Chunk embedding'i, chunk'taki
+    cümle vektörlerinin ortalamasıdır; chunk'lar ikinci kez gömülmez.
+    Ortalamaya sadece buffer penceresi chunk içinde kalan satırlar girer,
+    kenar satırlar komşu chunk'ın cümlelerini de içerir.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        threshold_type: str = "percentile",
+        threshold_amount: Optional[float] = None,
+        buffer_size: int = 1,
+        min_chunk_size: Optional[int] = None,
+        batch_size: int = 64
+    ):
+        if threshold_type not in THRESHOLD_DEFAULTS:
+            raise ValueError(f"Unknown threshold type: {threshold_type}")
+        self.embed_fn = embed
+        self.threshold_type = threshold_type
+        self.threshold_amount = THRESHOLD_DEFAULTS[threshold_type] if threshold_amount is None else threshold_amount
+        self.buffer_size = buffer_size
+        self.min_chunk_size = min_chunk_size
+        self.batch_size = batch_size
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        return [sentence for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+    def embed(self, sentences: List[str]) -> np.ndarray:
+        """Her cümleyi buffer_size komşusuyla birlikte, batch'ler halinde gömer"""
+        combined = [
+            " ".join(sentences[max(0, i - self.buffer_size):i + self.buffer_size + 1])
+            for i in range(len(sentences))
+        ]
+        vectors = []
+        for start in range(0, len(combined), self.batch_size):
+            vectors.extend(self.embed_fn(combined[start:start + self.batch_size]))
+        return np.asarray(vectors, dtype=np.float32).reshape(len(combined), -1)
+
+    def threshold(self, distances: np.ndarray) -> Tuple[float, np.ndarray]:
+        """(eşik, eşikle karşılaştırılacak dizi); gradient'te mesafelerin gradyanı kullanılır"""
+        if self.threshold_type == "percentile":
+            return float(np.percentile(distances, self.threshold_amount)), distances
+        if self.threshold_type == "standard_deviation":
+            return float(distances.mean() + self.threshold_amount * distances.std()), distances
+        if self.threshold_type == "interquartile":
+            q1, q3 = np.percentile(distances, [25, 75])
+            return float(distances.mean() + self.threshold_amount * (q3 - q1)), distances
+        gradient = np.gradient(distances) if len(distances) > 1 else distances
+        return float(np.percentile(gradient, self.threshold_amount)), gradient
+
+    def breakpoints(self, vectors: np.ndarray) -> np.ndarray:
+        """Kendisinden sonra bölünecek cümle index'leri"""
+        distances = cosine_distances(vectors)
+        if len(distances) == 0:
+            return np.zeros(0, dtype=np.int64)
+        threshold, values = self.threshold(distances)
+        return np.flatnonzero(values > threshold)
+
+    def pool_span(self, vectors: np.ndarray, start: int, end: int, trim_start: bool, trim_end: bool) -> np.ndarray:
+        """
+        vectors[start:end] aralığının chunk embedding'i.
+
+        trim_start / trim_end: aralığın o kenarında komşu cümleler var; ilk /
+        son buffer_size satırın penceresi chunk dışına taştığı için atlanır.
+        Chunk bunun için fazla kısaysa tüm satırlar kullanılır.
+        """
+        low = start + self.buffer_size if trim_start else start
+        high = end - self.buffer_size if trim_end else end
+        if high <= low:
+            low, high = start, end
+        return pool(vectors[low:high])
+
+    def group(
+        self,
+        sentences: List[str],
+        vectors: np.ndarray,
+        context_before: bool = False
+    ) -> List[Tuple[str, np.ndarray, slice]]:
+        """
+        (chunk metni, havuzlanmış embedding, cümle aralığı) listesi
+
+        context_before: ilk satırlar önceki cümlelerle birlikte gömülmüş
+        (önceki sayfadan devreden parça); ilk chunk'ın baş kenarı da kırpılır.
+        """
+        if not sentences:
+            return []
+        bounds = [0, *(int(i) + 1 for i in self.breakpoints(vectors)), len(sentences)]
+        spans = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+        if self.min_chunk_size:
+            # Çok kısa chunk'lar sonrakiyle birleştirilir (son chunk öncekine eklenir)
+            merged = []
+            for start, end in spans:
+                if merged and len(" ".join(sentences[merged[-1][0]:merged[-1][1]])) < self.min_chunk_size:
+                    merged[-1] = (merged[-1][0], end)
+                else:
+                    merged.append((start, end))
+            if len(merged) > 1 and len(" ".join(sentences[merged[-1][0]:merged[-1][1]])) < self.min_chunk_size:
+                last = merged.pop()
+                merged[-1] = (merged[-1][0], last[1])
+            spans = merged
+
+        return [
+            (
+                " ".join(sentences[start:end]),
+                self.pool_span(vectors, start, end, start > 0 or context_before, end < len(sentences)),
+                slice(start, end)
+            )
+            for start, end in spans
+        ]
+
+    def split(self, text: str) -> List[Tuple[str, np.ndarray]]:
+        sentences = self.split_sentences(text)
+        if not sentences:
+            return []
+        vectors = self.embed(sentences)
+        return [(chunk, vector) for chunk, vector, _ in self.group(sentences, vectors)]
+
+    def split_text(self, text: str) -> List[str]:
+        """langchain SemanticChunker.split_text ile uyumlu arayüz"""
+        return [chunk for chunk, _ in self.split(text)]
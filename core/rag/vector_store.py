@@ -1,82 +1,402 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
+import hashlib
+import json
+import re
 import numpy as np
-from pgvector.asyncpg import register_vector
-from sqlalchemy import create_engine
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 from config.settings import settings
+from .embedding_spaces import EmbeddingSpace, default_space
+
+# Koleksiyon id'leri DDL ve partial index predicate'ine literal olarak gömülür
+_SAFE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+
+# Tek INSERT'teki satır sayısı; satır başına 4 parametre, sürücü sınırının (32767) altında kalır
+_INSERT_BATCH = 500
+
+# Kuantizasyon katmanı -> (index ifadesi, operator class, sorgu mesafe ifadesi)
+# Index ifadesi ile sorgudaki ifade birebir aynı olmalı, aksi halde index kullanılmaz.
+_ANN_EXPRESSIONS = {
+    "none": (
+        "embedding",
+        "vector_l2_ops",
+        "embedding <-> CAST(:query_embedding AS vector)"
+    ),
+    "halfvec": (
+        "(embedding::halfvec({dim}))",
+        "halfvec_l2_ops",
+        "embedding::halfvec({dim}) <-> CAST(:query_embedding AS halfvec({dim}))"
+    ),
+    "binary": (
+        "(binary_quantize(embedding)::bit({dim}))",
+        "bit_hamming_ops",
+        "binary_quantize(embedding)::bit({dim}) <~> binary_quantize(CAST(:query_embedding AS vector))"
+    ),
+}
+
+
+def _to_pgvector(embedding: List[float]) -> str:
+    """Embedding'i pgvector'ün metin formatına çevirir ('[0.1,0.2,...]')"""
+    return "[" + ",".join(str(float(x)) for x in np.asarray(embedding).ravel()) + "]"
+
+
+def _collection_predicate(collection_id: str) -> str:
+    """
+    Koleksiyon filtresi için SQL predicate'i.
+
+    Partial index'in planner tarafından seçilebilmesi için sorgudaki ifade
+    index tanımındaki ifadeyle birebir aynı olmalı; bu yüzden hem index hem
+    sorgu bu fonksiyonu kullanır ve id bind parametresi yerine literal gömülür.
+    """
+    if not _SAFE_ID_PATTERN.match(collection_id):
+        raise ValueError(f"Geçersiz koleksiyon id: {collection_id}")
+    return f"collection_ids @> ARRAY['{collection_id}']::varchar[]"
+
+
+def _ann_expression(quantization: str, dim: int):
+    """Kuantizasyon katmanı için (index ifadesi, opclass, sorgu ifadesi) döndürür"""
+    if quantization not in _ANN_EXPRESSIONS:
+        # int8 skaler kuantizasyon pgvector'de yok; sadece blob / bellek içi index'te desteklenir
+        raise ValueError(f"pgvector için desteklenmeyen kuantizasyon: {quantization}")
+    index_expr, opclass, query_expr = _ANN_EXPRESSIONS[quantization]
+    return index_expr.format(dim=dim), opclass, query_expr.format(dim=dim)
+
 
 class BaseVectorStore(ABC):
     """Vector store için temel sınıf"""
-    
+
     @abstractmethod
-    async def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadata: Optional[List[Dict]] = None):
-        """Embedding'leri vector store'a ekle"""
+    async def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadata: Optional[List[Dict]] = None,
+        user_id: Optional[str] = None,
+        collection_ids: Optional[List[str]] = None,
+        document_id: Optional[str] = None,
+        source_row_ids: Optional[List[int]] = None
+    ) -> List[int]:
+        """Embedding'leri vector store'a ekle; eklenen satırların id'lerini (girdi sırasıyla) döndür"""
         pass
-    
+
     @abstractmethod
-    async def search(self, query_embedding: List[float], k: int = 5) -> List[Dict[str, Any]]:
-        """En yakın k dökümanı bul"""
+    async def search(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        collection_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """En yakın k dökümanı bul (opsiyonel koleksiyon / kullanıcı / metadata filtresiyle)"""
         pass
 
 class PGVectorStore(BaseVectorStore):
     """PostgreSQL pgvector extension kullanan vector store"""
-    
-    def __init__(self):
-        self.engine = create_async_engine(settings.DATABASE_URL)
-        
+
+    def __init__(
+        self,
+        space: Optional[EmbeddingSpace] = None,
+        quantization: Optional[str] = None,
+        rescore_factor: Optional[int] = None,
+        engine=None
+    ):
+        self.engine = engine or create_async_engine(settings.DATABASE_URL)
+        # Her (model, boyut) kendi tablosunda tutulur
+        self.space = space or default_space()
+        self.table_name = self.space.table_name
+        self.dimension = self.space.dimension
+        self.quantization = quantization or settings.VECTOR_QUANTIZATION
+        self.rescore_factor = rescore_factor or settings.VECTOR_RESCORE_FACTOR
+        _ann_expression(self.quantization, self.dimension)  # erken doğrulama
+        # Partial index'i bu süreçte kurulmuş koleksiyonlar ve pgvector sürümü (ilk sorguda okunur)
+        self._indexed_collections = set()
+        self._extension_version: Optional[tuple] = None
+
+    def _check_dimension(self, embedding: List[float]):
+        if len(embedding) != self.dimension:
+            raise ValueError(
+                f"{self.space.model_name} space'i {self.dimension} boyutlu, "
+                f"gelen embedding {len(embedding)} boyutlu"
+            )
+
     async def init_db(self):
-        """pgvector extension'ı yükle ve tabloyu oluştur"""
+        """pgvector extension'ı yükle, tabloyu ve filtre indekslerini oluştur"""
         async with self.engine.begin() as conn:
-            await conn.execute('CREATE EXTENSION IF NOT EXISTS vector')
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS document_embeddings (
+            await conn.execute(text('CREATE EXTENSION IF NOT EXISTS vector'))
+            await conn.execute(text(f'''
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
                     id SERIAL PRIMARY KEY,
                     text TEXT NOT NULL,
-                    embedding vector(1536) NOT NULL,
-                    metadata JSONB
+                    embedding vector({self.dimension}) NOT NULL,
+                    metadata JSONB,
+                    user_id VARCHAR,
+                    collection_ids VARCHAR[] NOT NULL DEFAULT '{{}}',
+                    document_id VARCHAR,
+                    source_row_id INTEGER
                 )
-            ''')
-            await register_vector(conn)
-    
-    async def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadata: Optional[List[Dict]] = None):
+            '''))
+            # Eski kurulumlar için eksik kolonları ekle
+            for column_ddl in (
+                "user_id VARCHAR",
+                "collection_ids VARCHAR[] NOT NULL DEFAULT '{}'",
+                "document_id VARCHAR",
+                "source_row_id INTEGER",
+            ):
+                await conn.execute(text(
+                    f"ALTER TABLE {self.table_name} ADD COLUMN IF NOT EXISTS {column_ddl}"
+                ))
+
+            # Filtre indeksleri: metadata @> {...} için GIN, kullanıcı için btree,
+            # koleksiyon üyeliği için GIN; global ANN için HNSW
+            await conn.execute(text(f'''
+                CREATE INDEX IF NOT EXISTS ix_{self.table_name}_metadata
+                ON {self.table_name} USING gin (metadata jsonb_path_ops)
+            '''))
+            await conn.execute(text(f'''
+                CREATE INDEX IF NOT EXISTS ix_{self.table_name}_user_id
+                ON {self.table_name} (user_id)
+            '''))
+            await conn.execute(text(f'''
+                CREATE INDEX IF NOT EXISTS ix_{self.table_name}_collection_ids
+                ON {self.table_name} USING gin (collection_ids)
+            '''))
+            await conn.execute(text(f'''
+                CREATE INDEX IF NOT EXISTS ix_{self.table_name}_document_id
+                ON {self.table_name} (document_id)
+            '''))
+            await conn.execute(text(f'''
+                CREATE UNIQUE INDEX IF NOT EXISTS ix_{self.table_name}_source_row_id
+                ON {self.table_name} (source_row_id) WHERE source_row_id IS NOT NULL
+            '''))
+            # ANN index seçilen katmanda kurulur (halfvec / binary index RAM'e sığar);
+            # tam hassasiyetli vektörler tabloda kalır ve rescore için kullanılır
+            index_expr, opclass, _ = _ann_expression(self.quantization, self.dimension)
+            await conn.execute(text(f'''
+                CREATE INDEX IF NOT EXISTS ix_{self.table_name}_{self.quantization}_hnsw
+                ON {self.table_name} USING hnsw ({index_expr} {opclass})
+            '''))
+
+    async def extension_version(self) -> tuple:
+        """Kurulu pgvector sürümü, ör. (0, 8, 0); extension yoksa (0,)"""
+        if self._extension_version is None:
+            async with self.engine.begin() as conn:
+                result = await conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+                version = result.scalar()
+            self._extension_version = tuple(
+                int(part) for part in re.findall(r"\d+", version or "0")
+            )
+        return self._extension_version
+
+    async def ensure_collection_indexes(self, collection_ids: Optional[List[str]]):
+        """Koleksiyona ilk yazımda partial index'i kurar (süreç başına bir kez)"""
+        for collection_id in collection_ids or ():
+            if collection_id not in self._indexed_collections:
+                await self.create_collection_index(collection_id)
+                self._indexed_collections.add(collection_id)
+
+    async def create_collection_index(self, collection_id: str):
+        """
+        Koleksiyona özel partial HNSW index oluşturur.
+
+        Koleksiyonla filtrelenmiş sorgular global index'i post-filter etmek
+        yerine sadece o koleksiyonun vektörlerini içeren bu index'i kullanır.
+        """
+        predicate = _collection_predicate(collection_id)
+        index_name = f"ix_{self.table_name}_coll_" + hashlib.sha1(collection_id.encode()).hexdigest()[:12]
+        index_expr, opclass, _ = _ann_expression(self.quantization, self.dimension)
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f'''
+                CREATE INDEX IF NOT EXISTS {index_name}
+                ON {self.table_name} USING hnsw ({index_expr} {opclass})
+                WHERE {predicate}
+            '''))
+
+    async def drop_collection_index(self, collection_id: str):
+        """Koleksiyona özel partial index'i kaldırır"""
+        _collection_predicate(collection_id)  # id doğrulaması
+        index_name = f"ix_{self.table_name}_coll_" + hashlib.sha1(collection_id.encode()).hexdigest()[:12]
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        self._indexed_collections.discard(collection_id)
+
+    async def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadata: Optional[List[Dict]] = None,
+        user_id: Optional[str] = None,
+        collection_ids: Optional[List[str]] = None,
+        document_id: Optional[str] = None,
+        source_row_ids: Optional[List[int]] = None
+    ) -> List[int]:
+        """
+        Satırları ekler ve eklenen id'leri girdi sırasıyla döndürür.
+
+        source_row_ids: aktif space'teki karşılık gelen satırlar (dual-write /
+        backfill); aynı kaynak satır ikinci kez yazılmaz ve id listesinde yer almaz.
+        """
         if metadata is None:
             metadata = [{}] * len(texts)
-            
+        if source_row_ids is None:
+            source_row_ids = [None] * len(texts)
+
+        rows = []
+        for chunk, embedding, meta, source_row_id in zip(texts, embeddings, metadata, source_row_ids):
+            self._check_dimension(embedding)
+            rows.append({
+                "text": chunk,
+                "embedding": _to_pgvector(embedding),
+                "metadata": json.dumps(meta or {}),
+                "source_row_id": source_row_id
+            })
+        if not rows:
+            return []
+
+        await self.ensure_collection_indexes(collection_ids)
+        ids = []
         async with self.engine.begin() as conn:
-            for text, embedding, meta in zip(texts, embeddings, metadata):
-                await conn.execute(
-                    '''
-                    INSERT INTO document_embeddings (text, embedding, metadata)
-                    VALUES ($1, $2, $3)
-                    ''',
-                    text, embedding, meta
+            # executemany RETURNING desteklemez; satırlar çok satırlı VALUES ile
+            # parça parça yazılır. id'ler VALUES sırasıyla artan verilir, bu yüzden
+            # sıralanmış RETURNING girdi sırasına karşılık gelir.
+            for start in range(0, len(rows), _INSERT_BATCH):
+                params = {
+                    "user_id": user_id,
+                    "collection_ids": list(collection_ids or []),
+                    "document_id": document_id
+                }
+                values = []
+                for i, row in enumerate(rows[start:start + _INSERT_BATCH]):
+                    values.append(
+                        f"(:text_{i}, CAST(:embedding_{i} AS vector), CAST(:metadata_{i} AS jsonb), "
+                        f":user_id, CAST(:collection_ids AS varchar[]), :document_id, :source_row_id_{i})"
+                    )
+                    params.update({f"{key}_{i}": value for key, value in row.items()})
+                # Aynı kaynak satır (dual-write + backfill) iki kez yazılmaz
+                result = await conn.execute(
+                    text(f'''
+                        INSERT INTO {self.table_name}
+                            (text, embedding, metadata, user_id, collection_ids, document_id, source_row_id)
+                        VALUES {", ".join(values)}
+                        ON CONFLICT (source_row_id) WHERE source_row_id IS NOT NULL DO NOTHING
+                        RETURNING id
+                    '''),
+                    params
                 )
-    
-    async def search(self, query_embedding: List[float], k: int = 5) -> List[Dict[str, Any]]:
+                ids.extend(sorted(result.scalars()))
+        return ids
+
+    async def fetch_rows_after(self, cursor: int, limit: int) -> List[Dict[str, Any]]:
+        """Backfill için id sırasıyla satırları (embedding hariç) okur"""
         async with self.engine.begin() as conn:
-            results = await conn.fetch(
-                '''
-                SELECT text, embedding <-> $1 as distance, metadata
-                FROM document_embeddings
-                ORDER BY distance ASC
-                LIMIT $2
-                ''',
-                query_embedding, k
+            result = await conn.execute(
+                text(f'''
+                    SELECT id, text, metadata, user_id, collection_ids, document_id
+                    FROM {self.table_name}
+                    WHERE id > :cursor
+                    ORDER BY id
+                    LIMIT :limit
+                '''),
+                {"cursor": cursor, "limit": limit}
             )
-            
+            return [dict(row) for row in result.mappings().all()]
+
+    async def add_to_collection(self, document_id: str, collection_id: str):
+        """Bir dokümanın tüm chunk'larını koleksiyona ekler"""
+        await self.ensure_collection_indexes([collection_id])
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text(f'''
+                    UPDATE {self.table_name}
+                    SET collection_ids = array_append(collection_ids, CAST(:collection_id AS varchar))
+                    WHERE document_id = :document_id
+                      AND NOT (collection_ids @> ARRAY[CAST(:collection_id AS varchar)])
+                '''),
+                {"collection_id": collection_id, "document_id": document_id}
+            )
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        collection_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        self._check_dimension(query_embedding)
+        conditions = []
+        params: Dict[str, Any] = {"query_embedding": _to_pgvector(query_embedding), "k": k}
+
+        if collection_id is not None:
+            conditions.append(_collection_predicate(collection_id))
+        if user_id is not None:
+            conditions.append("user_id = :user_id")
+            params["user_id"] = user_id
+        if metadata_filter:
+            conditions.append("metadata @> CAST(:metadata_filter AS jsonb)")
+            params["metadata_filter"] = json.dumps(metadata_filter)
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # hnsw.iterative_scan pgvector 0.8 ile geldi; eski sürümde SET hata verir
+        iterative_scan = settings.VECTOR_ITERATIVE_SCAN and await self.extension_version() >= (0, 8)
+
+        async with self.engine.begin() as conn:
+            if conditions:
+                # HNSW index filtreyi sağlayan k satır bulana kadar taramayı sürdürsün;
+                # aksi halde ef_search kadar aday alınıp filtre sonrası eksik sonuç döner
+                await conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.VECTOR_EF_SEARCH)}"))
+                if iterative_scan:
+                    await conn.execute(text(
+                        f"SET LOCAL hnsw.iterative_scan = {settings.VECTOR_ITERATIVE_SCAN}"
+                    ))
+
+            _, _, ann_distance = _ann_expression(self.quantization, self.dimension)
+            if self.quantization == "none":
+                sql = f'''
+                    SELECT text, {ann_distance} AS distance,
+                           metadata, user_id, collection_ids, document_id
+                    FROM {self.table_name}
+                    {where_clause}
+                    ORDER BY distance ASC
+                    LIMIT :k
+                '''
+            else:
+                # 1. geçiş: kompakt index üzerinden aday seçimi
+                # 2. geçiş: adaylar tam hassasiyetli vektörle yeniden sıralanır
+                params["candidates"] = k * self.rescore_factor
+                sql = f'''
+                    SELECT text, embedding <-> CAST(:query_embedding AS vector) AS distance,
+                           metadata, user_id, collection_ids, document_id
+                    FROM (
+                        SELECT text, embedding, metadata, user_id, collection_ids, document_id
+                        FROM {self.table_name}
+                        {where_clause}
+                        ORDER BY {ann_distance}
+                        LIMIT :candidates
+                    ) AS candidates
+                    ORDER BY distance ASC
+                    LIMIT :k
+                '''
+
+            result = await conn.execute(text(sql), params)
+            rows = result.mappings().all()
+
             return [
                 {
                     'text': row['text'],
                     'distance': float(row['distance']),
-                    'metadata': row['metadata']
+                    'metadata': row['metadata'],
+                    'user_id': row['user_id'],
+                    'collection_ids': list(row['collection_ids'] or []),
+                    'document_id': row['document_id']
                 }
-                for row in results
+                for row in rows
             ]
 
 # Factory pattern for vector store creation
-def get_vector_store() -> BaseVectorStore:
+def get_vector_store(space: Optional[EmbeddingSpace] = None, engine=None) -> BaseVectorStore:
     if settings.VECTOR_STORE_TYPE == "pgvector":
-        return PGVectorStore()
+        return PGVectorStore(space=space, engine=engine)
     else:
-        raise ValueError(f"Unsupported vector store type: {settings.VECTOR_STORE_TYPE}") 
\ No newline at end of file
+        raise ValueError(f"Unsupported vector store type: {settings.VECTOR_STORE_TYPE}")
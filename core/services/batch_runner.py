@@ -0,0 +1,250 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+from datetime import datetime
+import asyncio
+import json
+import time
+import uuid
+import tiktoken
+from sqlalchemy import select
+from config.settings import settings
+from core.database import async_session
+from core.database.models import Assistant as AssistantModel
+from core.models.assistant import Assistant, build_assistant
+from core.services.metrics import metrics
+from core.services.rate_limiter import request_priority
+
+_tokenizer = tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_tokenizer.encode(text, disallowed_special=())) if text else 0
+
+
+class BatchJob:
+    """
+    Bir JSONL prompt dosyasının asistan üzerinden toplu çalıştırılması.
+
+    Dosya düzeni (settings.BATCH_JOBS_DIR/<job_id>/):
+        input.jsonl   -> {"id": ..., "message": ...} satırları
+        output.jsonl  -> her tamamlanan öğe için bir sonuç satırı (checkpoint)
+        job.json      -> iş ayarları ve ilerleme sayaçları
+    Çıktı dosyası aynı zamanda checkpoint'tir: yeniden başlatılan iş,
+    sonucu yazılmış id'leri atlar.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        assistant_name: str,
+        job_dir: Path,
+        concurrency: int = 4,
+        prompt_field: str = "message",
+        retry_failed: bool = False,
+        status: str = "pending",
+        counts: Optional[Dict[str, int]] = None,
+        created_at: Optional[str] = None,
+        error: Optional[str] = None,
+        user_id: Optional[str] = None
+    ):
+        self.job_id = job_id
+        self.assistant_name = assistant_name
+        # İşi başlatan kullanıcı; iş uçları sadece sahibine açıktır
+        self.user_id = user_id
+        self.job_dir = Path(job_dir)
+        self.concurrency = concurrency
+        self.prompt_field = prompt_field
+        self.retry_failed = retry_failed
+        self.status = status
+        self.counts = counts or {"total": 0, "skipped": 0, "succeeded": 0, "failed": 0}
+        self.created_at = created_at or datetime.utcnow().isoformat()
+        self.error = error
+
+    @property
+    def input_path(self) -> Path:
+        return self.job_dir / "input.jsonl"
+
+    @property
+    def output_path(self) -> Path:
+        return self.job_dir / "output.jsonl"
+
+    @property
+    def state_path(self) -> Path:
+        return self.job_dir / "job.json"
+
+    @classmethod
+    def create(cls, assistant_name: str, jobs_dir: Optional[str] = None, **kwargs) -> "BatchJob":
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = Path(jobs_dir or settings.BATCH_JOBS_DIR) / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        job = cls(job_id, assistant_name, job_dir, **kwargs)
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str, jobs_dir: Optional[str] = None) -> "BatchJob":
+        # job_id URL'den gelir; iş dizini dışına çıkılmasın
+        if not job_id or not job_id.isalnum():
+            raise FileNotFoundError(job_id)
+        job_dir = Path(jobs_dir or settings.BATCH_JOBS_DIR) / job_id
+        state = json.loads((job_dir / "job.json").read_text(encoding="utf-8"))
+        state.pop("job_id", None)
+        return cls(job_id, job_dir=job_dir, **state)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "assistant_name": self.assistant_name,
+            "concurrency": self.concurrency,
+            "prompt_field": self.prompt_field,
+            "retry_failed": self.retry_failed,
+            "status": self.status,
+            "counts": self.counts,
+            "created_at": self.created_at,
+            "error": self.error,
+            "user_id": self.user_id
+        }
+
+    def save(self):
+        # Yarım yazılmış job.json kalmasın diye geçici dosya + rename
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+    def completed_ids(self) -> Set[str]:
+        """Çıktıda sonucu bulunan id'ler; retry_failed ise sadece başarılılar"""
+        done = set()
+        if not self.output_path.exists():
+            return done
+        with open(self.output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # Çökme anında yarım kalan son satır
+                    continue
+                if self.retry_failed and result.get("error"):
+                    continue
+                done.add(str(result["id"]))
+        return done
+
+    def items(self, skip: Set[str]) -> Iterator[Tuple[str, Optional[str]]]:
+        """Girdiyi satır satır okur (dosya belleğe alınmaz); (id, mesaj) döndürür, bozuk satırda mesaj None"""
+        with open(self.input_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Bozuk satır hata sonucu olarak yazılır, iş durmaz
+                    self.counts["total"] += 1
+                    if str(line_no) in skip:
+                        self.counts["skipped"] += 1
+                    else:
+                        yield str(line_no), None
+                    continue
+                item_id = record.get("id", record.get("request_id"))
+                item_id = str(line_no if item_id is None else item_id)
+                self.counts["total"] += 1
+                if item_id in skip:
+                    self.counts["skipped"] += 1
+                    continue
+                message = record.get(self.prompt_field) or record.get("prompt") or record.get("body") or ""
+                yield item_id, message
+
+
+async def run_item(assistant: Assistant, item_id: str, message: Optional[str]) -> Dict[str, Any]:
+    """Tek prompt'u önbelleksiz stream ederek çalıştırır; gecikme ve token istatistiklerini döndürür"""
+    started = time.perf_counter()
+    first_token_at = None
+    chunks = []
+    try:
+        if not message:
+            raise ValueError("invalid or empty prompt line")
+        # Önbellekten dönen yanıt (ya da başka isteğin üretimi) gecikme ve token ölçümünü bozar
+        async for chunk in assistant.process_message(message, stream=True, use_cache=False):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunks.append(chunk)
+        response = "".join(chunks)
+        error = response[len("Error:"):].strip() if response.startswith("Error:") else None
+    except Exception as e:
+        response, error = "".join(chunks), str(e)
+
+    finished = time.perf_counter()
+    return {
+        "id": item_id,
+        "response": None if error else response,
+        "error": error,
+        "latency_ms": round((finished - started) * 1000, 1),
+        "first_token_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+        "prompt_tokens": count_tokens(message or ""),
+        "completion_tokens": 0 if error else count_tokens(response),
+        # Yanıt her zaman modelden üretilir (use_cache=False)
+        "cached": False,
+        "finished_at": datetime.utcnow().isoformat()
+    }
+
+
+async def run_batch(job: BatchJob, assistant: Assistant, checkpoint_every: int = 20) -> BatchJob:
+    """
+    İşi sınırlı eşzamanlılıkla çalıştırır.
+
+    Sağlayıcı çağrıları "batch" öncelik sınıfında yapılır; sohbet trafiği
+    aynı hız bütçesinde önde kalır. Her sonuç tamamlanır tamamlanmaz
+    çıktıya eklenir ve diske yazılır.
+    """
+    skip = job.completed_ids()
+    job.counts = {"total": 0, "skipped": 0, "succeeded": 0, "failed": 0}
+    job.status = "running"
+    job.error = None
+    job.save()
+
+    items = job.items(skip)
+    finished = 0
+
+    async def worker(out):
+        nonlocal finished
+        # Aynı iterator'ı paylaşan worker'lar sıradaki satırı alır
+        for item_id, message in items:
+            result = await run_item(assistant, item_id, message)
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            job.counts["failed" if result["error"] else "succeeded"] += 1
+            metrics.increment("batch_items", status="failed" if result["error"] else "succeeded")
+            metrics.observe("batch_item_latency_ms", result["latency_ms"])
+            finished += 1
+            if finished % checkpoint_every == 0:
+                job.save()
+
+    try:
+        with open(job.output_path, "a", encoding="utf-8") as out, request_priority("batch"):
+            await asyncio.gather(*(worker(out) for _ in range(max(1, job.concurrency))))
+        job.status = "completed"
+    except asyncio.CancelledError:
+        job.status = "paused"
+        raise
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.save()
+    return job
+
+
+async def load_assistant(assistant_name: str) -> Assistant:
+    """Asistanı DB kaydından oluşturur (CLI için; API bellekteki asistanları kullanır)"""
+    async with async_session() as session:
+        result = await session.execute(select(AssistantModel).where(AssistantModel.name == assistant_name))
+        db_assistant = result.scalar_one_or_none()
+    if db_assistant is None:
+        raise ValueError(f"Assistant not found: {assistant_name}")
+    return build_assistant(
+        db_assistant.name,
+        db_assistant.model_type,
+        db_assistant.model_name,
+        db_assistant.system_message,
+        db_assistant.config
+    )
@@ -0,0 +1,249 @@
+from fastapi import HTTPException
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import hashlib
+import json
+import shutil
+import time
+import uuid
+from config.logger import app_logger
+from config.settings import settings
+from core.services.file_upload import ALLOWED_EXTENSIONS, FileUploadService
+from core.services.metrics import metrics
+
+# Upload id -> meta.json güncellemelerini sıralayan kilit (parçalar paralel yazılır).
+# Kilit süreç içidir: aynı yüklemenin parçaları tek worker'a gelmelidir.
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+class ChunkedUploadService:
+    """
+    Büyük dokümanlar için parçalı, kaldığı yerden devam edebilen yükleme.
+
+    Akış:
+        1. init      -> hedef dosya tam boyutta (sparse) oluşturulur, upload_id döner
+        2. PUT part  -> her parça kendi offset'ine doğrudan diske yazılır,
+                        sha256'sı yazarken hesaplanıp istemcinin bildirdiğiyle karşılaştırılır
+        3. complete  -> eksik parça yoksa dosya temp klasörüne taşınır ve
+                        normal yükleme akışına (build_upload_record) verilir
+
+    Parçalar farklı offset'lere yazıldığı için paralel yüklenebilir; bellekte
+    hiçbir zaman bir okuma parçasından fazlası tutulmaz. Durum
+    CHUNKED_UPLOAD_DIR/<upload_id>/meta.json dosyasındadır, süreç yeniden
+    başlasa da yükleme devam ettirilebilir.
+
+    meta.json güncellemeleri süreç içi asyncio kilidiyle sıralanır; paralel
+    parça yüklemesi tek worker (tek süreç) varsayar. Birden fazla worker
+    arkasında aynı yüklemenin parçaları aynı sürece yönlendirilmelidir.
+    """
+
+    def __init__(self):
+        self.base_dir = Path(settings.CHUNKED_UPLOAD_DIR)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.part_size = settings.CHUNKED_UPLOAD_PART_SIZE
+        self.max_size = settings.CHUNKED_UPLOAD_MAX_SIZE
+        self.io_chunk_size = settings.UPLOAD_CHUNK_SIZE
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        # upload_id URL'den gelir; dizin dışına çıkılmasın
+        if not upload_id or not upload_id.isalnum():
+            raise HTTPException(404, "Yükleme bulunamadı")
+        return self.base_dir / upload_id
+
+    def _load_meta(self, upload_id: str) -> Dict[str, Any]:
+        meta_path = self._upload_dir(upload_id) / "meta.json"
+        if not meta_path.exists():
+            raise HTTPException(404, "Yükleme bulunamadı")
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+
+    def _save_meta(self, meta: Dict[str, Any]):
+        meta_path = self._upload_dir(meta["upload_id"]) / "meta.json"
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(meta_path)
+
+    def _check_owner(self, meta: Dict[str, Any], user_id: str):
+        if meta["user_id"] != str(user_id):
+            raise HTTPException(404, "Yükleme bulunamadı")
+
+    @staticmethod
+    def _status(meta: Dict[str, Any]) -> Dict[str, Any]:
+        received = sorted(int(offset) for offset in meta["parts"])
+        return {
+            "upload_id": meta["upload_id"],
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "part_size": meta["part_size"],
+            "total_parts": meta["total_parts"],
+            "received_offsets": received,
+            "received_bytes": sum(meta["parts"][str(offset)]["length"] for offset in received),
+            "expires_at": meta["created_at"] + settings.CHUNKED_UPLOAD_TTL_SECONDS
+        }
+
+    def cleanup_expired(self):
+        """TTL'i dolmuş yarım yüklemeleri siler"""
+        now = time.time()
+        for upload_dir in self.base_dir.iterdir():
+            meta_path = upload_dir / "meta.json"
+            try:
+                created_at = json.loads(meta_path.read_text(encoding="utf-8"))["created_at"]
+            except Exception:
+                # meta'sı olmayan dizin: init yarıda kalmış
+                created_at = upload_dir.stat().st_mtime
+            if now - created_at > settings.CHUNKED_UPLOAD_TTL_SECONDS:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+                _locks.pop(upload_dir.name, None)
+                metrics.increment("chunked_uploads_expired")
+
+    async def init_upload(
+        self,
+        user_id: str,
+        filename: str,
+        size: int,
+        checksum: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        file_extension = Path(filename or "").suffix.lower()
+        if file_extension not in ALLOWED_EXTENSIONS:
+            raise HTTPException(400, "Desteklenmeyen dosya formatı")
+        if size <= 0:
+            raise HTTPException(400, "Geçersiz dosya boyutu")
+        if size > self.max_size:
+            raise HTTPException(413, f"Dosya boyutu {self.max_size // (1024 * 1024)}MB'ı aşıyor")
+
+        await asyncio.to_thread(self.cleanup_expired)
+
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._upload_dir(upload_id)
+        upload_dir.mkdir()
+        # Tam boyutta boş dosya: parçalar kendi offset'lerine sırasız yazılabilir
+        with open(upload_dir / "data", "wb") as f:
+            f.truncate(size)
+
+        meta = {
+            "upload_id": upload_id,
+            "user_id": str(user_id),
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "checksum": checksum.lower() if checksum else None,
+            "part_size": self.part_size,
+            "total_parts": (size + self.part_size - 1) // self.part_size,
+            "parts": {},
+            "created_at": time.time()
+        }
+        self._save_meta(meta)
+        metrics.increment("chunked_uploads_started")
+        return self._status(meta)
+
+    async def get_status(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        meta = self._load_meta(upload_id)
+        self._check_owner(meta, user_id)
+        return self._status(meta)
+
+    async def write_part(
+        self,
+        upload_id: str,
+        user_id: str,
+        offset: int,
+        body: AsyncIterator[bytes],
+        checksum: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Bir parçayı offset'ine yazar. Parça sınırları part_size'a hizalıdır;
+        son parça hariç her parça tam part_size uzunluğundadır. Aynı parça
+        tekrar gönderilirse üzerine yazılır (yeniden deneme güvenli).
+        """
+        meta = self._load_meta(upload_id)
+        self._check_owner(meta, user_id)
+
+        part_size, size = meta["part_size"], meta["size"]
+        if offset < 0 or offset >= size or offset % part_size:
+            raise HTTPException(400, f"Offset {part_size} baytın katı ve dosya boyutundan küçük olmalı")
+        expected_length = min(part_size, size - offset)
+
+        lock = _locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            # Tekrar gönderilen parça yazılırken yarıda kalırsa eski kayıt geçerli sayılmasın
+            meta = self._load_meta(upload_id)
+            if meta["parts"].pop(str(offset), None) is not None:
+                self._save_meta(meta)
+
+        digest = hashlib.sha256()
+        length = 0
+        started = time.monotonic()
+        # Her parça kendi dosya tanıtıcısıyla yazılır; paralel parçalar birbirini beklemez
+        with open(self._upload_dir(upload_id) / "data", "r+b") as f:
+            f.seek(offset)
+            async for chunk in body:
+                length += len(chunk)
+                if length > expected_length:
+                    raise HTTPException(413, f"Parça {expected_length} bayttan uzun")
+                digest.update(chunk)
+                f.write(chunk)
+
+        if length != expected_length:
+            raise HTTPException(400, f"Parça uzunluğu {length}, beklenen {expected_length}")
+        part_checksum = digest.hexdigest()
+        if checksum and checksum.lower() != part_checksum:
+            metrics.increment("chunked_upload_checksum_mismatch")
+            raise HTTPException(422, "Parça checksum'ı uyuşmuyor")
+
+        async with lock:
+            # Diğer parçaların kayıtlarını kaybetmemek için meta kilit altında yeniden okunur
+            meta = self._load_meta(upload_id)
+            meta["parts"][str(offset)] = {"length": length, "sha256": part_checksum}
+            self._save_meta(meta)
+
+        metrics.increment("chunked_upload_parts")
+        metrics.observe("chunked_upload_part_seconds", time.monotonic() - started)
+        return {"offset": offset, "length": length, "sha256": part_checksum, **self._status(meta)}
+
+    def _file_checksum(self, path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(self.io_chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def complete_upload(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """Tüm parçalar geldiyse dosyayı birleştirilmiş haliyle yükleme akışına verir"""
+        lock = _locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            meta = self._load_meta(upload_id)
+            self._check_owner(meta, user_id)
+
+            missing = [
+                offset for offset in range(0, meta["size"], meta["part_size"])
+                if str(offset) not in meta["parts"]
+            ]
+            if missing:
+                raise HTTPException(409, {"message": "Eksik parçalar var", "missing_offsets": missing[:100]})
+
+            upload_dir = self._upload_dir(upload_id)
+            data_path = upload_dir / "data"
+            checksum = await asyncio.to_thread(self._file_checksum, data_path)
+            if meta["checksum"] and meta["checksum"] != checksum:
+                metrics.increment("chunked_upload_checksum_mismatch")
+                raise HTTPException(422, "Dosya checksum'ı uyuşmuyor")
+
+            upload_service = FileUploadService()
+            temp_path = upload_service.temp_dir / f"{uuid.uuid4()}{Path(meta['filename']).suffix.lower()}"
+            # Aynı dosya sisteminde rename kopyalamaz
+            await asyncio.to_thread(shutil.move, str(data_path), str(temp_path))
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        _locks.pop(upload_id, None)
+
+        metrics.increment("chunked_uploads_completed")
+        app_logger.info("Parçalı yükleme tamamlandı: %s (%d bayt)", meta["filename"], meta["size"])
+        return await upload_service.build_upload_record(
+            temp_path, meta["filename"], meta["size"], checksum, meta["content_type"]
+        )
+
+    async def abort_upload(self, upload_id: str, user_id: str):
+        meta = self._load_meta(upload_id)
+        self._check_owner(meta, user_id)
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+        _locks.pop(upload_id, None)
+        metrics.increment("chunked_uploads_aborted")
@@ -0,0 +1,395 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from config.logger import app_logger
+from config.settings import settings
+from core.services.document_processing import DocumentProcessor
+from core.services.file_upload import ALLOWED_EXTENSIONS
+from core.services.ingestion_pipeline import IngestionPipeline, Stage
+from core.services.metrics import metrics
+
+MANIFEST_VERSION = 1
+
+# Tarama thread'inin kuyruk sonu işareti
+_SCAN_DONE = object()
+
+
+class FileEntry(NamedTuple):
+    path: str       # mutlak yol
+    rel_path: str   # kök dizine göre, "/" ayraçlı (manifest anahtarı)
+    mtime_ns: int
+    size: int
+
+
+def _list_dir(
+    root: str,
+    directory: str,
+    extensions: Set[str],
+    ignored_dirs: Set[str],
+    ignored_files: Set[str]
+) -> Tuple[List[FileEntry], List[str]]:
+    """Tek dizinin (dosyalar, alt dizinler) listesi; stat bilgisi scandir'den gelir"""
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # Sembolik linkler izlenmez: döngü ve kök dışına çıkma olmasın
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in ignored_dirs:
+                    subdirs.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                if entry.name in ignored_files or os.path.splitext(entry.name)[1].lower() not in extensions:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                files.append(FileEntry(
+                    entry.path,
+                    Path(os.path.relpath(entry.path, root)).as_posix(),
+                    stat.st_mtime_ns,
+                    stat.st_size
+                ))
+    return files, subdirs
+
+
+def scan_directory(
+    root: str,
+    extensions: Optional[Iterable[str]] = None,
+    ignored_dirs: Iterable[str] = (),
+    ignored_files: Iterable[str] = (),
+    workers: int = 8,
+    errors: Optional[List[str]] = None
+) -> Iterator[FileEntry]:
+    """
+    Dizin ağacını paralel os.scandir ile tarar; dosyalar bulundukça döner.
+
+    Her dizin ayrı bir thread'de listelenir (ağ diskleri ve büyük ağaçlarda
+    I/O bekleme süresi örtüşür). Okunamayan dizinler errors listesine
+    eklenir; çağıran taraf bu dizinlerdeki dosyaları silinmiş saymamalı.
+    """
+    root = os.path.abspath(root)
+    extensions = {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in (extensions or ALLOWED_EXTENSIONS)}
+    ignored_dirs, ignored_files = set(ignored_dirs), set(ignored_files)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="scan") as executor:
+        pending = {executor.submit(_list_dir, root, root, extensions, ignored_dirs, ignored_files): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory = pending.pop(future)
+                try:
+                    files, subdirs = future.result()
+                except OSError as e:
+                    app_logger.warning(f"Dizin okunamadı: {directory} ({str(e)})")
+                    if errors is not None:
+                        errors.append(Path(os.path.relpath(directory, root)).as_posix())
+                    continue
+                for subdir in subdirs:
+                    pending[executor.submit(_list_dir, root, subdir, extensions, ignored_dirs, ignored_files)] = subdir
+                yield from files
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(settings.UPLOAD_CHUNK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _under(rel_path: str, directories: List[str]) -> bool:
+    return any(d == "." or rel_path == d or rel_path.startswith(d + "/") for d in directories)
+
+
+class SyncManifest:
+    """
+    Senkronize edilen dosyaların kalıcı listesi.
+
+    files: göreli yol -> {"mtime_ns", "size", "sha256", "chunks", "synced_at"}
+    pending_tombstones: checksum -> yol; tombstone'lanacak eski sürümler
+    (yarıda kalan çalıştırmada kaybolmasınlar diye manifest'te tutulur)
+
+    Bir dosya ancak işlenmesi bittikten sonra manifest'e girer; manifest
+    checkpoint'lerde geçici dosyaya yazılıp atomik olarak değiştirilir.
+    Yarıda kalan senkronizasyon tekrar çalıştırıldığında manifest'teki
+    dosyalar atlanır, işlenmekte olan dosya ise DocumentProcessor'ın
+    checksum bazlı devam etmesiyle kaldığı chunk'tan sürer.
+    """
+
+    def __init__(self, path: Path, root: str, user_id: str):
+        self.path = Path(path)
+        self.root = root
+        self.user_id = user_id
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.pending_tombstones: Dict[str, str] = {}
+        self.last_run: Dict[str, Any] = {}
+
+    @classmethod
+    def load(cls, path: Path, root: str, user_id: str) -> "SyncManifest":
+        manifest = cls(path, root, user_id)
+        if manifest.path.exists():
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                manifest.files = data.get("files", {})
+                manifest.pending_tombstones = data.get("pending_tombstones", {})
+                manifest.last_run = data.get("last_run", {})
+            else:
+                app_logger.warning(f"Manifest sürümü uyumsuz, baştan senkronize edilecek: {manifest.path}")
+        return manifest
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "version": MANIFEST_VERSION,
+            "root": self.root,
+            "user_id": self.user_id,
+            "files": self.files,
+            "pending_tombstones": self.pending_tombstones,
+            "last_run": self.last_run
+        }, ensure_ascii=False)
+
+    def write(self, payload: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        tmp_path.replace(self.path)
+
+    async def save(self):
+        # Serileştirme event loop'ta: worker'lar sözlüğü yazarken thread'de okunmasın
+        await asyncio.to_thread(self.write, self.dumps())
+
+
+class DirectorySync:
+    """
+    Bir dizini kullanıcının RAG dokümanlarıyla artımlı olarak senkronize eder.
+
+    Akış (IngestionPipeline aşamaları):
+        scan   -> paralel scandir; dosyalar bulundukça akar
+        diff   -> mtime ve boyut manifest'le aynıysa dosya okunmaz; değilse
+                  sha256 hesaplanır, içerik aynıysa sadece manifest güncellenir
+        ingest -> yeni / değişen dosyalar DocumentProcessor.process_document'a verilir
+        checkpoint -> manifest'e yazılır, her DIRECTORY_SYNC_CHECKPOINT_EVERY dosyada kaydedilir
+
+    Tarama eksiksiz biterse manifest'te olup diskte bulunmayan dosyalar ve
+    değişen dosyaların eski sürümleri tombstone'lanır. Aynı içerik başka
+    bir yolda hâlâ duruyorsa (checksum paylaşılıyor) tombstone atlanır.
+    Yakın kopya chunk'ları tombstone'lanan dosyaya bağlı olan canlı
+    dosyalar tekrar işlenir; o chunk'lar kanonik olarak yazılır.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        user_id: str,
+        processor=None,
+        extensions: Optional[Iterable[str]] = None,
+        ignored_dirs: Optional[Iterable[str]] = None,
+        ignored_files: Optional[Iterable[str]] = None,
+        state_dir: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.root = os.path.abspath(root)
+        self.user_id = user_id
+        self._processor = processor
+        self.extensions = list(extensions or ALLOWED_EXTENSIONS)
+        if ignored_dirs is None:
+            ignored_dirs = [d.strip() for d in settings.DIRECTORY_SYNC_IGNORED_DIRS.split(",") if d.strip()]
+        self.ignored_dirs = list(ignored_dirs)
+        self.ignored_files = list(ignored_files or [])
+        self.sync_id = hashlib.sha1(f"{user_id}:{self.root}".encode("utf-8")).hexdigest()[:12]
+        self.manifest_path = Path(state_dir or settings.DIRECTORY_SYNC_STATE_DIR) / self.sync_id / "manifest.json"
+        self.on_progress = on_progress
+        self.progress: Dict[str, Any] = {
+            "scanned": 0, "unchanged": 0, "changed": 0, "ingested": 0, "failed": 0,
+            "deleted": 0, "chunks": 0, "duplicates": 0, "tombstoned_chunks": 0, "reingested": 0, "bytes": 0
+        }
+
+    @property
+    def processor(self):
+        # DocumentProcessor embedding modelini yükler; hiç değişiklik yoksa oluşturulmaz
+        if self._processor is None:
+            self._processor = DocumentProcessor()
+        return self._processor
+
+    def _report(self):
+        if self.on_progress is not None:
+            self.on_progress(dict(self.progress))
+
+    async def _scan(self, errors: List[str]) -> AsyncIterator[FileEntry]:
+        """scan_directory'yi thread'de çalıştırıp dosyaları sınırlı bir kuyrukla akıtır"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE * 32)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for entry in scan_directory(
+                    self.root, self.extensions, self.ignored_dirs, self.ignored_files,
+                    workers=settings.DIRECTORY_SYNC_SCAN_WORKERS, errors=errors
+                ):
+                    if stop.is_set():
+                        return
+                    asyncio.run_coroutine_threadsafe(queue.put(entry), loop).result()
+            finally:
+                if not stop.is_set():
+                    asyncio.run_coroutine_threadsafe(queue.put(_SCAN_DONE), loop).result()
+
+        producer = asyncio.ensure_future(asyncio.to_thread(produce))
+        try:
+            while (entry := await queue.get()) is not _SCAN_DONE:
+                self.progress["scanned"] += 1
+                yield entry
+        finally:
+            stop.set()
+            # Kuyruğa yazmayı bekleyen thread serbest kalsın
+            while not queue.empty():
+                queue.get_nowait()
+        await producer
+
+    async def _reingest(self, manifest: SyncManifest, checksums: Set[str]):
+        """
+        Yakın kopya imzaları silinen canlı dosyaları tekrar işler; zaten
+        kayıtlı chunk'lar atlanır, eksik olanlar kanonik olarak yazılır.
+        Dosyalar önce manifest'ten çıkarılır: işlem yarıda kalır ya da
+        başarısız olursa sonraki çalıştırma onları yeni dosya gibi işler.
+        """
+        pending = {}
+        for rel_path in list(manifest.files):
+            checksum = manifest.files[rel_path]["sha256"]
+            if checksum in checksums:
+                entry = manifest.files.pop(rel_path)
+                # Aynı içerik birden çok yolda olabilir; bir kez işlenmesi yeter
+                pending.setdefault(checksum, []).append((rel_path, entry))
+        if not pending:
+            return
+        await manifest.save()
+
+        for checksum, entries in pending.items():
+            rel_path = entries[0][0]
+            try:
+                result = await self.processor.process_document(
+                    os.path.join(self.root, rel_path), None, self.user_id, file_checksum=checksum
+                )
+            except Exception as e:
+                app_logger.error(f"Tekrar işleme hatası: {rel_path} ({str(e)})")
+                self.progress["failed"] += 1
+                continue
+            manifest.files.update(entries)
+            self.progress["reingested"] += 1
+            self.progress["chunks"] += result.get("stored", 0)
+            self.progress["duplicates"] += result.get("duplicates", 0)
+            self._report()
+
+    async def run(self) -> Dict[str, Any]:
+        manifest = await asyncio.to_thread(SyncManifest.load, self.manifest_path, self.root, self.user_id)
+        seen: Set[str] = set()
+        scan_errors: List[str] = []
+        started = time.monotonic()
+        processed = 0
+
+        async def diff(entries):
+            async for entry in entries:
+                seen.add(entry.rel_path)
+                known = manifest.files.get(entry.rel_path)
+                if known and known["mtime_ns"] == entry.mtime_ns and known["size"] == entry.size:
+                    self.progress["unchanged"] += 1
+                    self._report()
+                    continue
+                checksum = await asyncio.to_thread(_sha256, entry.path)
+                if known and known["sha256"] == checksum:
+                    # Sadece dokunulmuş (touch / kopyalama); içerik aynı
+                    known.update(mtime_ns=entry.mtime_ns, size=entry.size)
+                    self.progress["unchanged"] += 1
+                    self._report()
+                    continue
+                self.progress["changed"] += 1
+                yield entry, checksum, known
+
+        async def ingest(items):
+            async for entry, checksum, known in items:
+                try:
+                    result = await self.processor.process_document(entry.path, None, self.user_id, file_checksum=checksum)
+                except Exception as e:
+                    # Manifest'e girmez; bir sonraki çalıştırmada tekrar denenir
+                    app_logger.error(f"Senkronizasyon hatası: {entry.path} ({str(e)})")
+                    metrics.increment("directory_sync_files", status="failed")
+                    self.progress["failed"] += 1
+                    self._report()
+                    continue
+                if known and known["sha256"] != checksum:
+                    manifest.pending_tombstones[known["sha256"]] = entry.rel_path
+                manifest.files[entry.rel_path] = {
+                    "mtime_ns": entry.mtime_ns,
+                    "size": entry.size,
+                    "sha256": checksum,
+                    "chunks": result.get("chunks", 0),
+                    "synced_at": datetime.utcnow().isoformat()
+                }
+                metrics.increment("directory_sync_files", status="ingested")
+                self.progress["ingested"] += 1
+                self.progress["chunks"] += result.get("stored", 0)
+                self.progress["duplicates"] += result.get("duplicates", 0)
+                self.progress["bytes"] += entry.size
+                yield entry.rel_path
+
+        async def checkpoint(paths):
+            nonlocal processed
+            async for rel_path in paths:
+                processed += 1
+                if processed % settings.DIRECTORY_SYNC_CHECKPOINT_EVERY == 0:
+                    await manifest.save()
+                self._report()
+                yield rel_path
+
+        pipeline = IngestionPipeline([
+            Stage("diff", diff, workers=settings.DIRECTORY_SYNC_HASH_WORKERS),
+            Stage("ingest", ingest, workers=settings.DIRECTORY_SYNC_INGEST_WORKERS),
+            Stage("checkpoint", checkpoint)
+        ], queue_size=settings.INGEST_QUEUE_SIZE, name="directory_sync")
+
+        try:
+            stages = await pipeline.run(self._scan(scan_errors))
+        finally:
+            # Hata / kesinti olsa da işlenmiş dosyalar kaybolmasın
+            await manifest.save()
+
+        # Silinenler: tarama eksiksiz bittiği için görülmeyen yollar gerçekten yok
+        deleted = [
+            rel_path for rel_path in manifest.files
+            if rel_path not in seen and not _under(rel_path, scan_errors)
+        ]
+        for rel_path in deleted:
+            entry = manifest.files.pop(rel_path)
+            manifest.pending_tombstones[entry["sha256"]] = rel_path
+        self.progress["deleted"] = len(deleted)
+
+        live = {entry["sha256"] for entry in manifest.files.values()}
+        tombstones = {
+            checksum: os.path.join(self.root, rel_path)
+            for checksum, rel_path in manifest.pending_tombstones.items() if checksum not in live
+        }
+        if tombstones:
+            tombstoned = await (self._processor or DocumentProcessor).tombstone_files(self.user_id, tombstones)
+            self.progress["tombstoned_chunks"] = tombstoned["chunks"]
+            await self._reingest(manifest, set(tombstoned["reingest"]))
+        manifest.pending_tombstones = {}
+
+        manifest.last_run = {
+            "completed_at": datetime.utcnow().isoformat(),
+            "seconds": round(time.monotonic() - started, 3),
+            "progress": dict(self.progress),
+            "scan_errors": scan_errors
+        }
+        await manifest.save()
+        self._report()
+        app_logger.info(
+            "Dizin senkronize edildi: %s (%d tarandı, %d değişmemiş, %d işlendi, %d hatalı, %d silindi)",
+            self.root, self.progress["scanned"], self.progress["unchanged"], self.progress["ingested"],
+            self.progress["failed"], self.progress["deleted"]
+        )
+        return {**self.progress, "sync_id": self.sync_id, "manifest": str(self.manifest_path), "stages": stages}
@@ -1,4 +1,4 @@
-from core.database.models import RAGDocument
+from core.database.models import RAGChunkBand, RAGChunkSignature, RAGDocument, RAGFileTombstone
 from core.schemas.enums import ProcessingStatus
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -7,78 +7,507 @@ from langchain.schema import Document
 import uuid
 from pathlib import Path
 import pickle
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import delete, exists, func, select
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
 from fastapi import HTTPException
 from config.logger import app_logger
 from core.services.file_upload import FileUploadService
 from core.database.session import AsyncSessionLocal
 from core.schemas.enums import FileType
-import chardet
+from core.rag.quantization import encode_embedding_blob
+from core.services.ingestion_pipeline import IngestionPipeline, Stage, batched
+from core.services.metrics import metrics
+from core.services.parse_cache import get_parse_cache
+from core.services.text_decoding import text_decoding
+from core.services.pdf_strategy import LAYOUT, TEXT, get_pdf_strategy_selector, profile_page
+from config.settings import settings
 import hashlib
+import importlib.metadata
 from unstructured.partition.auto import partition
 from unstructured.partition.pdf import partition_pdf
 from pi_heif import register_heif_opener
 import os
 import asyncio
+import tempfile
+import time
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 
 # PDF/DOCX Processing
-from pypdf import PdfReader
+from pypdf import PdfReader, PdfWriter
 from docx import Document as DocxDocument
 
-# Chunking - DÜZELTİLMİŞ IMPORT
-from langchain_experimental.text_splitter import SemanticChunker, BreakpointThresholdType
+# Chunking
+from core.rag.semantic_chunker import SemanticTextChunker
+from core.rag.near_duplicates import LSHIndex, MinHasher, band_keys, signature_from_bytes, signature_to_bytes
+import numpy as np
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+CHUNKING_METHOD = "semantic_v3"
+
+# Önbelleğe yazılan öğe biçimi ya da yol seçimi değişirse artırılır; eski kayıtlar geçersiz olur
+PARSE_CACHE_FORMAT = 3
+_PARSER_PACKAGES = {
+    "python-docx": ("python-docx",),
+    "pdf-router": ("pypdf", "unstructured")
+}
+
+def _parser_version(parser: str) -> str:
+    """Önbellek anahtarındaki sürüm: öğe biçimi + parser kütüphanelerinin sürümleri"""
+    versions = []
+    for package in _PARSER_PACKAGES.get(parser, (parser,)):
+        try:
+            versions.append(importlib.metadata.version(package))
+        except importlib.metadata.PackageNotFoundError:
+            versions.append("unknown")
+    return ":".join([str(PARSE_CACHE_FORMAT), *versions])
 
 class DocumentProcessor:
     def __init__(self):
         self.embedding_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+            model_name=EMBEDDING_MODEL_NAME
         )
         self.processed_dir = Path("processed_documents")
         self.processed_dir.mkdir(exist_ok=True)
+        self.minhasher = MinHasher(settings.NEAR_DUP_NUM_PERM, settings.NEAR_DUP_SHINGLE)
 
     async def process_document(
         self,
         file_path: str,
-        text_content: str,
+        text_content: Optional[str],
         user_id: str,
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
-        max_file_size: int = 50 * 1024 * 1024
-    ) -> List[RAGDocument]:
+        max_file_size: int = settings.CHUNKED_UPLOAD_MAX_SIZE,
+        file_checksum: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Güncellenmiş belge işleme akışı:
-        1. Doğrudan gelen içeriği kullan
-        2. Semantik chunking
-        3. Veritabanına kayıt
+        Aşamalı (pipeline) belge işleme akışı:
+        1. Sayfa sayfa ayrıştırma (dosya bütün olarak belleğe alınmaz, sayfalar thread'de okunur)
+        2. Cümle embedding'leri (sayfa başına, INGEST_EMBED_WORKERS eşzamanlı)
+        3. Semantik chunking (sayfa sınırında kalan son parça sonraki sayfayla birleştirilir);
+           chunk embedding'i cümle vektörlerinin ortalamasıdır, chunk'lar tekrar gömülmez
+        4. Veritabanına toplu kayıt (her batch ayrı commit -> kısmi ilerleme kalıcı);
+           NEAR_DUP_ENABLED ise önceki bir chunk'ın yakın kopyası olan chunk'lar
+           RAGDocument olarak yazılmaz, sadece kanonik chunk'a bağlanır
+
+        Aşamalar sınırlı kuyruklarla bağlıdır; yavaş aşama üst aşamayı
+        bekletir. Aynı dosya (checksum) tekrar işlenirse kaydı zaten yazılmış
+        chunk'lar atlanır, yarıda kalan işlem kaldığı yerden devam eder.
         """
         try:
-            # 1. Gelen içeriği temizle
-            #cleaned_content = self._clean_text(text_content)
-            
-            # 2. Semantik Chunking
-            chunks = await self._semantic_chunking(
-                text_content,
-                chunk_size,
-                chunk_overlap
+            if file_checksum is None:
+                file_checksum = await asyncio.to_thread(self._file_checksum, file_path)
+            await self._lift_tombstone(user_id, file_checksum)
+            done = await self._stored_chunk_indexes(user_id, file_checksum)
+            file_size = os.path.getsize(file_path)
+            file_type = os.path.splitext(file_path)[1][1:].upper()
+            chunker = self._create_semantic_chunker()
+            counts = {"chunks": 0, "skipped": 0, "stored": 0, "duplicates": 0}
+            # Bu çalıştırmada kaydedilen ve veritabanından aday olarak gelen kanonik chunk imzaları
+            lsh = LSHIndex(settings.NEAR_DUP_BANDS) if settings.NEAR_DUP_ENABLED else None
+            # PDF'lerde seçilen ayrıştırma yolu ve yol başına süre (_pdf_elements doldurur)
+            parse_report: Dict[str, Any] = {}
+
+            async def parse_pages(paths):
+                async for path in paths:
+                    async for page in self._iter_pages(path, text_content, file_checksum, parse_report):
+                        yield page
+
+            async def split_pages(pages):
+                # Sayfa sırası chunk aşamasında geri kurulur; sıra numarası burada verilir
+                seq = 0
+                async for page in pages:
+                    sentences = chunker.split_sentences(page)
+                    if sentences:
+                        yield seq, sentences
+                        seq += 1
+
+            async def embed_pages(items):
+                async for seq, sentences in items:
+                    vectors = await asyncio.to_thread(chunker.embed, sentences)
+                    yield seq, sentences, vectors
+
+            async def chunk_pages(items):
+                # Tek worker: embedding worker'larından sırasız gelen sayfalar sıraya konur
+                pending = {}
+                next_seq = 0
+                carry_sentences, carry_vectors = [], None
+                # Devreden parçanın ilk satırları önceki chunk'ın cümleleriyle birlikte gömüldü mü
+                carry_context = False
+                async for seq, sentences, vectors in items:
+                    pending[seq] = (sentences, vectors)
+                    while next_seq in pending:
+                        sentences, vectors = pending.pop(next_seq)
+                        next_seq += 1
+                        context_before = bool(carry_sentences) and carry_context
+                        if carry_sentences:
+                            sentences = carry_sentences + sentences
+                            vectors = np.vstack([carry_vectors, vectors])
+                        groups = await asyncio.to_thread(chunker.group, sentences, vectors, context_before)
+                        carry_sentences, carry_vectors = [], None
+                        # Son parça bir sonraki sayfada devam ediyor olabilir; çok büyümedikçe bekletilir
+                        if groups and len(groups[-1][0]) < chunk_size * 4:
+                            _, _, span = groups.pop()
+                            carry_sentences, carry_vectors = sentences[span], vectors[span]
+                            carry_context = span.start > 0 or context_before
+                        for chunk, vector, _ in groups:
+                            yield chunk, vector
+                if carry_sentences:
+                    # Belgenin sonu: sadece baş kenarda komşu cümleler olabilir
+                    yield " ".join(carry_sentences), chunker.pool_span(
+                        carry_vectors, 0, len(carry_vectors), carry_context, False
+                    )
+
+            async def index_chunks(chunks):
+                async for chunk, vector in chunks:
+                    index = counts["chunks"]
+                    counts["chunks"] += 1
+                    if index in done:
+                        counts["skipped"] += 1
+                        continue
+                    yield index, self._clean_text(chunk), vector.tolist()
+
+            async def store_batches(items):
+                async for batch in batched(items, settings.INGEST_STORE_BATCH):
+                    duplicates = await self._store_chunk_batch(
+                        batch,
+                        file_path=file_path,
+                        user_id=user_id,
+                        file_checksum=file_checksum,
+                        file_size=file_size,
+                        file_type=file_type,
+                        parse_route=parse_report.get("route"),
+                        lsh=lsh
+                    )
+                    counts["stored"] += len(batch) - duplicates
+                    counts["duplicates"] += duplicates
+                    yield len(batch)
+
+            async def source():
+                yield file_path
+
+            pipeline = IngestionPipeline([
+                Stage("parse", parse_pages),
+                Stage("sentences", split_pages),
+                Stage("embed", embed_pages, workers=settings.INGEST_EMBED_WORKERS),
+                Stage("chunk", lambda items: index_chunks(chunk_pages(items))),
+                Stage("store", store_batches, workers=settings.INGEST_STORE_WORKERS)
+            ], queue_size=settings.INGEST_QUEUE_SIZE, name="document")
+
+            stages = await pipeline.run(source())
+            app_logger.info(
+                "Belge işlendi: %s (%d chunk, %d atlandı, %d kaydedildi, %d yakın kopya, ayrıştırma: %s)",
+                file_path, counts["chunks"], counts["skipped"], counts["stored"], counts["duplicates"],
+                parse_report or "-"
             )
-            
-            # 3. Veritabanına Toplu Kayıt
-            return await self._bulk_insert_chunks(
-                file_path=file_path,
-                user_id=user_id,
-                chunks=chunks,
-                original_content=text_content
-            )
-            
+            return {**counts, "file_checksum": file_checksum, "parse": parse_report, "stages": stages}
+
+        except HTTPException:
+            raise
         except Exception as e:
             app_logger.error(f"Belge işleme hatası: {str(e)}")
             raise HTTPException(500, "Belge işlenemedi")
 
+    def _file_checksum(self, file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while block := f.read(settings.UPLOAD_CHUNK_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+
+    async def _stored_chunk_indexes(self, user_id: str, file_checksum: str) -> Set[int]:
+        """Önceki (yarıda kalmış) işlemden kalan chunk kayıtları (yakın kopya olarak bağlananlar dahil)"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(RAGDocument.meta_data).where(
+                    RAGDocument.user_id == user_id,
+                    RAGDocument.file_checksum == file_checksum,
+                    RAGDocument.chunking_method == CHUNKING_METHOD
+                )
+            )
+            indexes = {
+                meta["chunk_index"] for meta in result.scalars()
+                if meta and meta.get("chunk_index") is not None
+            }
+            duplicates = await session.execute(
+                select(RAGChunkSignature.chunk_index).where(
+                    RAGChunkSignature.user_id == user_id,
+                    RAGChunkSignature.file_checksum == file_checksum,
+                    RAGChunkSignature.canonical_id.is_not(None),
+                    RAGChunkSignature.signature_version == self.minhasher.version,
+                    # Kanoniği hiç yazılmamış (batch'i geri alınmış) kopyalar tamamlanmış sayılmaz
+                    exists().where(RAGDocument.id == RAGChunkSignature.canonical_id)
+                )
+            )
+            indexes.update(index for index in duplicates.scalars() if index is not None)
+            return indexes
+
+    async def _lift_tombstone(self, user_id: str, file_checksum: str):
+        """Silinmiş olarak işaretlenen içerik tekrar geldiyse mevcut chunk'lar yeniden görünür olur"""
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(RAGFileTombstone).where(
+                    RAGFileTombstone.user_id == user_id,
+                    RAGFileTombstone.file_checksum == file_checksum
+                )
+            )
+            await session.commit()
+
+    @staticmethod
+    async def tombstone_files(user_id: str, files: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Kaynağı silinen dosyaların chunk'larını silindi olarak işaretler.
+
+        Canlı dosyaların, bu dosyalardaki bir chunk'a bağlanmış yakın kopya
+        imzaları silinir: o chunk'ların kendi RAGDocument satırı yok ve
+        metni saklanmadığı için ancak dosya tekrar işlenerek (artık kanonik
+        olarak) geri gelirler.
+
+        files: checksum -> dosya yolu.
+        Returns: {"chunks": işaretlenen chunk sayısı, "reingest": tekrar işlenmesi gereken checksum'lar}
+        """
+        if not files:
+            return {"chunks": 0, "reingest": []}
+        async with AsyncSessionLocal() as session:
+            try:
+                existing = await session.execute(
+                    select(RAGFileTombstone.file_checksum).where(
+                        RAGFileTombstone.user_id == user_id,
+                        RAGFileTombstone.file_checksum.in_(list(files))
+                    )
+                )
+                already = set(existing.scalars())
+                deleted_at = datetime.utcnow()
+                session.add_all(
+                    RAGFileTombstone(user_id=user_id, file_checksum=checksum, file_path=path, deleted_at=deleted_at)
+                    for checksum, path in files.items() if checksum not in already
+                )
+                chunks = await session.execute(
+                    select(func.count(RAGDocument.id)).where(
+                        RAGDocument.user_id == user_id,
+                        RAGDocument.file_checksum.in_(list(files))
+                    )
+                )
+
+                # Kanoniği silinen dosyada kalan, kendisi canlı yakın kopyalar
+                orphaned = (
+                    RAGChunkSignature.user_id == user_id,
+                    RAGChunkSignature.canonical_id.in_(
+                        select(RAGDocument.id).where(
+                            RAGDocument.user_id == user_id,
+                            RAGDocument.file_checksum.in_(list(files))
+                        )
+                    ),
+                    RAGChunkSignature.file_checksum.not_in(list(files)),
+                    ~exists().where(
+                        RAGFileTombstone.user_id == user_id,
+                        RAGFileTombstone.file_checksum == RAGChunkSignature.file_checksum
+                    )
+                )
+                orphaned_files = await session.execute(
+                    select(RAGChunkSignature.file_checksum).where(*orphaned).distinct()
+                )
+                reingest = sorted(orphaned_files.scalars())
+                if reingest:
+                    await session.execute(delete(RAGChunkSignature).where(*orphaned))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                app_logger.error(f"Tombstone kayıt hatası: {str(e)}")
+                raise HTTPException(500, "Veritabanı işlemi başarısız")
+        count = int(chunks.scalar() or 0)
+        metrics.increment("ingest_tombstoned_chunks", value=count)
+        if reingest:
+            app_logger.info("Kanoniği silinen yakın kopyalar için %d dosya tekrar işlenecek", len(reingest))
+        return {"chunks": count, "reingest": reingest}
+
+    def _docx_elements(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """DOCX'te sayfa bilgisi yok; 50 paragraflık bloklar sayfa yerine geçer"""
+        for index, paragraph in enumerate(DocxDocument(file_path).paragraphs):
+            yield {"type": "Paragraph", "text": paragraph.text, "page": index // 50 + 1}
+
+    def _partition(self, file_path: str, strategy: str) -> List[Dict[str, Any]]:
+        """Unstructured layout ayrıştırması; tablolar HTML'leriyle birlikte saklanır"""
+        elements = partition_pdf(
+            filename=file_path,
+            strategy=strategy,
+            infer_table_structure=True,
+            languages=["tur", "eng"]
+        )
+        items = []
+        for element in elements:
+            metadata = getattr(element, "metadata", None)
+            item = {
+                "type": getattr(element, "category", type(element).__name__),
+                "text": str(element),
+                "page": getattr(metadata, "page_number", None),
+                "strategy": LAYOUT
+            }
+            html = getattr(metadata, "text_as_html", None)
+            if html:
+                item["html"] = html
+            items.append(item)
+        return items
+
+    def _partition_page(self, reader: PdfReader, page_index: int, strategy: str) -> List[Dict[str, Any]]:
+        """Tek sayfayı geçici bir PDF'e çıkarıp layout yoluyla ayrıştırır"""
+        writer = PdfWriter()
+        writer.add_page(reader.pages[page_index])
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            writer.write(tmp)
+        try:
+            items = self._partition(tmp.name, strategy)
+        finally:
+            os.unlink(tmp.name)
+        for item in items:
+            item["page"] = page_index + 1
+        return items
+
+    @staticmethod
+    def _record_parse(report: Dict[str, Any], strategy: str, seconds: float, pages: int = 1):
+        report["pages"][strategy] = report["pages"].get(strategy, 0) + pages
+        report["seconds"][strategy] = report["seconds"].get(strategy, 0.0) + seconds
+        metrics.observe("pdf_parse_seconds", seconds, strategy=strategy)
+
+    def _pdf_elements(self, file_path: str, report: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        PDF'i seçilen yoldan ayrıştırır.
+
+        Örnek sayfaların metin katmanı yeterliyse doküman pypdf ile (hızlı),
+        hiçbiri yeterli değilse unstructured ile (layout) okunur. Örnekler
+        sadece birkaç sayfadır; text ve karışık yolda her sayfa yine ayrı
+        değerlendirilir, örneklere girmeyen taranmış sayfa layout'a düşer.
+        PDF_PARSE_MODE=text ile zorlanan yolda sayfa kontrolü yapılmaz.
+        Seçilen yol ve yol başına süre report'a ve metriklere yazılır.
+        """
+        reader = PdfReader(file_path)
+        layout_strategy = settings.PDF_LAYOUT_STRATEGY
+        selector = get_pdf_strategy_selector()
+        mode = settings.PDF_PARSE_MODE
+        route = mode if mode in (TEXT, LAYOUT) else selector.select_document(reader)
+        report["route"] = route
+        metrics.increment("pdf_parse_route", route=route)
+        app_logger.info("PDF ayrıştırma yolu: %s (%s, %d sayfa)", route, file_path, len(reader.pages))
+
+        if route == LAYOUT:
+            started = time.monotonic()
+            items = self._partition(file_path, layout_strategy)
+            self._record_parse(report, LAYOUT, time.monotonic() - started, pages=len(reader.pages))
+            yield from items
+            return
+
+        for page_index, page in enumerate(reader.pages):
+            started = time.monotonic()
+            text = page.extract_text() or ""
+            strategy = TEXT
+            if mode != TEXT:
+                strategy = selector.choose(profile_page(page, text))
+            if strategy == LAYOUT:
+                items = self._partition_page(reader, page_index, layout_strategy)
+            else:
+                items = [{"type": "Page", "text": text, "page": page_index + 1, "strategy": TEXT}]
+            self._record_parse(report, strategy, time.monotonic() - started)
+            yield from items
+
+    def _cached_elements(
+        self,
+        file_path: str,
+        file_checksum: Optional[str],
+        parser: str,
+        strategy: str,
+        parse: Callable[[], Iterator[Dict[str, Any]]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Ayrıştırma önbelleği açıksa (sha256, parser, strategy, version) anahtarıyla okur/yazar"""
+        cache = get_parse_cache()
+        if cache is None:
+            return parse()
+        if file_checksum is None:
+            file_checksum = self._file_checksum(file_path)
+        return cache.get_or_parse(file_checksum, parser, strategy, _parser_version(parser), parse)
+
+    @staticmethod
+    def _group_pages(elements: Iterator[Dict[str, Any]]) -> Iterator[str]:
+        """Ardışık aynı sayfa numaralı öğeleri tek sayfa metni olarak birleştirir"""
+        current_page, texts = None, []
+        for element in elements:
+            if texts and element.get("page") != current_page:
+                yield "\n\n".join(texts)
+                texts = []
+            current_page = element.get("page")
+            if element.get("text"):
+                texts.append(element["text"])
+        if texts:
+            yield "\n\n".join(texts)
+
+    def _iter_pages_sync(
+        self,
+        file_path: str,
+        file_checksum: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """Dosyayı sayfa (ya da sayfa büyüklüğünde blok) olarak okur"""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext == ".pdf":
+            if report is None:
+                report = {}
+            # Önbellekten okunursa _pdf_elements çalışmaz; yol "cache" olarak kalır
+            report.update(route="cache", pages={}, seconds={})
+            selection = (
+                f"{settings.PDF_PARSE_MODE}/{settings.PDF_LAYOUT_STRATEGY}/{settings.PDF_TEXT_MIN_DENSITY}/"
+                f"{settings.PDF_LAYOUT_MAX_IMAGES}/{settings.PDF_LAYOUT_SHORT_LINE_RATIO}/{settings.PDF_STRATEGY_SAMPLE_PAGES}"
+            )
+            yield from self._group_pages(self._cached_elements(
+                file_path, file_checksum, "pdf-router", selection,
+                lambda: self._pdf_elements(file_path, report)
+            ))
+        elif file_ext == ".docx":
+            yield from self._group_pages(self._cached_elements(
+                file_path, file_checksum, "python-docx", "paragraphs",
+                lambda: self._docx_elements(file_path)
+            ))
+        elif file_ext in (".txt", ".md"):
+            # Düz metin ayrıştırılmaz; önbelleğe almaya değmez
+            block = ""
+            for piece in text_decoding.iter_decode(file_path):
+                block += piece
+                # Bloklar satır sonunda kesilir
+                while len(block) >= settings.INGEST_TEXT_BLOCK_CHARS:
+                    cut = block.rfind("\n", 0, settings.INGEST_TEXT_BLOCK_CHARS) + 1 or settings.INGEST_TEXT_BLOCK_CHARS
+                    yield block[:cut]
+                    block = block[cut:]
+            if block:
+                yield block
+        else:
+            raise ValueError(f"Desteklenmeyen dosya formatı: {file_ext}")
+
+    async def _iter_pages(
+        self,
+        file_path: str,
+        text_content: Optional[str] = None,
+        file_checksum: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Sayfaları thread'de tek tek ayrıştırır; dosya okunamıyorsa gelen metni tek sayfa sayar"""
+        try:
+            pages = self._iter_pages_sync(file_path, file_checksum, report)
+            first = await asyncio.to_thread(next, pages, None)
+        except Exception as e:
+            if not text_content:
+                raise
+            app_logger.warning(f"Sayfa sayfa okunamadı, yüklenen metin kullanılıyor: {str(e)}")
+            yield text_content
+            return
+
+        page = first
+        while page is not None:
+            metrics.increment("ingest_pages_parsed")
+            if page.strip():
+                yield page
+            page = await asyncio.to_thread(next, pages, None)
+
     def _validate_file(self, file_path: str, max_size: int):
         """Dosya validasyonu"""
         # Tip kontrolü ekleyelim
@@ -89,7 +518,7 @@ class DocumentProcessor:
             raise HTTPException(404, "Dosya bulunamadı")
             
         if os.path.getsize(file_path) > max_size:
-            raise HTTPException(413, "Dosya boyutu limiti aşıldı (50MB)")
+            raise HTTPException(413, f"Dosya boyutu limiti aşıldı ({max_size // (1024 * 1024)}MB)")
 
     async def _extract_text(self, file_path: str) -> str:
         """Dosya türüne göre metin çıkarımı"""
@@ -112,31 +541,12 @@ class DocumentProcessor:
             raise HTTPException(500, "Dosya içeriği okunamadı")
 
 
-    # PDF'den metin çıkarımı
-
     async def _read_pdf(self, file_path: str) -> str:
-        """PDF'den metin çıkarımı (Unstructured ile, OCR devre dışı)"""
-        from unstructured.partition.pdf import partition_pdf
-
-        elements = partition_pdf(
-            filename=file_path,
-            strategy="hi_res",         # "auto" yerine "hi_res" veya "fast" vb. kullanılabilir
-            infer_table_structure=True,
-            languages=["tur", "eng"],
-            ocr_strategy="none"        # <-- OCR kapalı
-        )
-        return "\n\n".join([str(e) for e in elements])
-
+        """PDF'den metin çıkarımı; sayfa başına metin katmanı ya da layout yolu otomatik seçilir"""
+        def sync_read():
+            return "\n\n".join(self._iter_pages_sync(file_path))
 
-    async def _read_pdf(self, file_path: str) -> str:
-        """PDF'den metin çıkarımı (Unstructured ile)"""
-        elements = partition_pdf(
-            filename=file_path,
-            strategy="auto",
-            infer_table_structure=True,
-            languages=["tur", "eng"]
-        )
-        return "\n\n".join([str(e) for e in elements])
+        return await asyncio.to_thread(sync_read)
 
     async def _read_docx(self, file_path: str) -> str:
         """DOCX'ten metin çıkarımı"""
@@ -146,6 +556,15 @@ class DocumentProcessor:
             
         return await asyncio.to_thread(sync_read)
 
+    def _create_semantic_chunker(self):
+        return SemanticTextChunker(
+            self.embedding_model.embed_documents,
+            threshold_type="percentile",  # Default strategy
+            threshold_amount=85,  # 85th percentile cutoff
+            min_chunk_size=100,  # Minimum characters per chunk
+            batch_size=settings.INGEST_EMBED_BATCH
+        )
+
     async def _semantic_chunking(
         self,
         text: str,
@@ -153,90 +572,165 @@ class DocumentProcessor:
         chunk_overlap: int
     ) -> List[str]:
         """Advanced semantic chunking with multiple threshold strategies"""
-        chunker = SemanticChunker(
-            embeddings=self.embedding_model,
-            breakpoint_threshold_type=BreakpointThresholdType.PERCENTILE,  # Default strategy
-            breakpoint_threshold_amount=85,  # 85th percentile cutoff
-            min_chunk_size=100  # Minimum characters per chunk
-        )
-        
-        return await asyncio.to_thread(
-            chunker.split_text,
-            text=text,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+        # Sınırlar anlamsal kırılımlardan belirlenir; chunk_size/overlap kullanılmaz
+        chunker = self._create_semantic_chunker()
+        return await asyncio.to_thread(chunker.split_text, text)
 
     # Optional alternative strategies
     def _create_standard_deviation_chunker(self):
-        return SemanticChunker(
-            embeddings=self.embedding_model,
-            breakpoint_threshold_type=BreakpointThresholdType.STANDARD_DEVIATION,
-            breakpoint_threshold_amount=2.5  # 2.5 standard deviations
+        return SemanticTextChunker(
+            self.embedding_model.embed_documents,
+            threshold_type="standard_deviation",
+            threshold_amount=2.5  # 2.5 standard deviations
         )
 
     def _create_interquartile_chunker(self):
-        return SemanticChunker(
-            embeddings=self.embedding_model,
-            breakpoint_threshold_type=BreakpointThresholdType.INTERQUARTILE,
-            breakpoint_threshold_amount=1.8  # 1.8 * IQR
+        return SemanticTextChunker(
+            self.embedding_model.embed_documents,
+            threshold_type="interquartile",
+            threshold_amount=1.8  # 1.8 * IQR
         )
 
     def _create_gradient_chunker(self):
-        return SemanticChunker(
-            embeddings=self.embedding_model,
-            breakpoint_threshold_type="gradient",  # Experimental gradient method
-            breakpoint_threshold_amount=90  # 90th percentile on gradient
+        return SemanticTextChunker(
+            self.embedding_model.embed_documents,
+            threshold_type="gradient",  # Gradient of adjacent distances
+            threshold_amount=90  # 90th percentile on gradient
         )
 
-    async def _bulk_insert_chunks(
+    async def _near_duplicate_candidates(
         self,
+        session: AsyncSession,
+        user_id: str,
+        keys: List[str],
+        lsh: LSHIndex
+    ):
+        """Bant anahtarı eşleşen, daha önce kaydedilmiş kanonik chunk'ları LSH indeksine ekler"""
+        unique_keys = sorted(set(keys))
+        # IN listesi sürücülerin parametre sınırını aşmasın diye parçalanır
+        for start in range(0, len(unique_keys), 500):
+            result = await session.execute(
+                select(RAGChunkBand.band_key, RAGChunkSignature.document_id, RAGChunkSignature.minhash)
+                .join(RAGChunkSignature, RAGChunkSignature.document_id == RAGChunkBand.document_id)
+                .where(
+                    RAGChunkBand.user_id == user_id,
+                    RAGChunkBand.band_key.in_(unique_keys[start:start + 500]),
+                    RAGChunkSignature.signature_version == self.minhasher.version,
+                    # Kaynağı silinmiş chunk'lar kanonik olamaz
+                    ~exists().where(
+                        RAGFileTombstone.user_id == user_id,
+                        RAGFileTombstone.file_checksum == RAGChunkSignature.file_checksum
+                    )
+                )
+            )
+            for band_key, document_id, minhash in result:
+                lsh.add(document_id, signature_from_bytes(minhash), [band_key])
+
+    async def _store_chunk_batch(
+        self,
+        batch: List[Tuple[int, str, List[float]]],
         file_path: str,
         user_id: str,
-        chunks: List[str],
-        original_content: str
-    ) -> List[RAGDocument]:
-        """Toplu veri ekleme ile performans optimizasyonu"""
-        file_checksum = hashlib.sha256(original_content.encode()).hexdigest()
-        file_size = os.path.getsize(file_path)
-        file_type = os.path.splitext(file_path)[1][1:].upper()
-        created_at = datetime.utcnow()
+        file_checksum: str,
+        file_size: int,
+        file_type: str,
+        parse_route: Optional[str] = None,
+        lsh: Optional[LSHIndex] = None
+    ) -> int:
+        """
+        Bir embedding batch'ini tek commit'le kaydeder, yakın kopya sayısını döndürür.
 
-        # RAGDocument nesnelerini oluştur
-        documents = [
-            RAGDocument(
-                title=f"{os.path.basename(file_path)} - Chunk {i}",
-                content=self._clean_text(chunk),
-                user_id=user_id,
-                file_path=file_path,
-                file_type=file_type,
-                file_size=file_size,
-                file_checksum=file_checksum,
-                processing_status=ProcessingStatus.PROCESSED,
-                chunk_size=len(chunk),
-                chunk_index=i,
-                created_at=created_at,
-                updated_at=created_at,
-                metadata={
-                    "chunking_method": "semantic_v2",
-                    "language": "turkish",
-                    "checksum": hashlib.sha256(chunk.encode()).hexdigest()
-                }
-            )
-            for i, chunk in enumerate(chunks)
-        ]
+        lsh verilirse her chunk'ın MinHash imzası, bu çalıştırmada kaydedilen
+        ve kullanıcının önceki belgelerindeki chunk'larla karşılaştırılır.
+        Benzerliği NEAR_DUP_THRESHOLD'u geçen chunk için RAGDocument (ve
+        dolayısıyla embedding / indeks kaydı) oluşturulmaz; sadece kanonik
+        chunk'a bağlanan imza satırı yazılır.
+        """
+        created_at = datetime.utcnow()
+        signatures = await asyncio.to_thread(self.minhasher.signatures, [chunk for _, chunk, _ in batch]) if lsh else []
+        keys = [band_keys(signature, lsh.bands) for signature in signatures]
+        documents, rows = [], []
+        duplicates = 0
+        # Bu batch'in kanonikleri ortak indekse commit'ten sonra eklenir: diğer
+        # store worker'ı henüz yazılmamış (ve geri alınabilecek) bir chunk'a bağlanmasın.
+        # Batch içi kopyalar için ayrı bir indeks kullanılır.
+        batch_lsh = LSHIndex(lsh.bands) if lsh else None
+        pending = []
 
-        # Toplu veritabanı işlemi
         async with AsyncSessionLocal() as session:
             try:
-                session.add_all(documents)
+                if lsh:
+                    await self._near_duplicate_candidates(session, user_id, [k for item in keys for k in item], lsh)
+
+                for position, (index, chunk, vector) in enumerate(batch):
+                    document_id = str(uuid.uuid4())
+                    if lsh:
+                        signature = signatures[position]
+                        matches = [
+                            found for found in (
+                                lsh.query(signature, settings.NEAR_DUP_THRESHOLD, keys[position]),
+                                batch_lsh.query(signature, settings.NEAR_DUP_THRESHOLD, keys[position])
+                            ) if found
+                        ]
+                        match = max(matches, key=lambda found: found[1]) if matches else None
+                        rows.append(RAGChunkSignature(
+                            document_id=None if match else document_id,
+                            canonical_id=match[0] if match else None,
+                            similarity=match[1] if match else None,
+                            user_id=user_id,
+                            file_checksum=file_checksum,
+                            chunk_index=index,
+                            signature_version=self.minhasher.version,
+                            minhash=signature_to_bytes(signature),
+                            created_at=created_at
+                        ))
+                        if match:
+                            duplicates += 1
+                            continue
+                        batch_lsh.add(document_id, signature, keys[position])
+                        pending.append((document_id, signature, keys[position]))
+                        rows.extend(
+                            RAGChunkBand(band_key=band_key, document_id=document_id, user_id=user_id)
+                            for band_key in keys[position]
+                        )
+
+                    documents.append(RAGDocument(
+                        id=document_id,
+                        title=f"{os.path.basename(file_path)} - Chunk {index}",
+                        content=chunk,
+                        user_id=user_id,
+                        file_path=file_path,
+                        file_size=file_size,
+                        file_checksum=file_checksum,
+                        processing_status=ProcessingStatus.completed,
+                        chunk_size=len(chunk),
+                        embeddings=encode_embedding_blob(vector, settings.EMBEDDING_BLOB_TIER),
+                        embedding_model=EMBEDDING_MODEL_NAME,
+                        chunking_method=CHUNKING_METHOD,
+                        created_at=created_at,
+                        updated_at=created_at,
+                        meta_data={
+                            "chunk_index": index,
+                            "source_file_type": file_type,
+                            "parse_route": parse_route,
+                            "language": "turkish",
+                            "checksum": hashlib.sha256(chunk.encode()).hexdigest()
+                        }
+                    ))
+
+                session.add_all(documents + rows)
                 await session.commit()
-                return documents
             except Exception as e:
                 await session.rollback()
                 app_logger.error(f"Veritabanı kayıt hatası: {str(e)}")
                 raise HTTPException(500, "Veritabanı işlemi başarısız")
 
+        for document_id, signature, signature_keys in pending:
+            lsh.add(document_id, signature, signature_keys)
+        if duplicates:
+            metrics.increment("ingest_near_duplicates", value=duplicates)
+        return duplicates
+
     def _detect_file_type(self, filename: str) -> str:
         ext = filename.split(".")[-1].lower()
         if ext in ["pdf", "docx", "txt", "md"]:
@@ -251,7 +745,13 @@ class DocumentProcessor:
     async def get_user_documents(self, user_id: str):
         result = await self.db.execute(
             select(RAGDocument)
-            .filter(RAGDocument.user_id == user_id)
+            .filter(
+                RAGDocument.user_id == user_id,
+                ~exists().where(
+                    RAGFileTombstone.user_id == RAGDocument.user_id,
+                    RAGFileTombstone.file_checksum == RAGDocument.file_checksum
+                )
+            )
             .order_by(RAGDocument.created_at.desc())
         )
         return result.scalars().all()
@@ -286,7 +786,8 @@ class DocumentProcessor:
         try:
             # Numpy array'i bytes'a çevirme
             embeddings = self.embedding_model.embed_documents([chunk.page_content for chunk in chunks])
-            return [emb.tobytes() for emb in embeddings]  # Numpy array -> bytes
+            # Ayarlı katmanda (float32/float16/int8/binary) bytes'a çevir
+            return [encode_embedding_blob(emb, settings.EMBEDDING_BLOB_TIER) for emb in embeddings]
         except Exception as e:
             app_logger.error(f"Embedding hatası: {str(e)}")
             raise 
@@ -294,18 +795,8 @@ class DocumentProcessor:
     async def read_file_content(self, content: bytes, file_extension: str) -> str:
         """Dosya içeriğini doğru encoding ile okur"""
         try:
-            # 1. Encoding tespiti
-            detected = chardet.detect(content)
-            encoding = detected['encoding'] or 'utf-8'
-            
-            # 2. Türkçe karakterler için özel handling
-            try:
-                return content.decode(encoding)
-            except UnicodeDecodeError:
-                return content.decode('iso-8859-1')  # Fallback encoding
-            except LookupError:
-                return content.decode('utf-8', errors='replace')
-            
+            text, _ = await asyncio.to_thread(text_decoding.decode, content)
+            return text
         except Exception as e:
             app_logger.warning(f"Dosya içeriği okunamadı ({file_extension}): {str(e)}")
             return "" 
@@ -317,12 +808,8 @@ class DocumentProcessor:
 
     async def _adaptive_chunking(self, text: str) -> List[str]:
         """Bağlama duyarlı chunklama"""
-       # from semantic_chunking import SemanticChunker
-        chunker = SemanticChunker(
-            breakpoint_threshold_type="percentile",
-            breakpoint_threshold_amount=85
-        )
-        return chunker.split_text(text)
+        chunker = self._create_semantic_chunker()
+        return await asyncio.to_thread(chunker.split_text, text)
 
     async def _batch_embedding(self, chunks: List[str]) -> List[List[float]]:
         """Toplu embedding işlemi"""
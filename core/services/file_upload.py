@@ -2,12 +2,16 @@ import hashlib
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
 import uuid
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 from config.logger import app_logger
+from config.settings import settings
 from core.schemas.enums import FileType
+from core.services.text_decoding import text_decoding
 from PyPDF2 import PdfReader
 from docx import Document
-import io
+import asyncio
+
+ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.txt', '.md'}
 
 class FileUploadService:
     def __init__(self):
@@ -17,26 +21,66 @@ class FileUploadService:
         self.processed_dir = Path("processed_documents")
         self.processed_dir.mkdir(exist_ok=True)
 
-    async def read_file_content(self, content: bytes, file_extension: str) -> str:
-        """Dosya içeriğini okur ve metin olarak döndürür."""
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+
+    def _iter_text_sync(self, file_path: Path, file_extension: str) -> Iterator[str]:
+        if file_extension == '.pdf':
+            # PdfReader dosyayı yoldan açar; sayfalar ihtiyaç oldukça okunur
+            for page in PdfReader(str(file_path)).pages:
+                yield (page.extract_text() or "") + "\n"
+
+        elif file_extension == '.docx':
+            for paragraph in Document(str(file_path)).paragraphs:
+                yield paragraph.text + "\n"
+
+        elif file_extension in ['.txt', '.md']:
+            # Windows-1254 gibi UTF-8 olmayan Türkçe dosyalar da okunur
+            yield from text_decoding.iter_decode(file_path)
+
+    def _read_file_sync(self, file_path: Path, file_extension: str, max_chars: Optional[int] = None) -> str:
+        """Dosya metnini okur; max_chars verilirse o kadar metin toplanınca okumayı bırakır"""
+        parts, length = [], 0
+        for piece in self._iter_text_sync(file_path, file_extension):
+            parts.append(piece)
+            length += len(piece)
+            if max_chars is not None and length >= max_chars:
+                break
+        text = "".join(parts).strip()
+        return text[:max_chars] if max_chars is not None else text
+
+    async def read_file_content(self, file_path: Path, file_extension: str, max_chars: Optional[int] = None) -> str:
+        """Diskteki dosyanın içeriğini okur ve metin olarak döndürür (ayrıştırma thread'de)."""
         try:
-            if file_extension == '.pdf':
-                pdf = PdfReader(io.BytesIO(content))
-                return "\n".join(page.extract_text() for page in pdf.pages)
-                
-            elif file_extension == '.docx':
-                doc = Document(io.BytesIO(content))
-                return "\n".join(paragraph.text for paragraph in doc.paragraphs)
-                
-            elif file_extension in ['.txt', '.md']:
-                return content.decode('utf-8')
-                
-            return ""  # Desteklenmeyen dosya tipi için boş string
-            
+            return await asyncio.to_thread(self._read_file_sync, Path(file_path), file_extension, max_chars)
         except Exception as e:
             app_logger.error(f"Dosya içeriği okuma hatası: {str(e)}")
             return ""
 
+    async def stream_to_disk(self, file: UploadFile, dest: Path, max_size: int) -> Tuple[int, str]:
+        """
+        UploadFile'ı sabit boyutlu parçalarla doğrudan diske yazar.
+
+        sha256 parça parça güncellenir, boyut sınırı aşılır aşılmaz yazma
+        kesilir; dosyanın tamamı hiçbir zaman bellekte tutulmaz.
+
+        Returns:
+            (boyut, sha256 hex)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(dest, "wb") as f:
+                while chunk := await file.read(self.chunk_size):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(413, f"Dosya boyutu {max_size // (1024 * 1024)}MB'ı aşıyor")
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            dest.unlink(missing_ok=True)
+            raise
+        return size, digest.hexdigest()
+
     async def save_temp_file(self, file: UploadFile, current_user=None) -> dict:
         try:
             # 1. Dosya validasyonu
@@ -44,55 +88,21 @@ class FileUploadService:
                 raise HTTPException(400, "Geçersiz dosya adı")
                 
             file_extension = Path(file.filename).suffix.lower()
-            allowed_extensions = {'.pdf', '.docx', '.txt', '.md'}
-            if file_extension not in allowed_extensions:
+            if file_extension not in ALLOWED_EXTENSIONS:
                 raise HTTPException(400, "Desteklenmeyen dosya formatı")
 
-            # 2. Dosya boyutu kontrolü (max 20MB)
-            max_size = 20 * 1024 * 1024  # 20MB
-            content = await file.read()
-            if len(content) > max_size:
-                raise HTTPException(413, "Dosya boyutu 20MB'ı aşıyor")
-
-            # 3. Checksum hesapla ve tekrarı kontrol et
-            checksum = hashlib.sha256(content).hexdigest()
-            existing = await self.check_existing_file(checksum)
-            if existing:
-                return existing
-
-            # 4. Dosya içeriğini oku
-            file_content_str = await self.read_file_content(content, file_extension)
-            if not file_content_str:
-                app_logger.warning(f"Boş içerik: {file.filename}")
-                file_content_str = ""  # NULL yerine boş string
-
-            # 5. Geçici dosyayı kaydet
+            # 2. Boyut biliniyorsa okumadan reddet; bilinmiyorsa akış sırasında kontrol edilir
+            max_size = settings.UPLOAD_MAX_SIZE
+            if getattr(file, "size", None) and file.size > max_size:
+                raise HTTPException(413, f"Dosya boyutu {max_size // (1024 * 1024)}MB'ı aşıyor")
+
+            # 3. Dosyayı parça parça geçici klasöre yaz, checksum'ı yazarken hesapla
             file_id = f"{uuid.uuid4()}{file_extension}"
             temp_path = self.temp_dir / file_id
-            
-            with open(temp_path, "wb") as f:
-                f.write(content)
-                
-            # Dosya tipini belirleme
-            file_type_map = {
-                '.pdf': FileType.pdf,
-                '.docx': FileType.docx,
-                '.txt': FileType.txt,
-                '.md': FileType.md
-            }
-            file_type = file_type_map.get(file_extension, FileType.unknown)
-            
-            return {
-                "file_id": file_id,
-                "original_name": file.filename,
-                "size": len(content),
-                "checksum": checksum,
-                "temp_path": str(temp_path),
-                "content_type": file.content_type,
-                "file_type": file_type,
-                "content": file_content_str  # Mutlaka string gönder
-            }
-            
+            size, checksum = await self.stream_to_disk(file, temp_path, max_size)
+
+            return await self.build_upload_record(temp_path, file.filename, size, checksum, file.content_type)
+
         except HTTPException as he:
             app_logger.error(
                 "Dosya yükleme hatası (Kullanıcı: %s): %s", 
@@ -104,6 +114,51 @@ class FileUploadService:
             app_logger.exception("Beklenmeyen yükleme hatası")
             raise HTTPException(500, "Dosya işlenemedi")
 
+    async def build_upload_record(
+        self,
+        temp_path: Path,
+        original_name: str,
+        size: int,
+        checksum: str,
+        content_type: Optional[str] = None
+    ) -> dict:
+        """Diske yazılmış (tek parça ya da parçalı yüklenmiş) dosyadan yükleme kaydı oluşturur."""
+        # Tekrarı kontrol et
+        existing = await self.check_existing_file(checksum)
+        if existing:
+            Path(temp_path).unlink(missing_ok=True)
+            return existing
+
+        # Kayıt için sadece baştan bir önizleme okunur; tam metni işleme
+        # pipeline'ı dosyadan sayfa sayfa okur (büyük dosyalar belleğe alınmaz)
+        file_extension = Path(original_name).suffix.lower()
+        file_content_str = await self.read_file_content(
+            temp_path, file_extension, max_chars=settings.UPLOAD_CONTENT_PREVIEW_CHARS
+        )
+        if not file_content_str:
+            app_logger.warning(f"Boş içerik: {original_name}")
+            file_content_str = ""  # NULL yerine boş string
+
+        # Dosya tipini belirleme
+        file_type_map = {
+            '.pdf': FileType.pdf,
+            '.docx': FileType.docx,
+            '.txt': FileType.txt,
+            '.md': FileType.md
+        }
+        file_type = file_type_map.get(file_extension, FileType.unknown)
+
+        return {
+            "file_id": Path(temp_path).name,
+            "original_name": original_name,
+            "size": size,
+            "checksum": checksum,
+            "temp_path": str(temp_path),
+            "content_type": content_type,
+            "file_type": file_type,
+            "content": file_content_str  # Önizleme; mutlaka string gönder
+        }
+
     async def move_to_processed(self, temp_path: str) -> str:
         processed_path = self.processed_dir / Path(temp_path).name
         Path(temp_path).rename(processed_path)
@@ -0,0 +1,152 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import time
+from core.services.metrics import metrics
+
+# Kuyruk sonu işareti: üst aşamanın tüm worker'ları bitti
+_DONE = object()
+
+StageFn = Callable[[AsyncIterator[Any]], AsyncIterator[Any]]
+
+
+class StageStats:
+    """Bir aşamanın sayaçları; darboğazı bulmak için bekleme süreleri ayrı tutulur"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.input_wait = 0.0   # boş giriş kuyruğunda beklenen süre (üst aşama yavaş)
+        self.output_wait = 0.0  # dolu çıkış kuyruğunda beklenen süre (alt aşama yavaş, backpressure)
+        self.elapsed = 0.0
+
+    @property
+    def busy(self) -> float:
+        return max(0.0, self.elapsed - self.input_wait - self.output_wait)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy, 3),
+            "input_wait_seconds": round(self.input_wait, 3),
+            "output_wait_seconds": round(self.output_wait, 3)
+        }
+
+
+class Stage:
+    """
+    Pipeline aşaması.
+
+    fn bir async iterator alıp async iterator döndürür; böylece aşama kendi
+    içinde gruplayabilir (batch) ya da bir girdiden birden çok çıktı
+    üretebilir. workers > 1 ise aynı giriş kuyruğundan okuyan birden çok
+    kopya çalışır; sıra korunması gereken aşamalar tek worker'la çalışmalı.
+    """
+
+    def __init__(self, name: str, fn: StageFn, workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.stats = StageStats(name)
+
+
+class IngestionPipeline:
+    """
+    Aşamaları sınırlı kuyruklarla birbirine bağlayan async pipeline.
+
+    Her aşama kendi eşzamanlılığıyla çalışır; kuyruklar dolunca üst aşama
+    bekler, böylece bellekte en fazla (aşama sayısı x queue_size) öğe
+    bulunur. Bir aşama hata verirse tüm aşamalar iptal edilir ve hata
+    yukarı iletilir.
+
+    Örnek:
+        pipeline = IngestionPipeline([
+            Stage("parse", parse_pages),
+            Stage("chunk", chunk_pages),
+            Stage("embed", embed_batches, workers=2),
+            Stage("store", store_batches, workers=2)
+        ], queue_size=8)
+        stats = await pipeline.run(source)
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 8, name: str = "ingest"):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.name = name
+
+    async def _drain(self, queue: asyncio.Queue, stats: StageStats) -> AsyncIterator[Any]:
+        while True:
+            waited = time.monotonic()
+            item = await queue.get()
+            stats.input_wait += time.monotonic() - waited
+            if item is _DONE:
+                # Aynı kuyruğu okuyan diğer worker'lar da görsün
+                queue.put_nowait(_DONE)
+                return
+            stats.items_in += 1
+            yield item
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        stats = stage.stats
+        started = time.monotonic()
+        try:
+            async for item in stage.fn(self._drain(inbox, stats)):
+                stats.items_out += 1
+                metrics.increment("ingest_stage_items", pipeline=self.name, stage=stage.name)
+                if outbox is not None:
+                    waited = time.monotonic()
+                    await outbox.put(item)
+                    stats.output_wait += time.monotonic() - waited
+                    metrics.set_gauge("ingest_queue_depth", outbox.qsize(), pipeline=self.name, stage=stage.name)
+        finally:
+            stats.elapsed += time.monotonic() - started
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        await asyncio.gather(*(self._worker(stage, inbox, outbox) for _ in range(stage.workers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def _feed(self, source: AsyncIterator[Any], queue: asyncio.Queue):
+        async for item in source:
+            await queue.put(item)
+        await queue.put(_DONE)
+
+    async def run(self, source: AsyncIterator[Any]) -> Dict[str, Dict[str, Any]]:
+        """Kaynak bitip tüm aşamalar boşalınca aşama istatistiklerini döndürür"""
+        # _DONE'un kuyruğa geri konabilmesi için her kuyrukta bir yer fazladan ayrılır
+        queues = [asyncio.Queue(maxsize=self.queue_size + 1) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[i], outbox)))
+
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            for stage in self.stages:
+                metrics.observe("ingest_stage_busy_seconds", stage.stats.busy, pipeline=self.name, stage=stage.name)
+                metrics.observe(
+                    "ingest_stage_backpressure_seconds", stage.stats.output_wait,
+                    pipeline=self.name, stage=stage.name
+                )
+            metrics.observe("ingest_pipeline_seconds", time.monotonic() - started, pipeline=self.name)
+
+        return {stage.name: stage.stats.to_dict() for stage in self.stages}
+
+
+async def batched(items: AsyncIterator[Any], size: int) -> AsyncIterator[List[Any]]:
+    """Async iterator'ı en fazla size elemanlı listeler halinde gruplar"""
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,107 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import time
+from config.settings import settings
+from config.logger import app_logger
+from core.services.metrics import metrics
+
+ModelLister = Callable[[], Awaitable[List[str]]]
+
+
+class ModelCatalog:
+    """
+    Sağlayıcı model listelerinin bellek içi önbelleği.
+
+    Sağlayıcılar eşzamanlı ve kısa zaman aşımıyla sorgulanır. Süresi dolan
+    (ttl) liste beklenmeden döndürülür ve arka planda yenilenir
+    (stale-while-revalidate); sadece hiç veri yokken ilk istek yenilemeyi
+    bekler. Başarısız yenilemede eldeki liste korunur.
+    """
+
+    def __init__(self, providers: Dict[str, ModelLister], ttl: float = 300, timeout: float = 3):
+        self.providers = providers
+        self.ttl = ttl
+        self.timeout = timeout
+        self._models: Dict[str, List[str]] = {}
+        # Son deneme zamanı; hatalı sağlayıcı her istekte yeniden sorgulanmasın
+        self._checked_at: Dict[str, float] = {}
+        self._refreshing: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def _fetch(self, name: str, lister: ModelLister):
+        started = self._checked_at[name] = time.monotonic()
+        try:
+            models = await asyncio.wait_for(lister(), timeout=self.timeout)
+        except Exception as e:
+            app_logger.warning("Model listesi alınamadı (%s): %r", name, e)
+            metrics.increment("model_catalog_errors", provider=name)
+            return
+        metrics.observe("model_catalog_fetch_seconds", time.monotonic() - started, provider=name)
+        # Sağlayıcı servisleri hatada boş liste döndürür; elde liste varsa onu koru
+        if not models and self._models.get(name):
+            metrics.increment("model_catalog_errors", provider=name)
+            return
+        self._models[name] = models
+
+    async def _fetch_all(self):
+        await asyncio.gather(*(self._fetch(name, lister) for name, lister in self.providers.items()))
+
+    async def refresh(self):
+        """Tüm sağlayıcıları eşzamanlı yeniler; süren bir yenileme varsa onu bekler"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._fetch_all())
+        await asyncio.shield(self._refreshing)
+
+    def _is_stale(self) -> bool:
+        now = time.monotonic()
+        return any(now - self._checked_at.get(name, float("-inf")) >= self.ttl for name in self.providers)
+
+    async def get(self) -> Dict[str, List[str]]:
+        if not self._checked_at:
+            # Soğuk başlangıç: tek seferlik bekleme (en fazla timeout kadar)
+            await self.refresh()
+        elif self._refreshing is not None and not self._refreshing.done() and any(
+            name not in self._models for name in self.providers
+        ):
+            # _fetch, _checked_at'i ilk await'ten önce yazar; eşzamanlı ilk
+            # istekler de henüz listesi olmayan sağlayıcı için süren yenilemeyi bekler
+            await asyncio.shield(self._refreshing)
+        elif self._is_stale() and (self._refreshing is None or self._refreshing.done()):
+            metrics.increment("model_catalog_stale_served")
+            self._refreshing = asyncio.create_task(self._fetch_all())
+        return {name: self._models.get(name, []) for name in self.providers}
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        """Arka planda periyodik yenileme; istekler neredeyse her zaman taze listeyi bellekten alır"""
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+
+_model_catalog: Optional[ModelCatalog] = None
+
+
+def get_model_catalog() -> ModelCatalog:
+    global _model_catalog
+    if _model_catalog is None:
+        from core.services.openai_service import OpenAIService
+        from core.services.ollama_service import OllamaService
+
+        # Servisler bir kez oluşturulup tekrar kullanılır
+        openai_service = OpenAIService()
+        ollama_service = OllamaService()
+        _model_catalog = ModelCatalog(
+            {"openai": openai_service.list_models, "ollama": ollama_service.list_models},
+            ttl=settings.MODEL_CATALOG_TTL,
+            timeout=settings.MODEL_CATALOG_TIMEOUT
+        )
+    return _model_catalog
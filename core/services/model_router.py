@@ -0,0 +1,253 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import contextlib
+import time
+from config.settings import settings
+from core.services.metrics import metrics
+from core.services.openai_service import OpenAIService
+from core.services.ollama_service import OllamaService
+
+# Devre kesici durumları (metriklerde gauge değeri olarak da kullanılır)
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+
+class CircuitBreaker:
+    """
+    Bir backend için devre kesici.
+
+    Art arda failure_threshold hata olunca devre açılır ve backend
+    reset_timeout boyunca atlanır. Süre dolunca tek bir deneme isteğine
+    izin verilir (half-open); başarılıysa devre kapanır, değilse tekrar açılır.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _set_state(self, state: int):
+        self.state = state
+        metrics.set_gauge("circuit_state", state, backend=self.name)
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+            self._trial_in_flight = False
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        metrics.increment("circuit_rejected", backend=self.name)
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                metrics.increment("circuit_opened", backend=self.name)
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def release(self):
+        """Sonuçsuz biten (ör. hedge'i kaybedip iptal edilen) deneme"""
+        self._trial_in_flight = False
+
+
+# Backend adı ("openai:gpt-4o-mini") -> devre kesici; tüm asistanlar paylaşır
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(backend_name: str) -> CircuitBreaker:
+    if backend_name not in _breakers:
+        _breakers[backend_name] = CircuitBreaker(
+            backend_name,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_TIMEOUT
+        )
+    return _breakers[backend_name]
+
+
+def create_service(model_type: str, model_name: Optional[str]):
+    if model_type == "openai":
+        return OpenAIService(model=model_name) if model_name else OpenAIService()
+    if model_type == "ollama":
+        return OllamaService(model=model_name) if model_name else OllamaService()
+    raise ValueError(f"Invalid model type: {model_type}")
+
+
+class _Attempt:
+    def __init__(self, name: str, stream: AsyncIterator[str]):
+        self.name = name
+        self.stream = stream
+        self.started = time.monotonic()
+        self.first: asyncio.Future = asyncio.ensure_future(stream.__anext__())
+
+    async def cancel(self):
+        self.first.cancel()
+        with contextlib.suppress(BaseException):
+            await self.first
+        with contextlib.suppress(Exception):
+            await self.stream.aclose()
+
+
+class ModelRouter:
+    """
+    Sıralı backend listesi üzerinde hedge ve failover yapan model katmanı.
+
+    Stream isteği ilk backend'e gider; hedge_delay içinde ilk token gelmezse
+    sıradaki backend de başlatılır ve ilk token'ı veren kazanır, diğeri
+    iptal edilir. Hata veren backend atlanıp sıradakine geçilir. Devresi
+    açık backend'ler hiç denenmez.
+    """
+
+    def __init__(self, backends: List[Tuple[str, Any]], hedge_delay: float = 1.5):
+        self.backends = backends
+        self.hedge_delay = hedge_delay
+
+    @property
+    def model(self) -> str:
+        # Önbellek parmak izi tüm backend zincirini kapsasın
+        return "|".join(name for name, _ in self.backends)
+
+    @staticmethod
+    def _next(candidates: List[Tuple[str, Any]]) -> Optional[Tuple[str, Any]]:
+        """Devresi kapalı (veya deneme hakkı olan) sıradaki backend; yoksa None"""
+        while candidates:
+            name, service = candidates.pop(0)
+            if get_breaker(name).allow():
+                return name, service
+        return None
+
+    async def chat_stream(self, message: str, system_message: Optional[str] = None) -> AsyncIterator[str]:
+        candidates = list(self.backends)
+        primary = self.backends[0][0]
+        attempts: List[_Attempt] = []
+        winner: Optional[_Attempt] = None
+        first_chunk = None
+        last_error = "All model backends are unavailable"
+        try:
+            while winner is None:
+                if not attempts:
+                    backend = self._next(candidates)
+                    if backend is None:
+                        metrics.increment("model_router_unavailable")
+                        yield f"Error: {last_error}"
+                        return
+                    name, service = backend
+                    if name != primary:
+                        metrics.increment("model_router_failovers", backend=name)
+                    attempts.append(_Attempt(name, service.chat_stream(message, system_message)))
+
+                timeout = self.hedge_delay if candidates else None
+                done, _ = await asyncio.wait(
+                    {a.first for a in attempts}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # İlk token gecikti: sıradaki backend'i de başlat
+                    backend = self._next(candidates)
+                    if backend is not None:
+                        name, service = backend
+                        metrics.increment("model_router_hedges", backend=name)
+                        attempts.append(_Attempt(name, service.chat_stream(message, system_message)))
+                    continue
+
+                for attempt in [a for a in attempts if a.first in done]:
+                    try:
+                        chunk = attempt.first.result()
+                        error = chunk[len("Error:"):].strip() if chunk.startswith("Error:") else None
+                    except StopAsyncIteration:
+                        chunk, error = None, "empty response"
+                    except Exception as e:
+                        chunk, error = None, str(e)
+
+                    if error is None and winner is None:
+                        winner, first_chunk = attempt, chunk
+                        continue
+                    attempts.remove(attempt)
+                    if error is not None:
+                        last_error = error
+                        get_breaker(attempt.name).record_failure()
+                        metrics.increment("model_router_errors", backend=attempt.name)
+                        with contextlib.suppress(Exception):
+                            await attempt.stream.aclose()
+                    else:
+                        # Aynı anda gelen ikinci ilk token: kaybeden
+                        get_breaker(attempt.name).release()
+                        await attempt.cancel()
+        finally:
+            # Kaybedenleri (veya tüketici ayrıldıysa hepsini) iptal et
+            for attempt in attempts:
+                if attempt is not winner:
+                    get_breaker(attempt.name).release()
+                    await attempt.cancel()
+
+        metrics.increment("model_router_wins", backend=winner.name)
+        metrics.observe("model_router_ttft_seconds", time.monotonic() - winner.started, backend=winner.name)
+
+        failed = False
+        try:
+            yield first_chunk
+            async for chunk in winner.stream:
+                if chunk.startswith("Error:"):
+                    failed = True
+                yield chunk
+        finally:
+            await winner.stream.aclose()
+            breaker = get_breaker(winner.name)
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    async def chat(self, message: str, system_message: Optional[str] = None) -> str:
+        """Stream olmayan istekte hedge yok; sırayla failover yapılır"""
+        candidates = list(self.backends)
+        last_error = "All model backends are unavailable"
+        while True:
+            backend = self._next(candidates)
+            if backend is None:
+                break
+            name, service = backend
+            response = await service.chat(message, system_message)
+            if response and not response.startswith("Error:"):
+                get_breaker(name).record_success()
+                return response
+            get_breaker(name).record_failure()
+            metrics.increment("model_router_errors", backend=name)
+            last_error = response[len("Error:"):].strip() if response else "empty response"
+        return f"Error: {last_error}"
+
+
+def build_model(model_type: str, model_name: Optional[str], config: Optional[Dict[str, Any]] = None):
+    """
+    Asistan için model katmanı oluşturur.
+
+    Config'de "backends" listesi varsa ModelRouter döner, yoksa tek servis:
+        {"backends": [{"model_type": "openai", "model_name": "gpt-4o-mini"},
+                      {"model_type": "ollama", "model_name": "llama3"}],
+         "hedge_delay_ms": 800}
+    """
+    config = config or {}
+    backend_configs = config.get("backends")
+    if not backend_configs:
+        return create_service(model_type, model_name)
+
+    backends = []
+    for backend in backend_configs:
+        backend_type = backend.get("model_type")
+        backend_model = backend.get("model_name")
+        backends.append((f"{backend_type}:{backend_model}", create_service(backend_type, backend_model)))
+    hedge_delay_ms = float(config.get("hedge_delay_ms", settings.MODEL_HEDGE_DELAY_MS))
+    return ModelRouter(backends, hedge_delay=hedge_delay_ms / 1000)
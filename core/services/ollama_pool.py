@@ -0,0 +1,163 @@
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+import asyncio
+import time
+import httpx
+from config.settings import settings
+from config.logger import app_logger
+from core.services.metrics import metrics
+
+
+def ollama_models_for(model_type: str, model_name: Optional[str], config: Optional[dict] = None) -> List[str]:
+    """Bir asistanın kullandığı Ollama modelleri (model_router backend listesi dahil)"""
+    models = []
+    if model_type == "ollama" and model_name:
+        models.append(model_name)
+    for backend in (config or {}).get("backends") or []:
+        if backend.get("model_type") == "ollama" and backend.get("model_name"):
+            models.append(backend["model_name"])
+    return models
+
+
+class OllamaWarmPool:
+    """
+    Ollama modellerini bellekte sıcak tutar.
+
+    Kayıtlı modeller başlangıçta boş bir istekle (keep_alive ile) yüklenir
+    ve belirli aralıklarla keep-alive yenilenir. /api/ps ile sunucudaki
+    durum takip edilir; boşaltılmış (evicted) model tekrar yüklenir.
+    Aynı model için eşzamanlı yükleme istekleri tek yüklemeyi bekler.
+    """
+
+    def __init__(self, base_url: str, keep_alive: str = "30m", refresh_interval: float = 600):
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.refresh_interval = refresh_interval
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OLLAMA_LOAD_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT)
+        )
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        # Event loop task'ları zayıf referansla tutar; başlangıç yüklemesi GC ile kaybolmasın
+        self._warming: Optional[asyncio.Future] = None
+
+    def register(self, models: Iterable[str]):
+        for model in models:
+            self.models.setdefault(model, {"state": "unloaded", "loaded_at": None, "expires_at": None, "error": None})
+
+    def warm(self, models: Iterable[str]):
+        """Modelleri kaydeder ve arka planda yükler; hatalar _load içinde loglanır"""
+        models = list(models)
+        self.register(models)
+        if models:
+            self._warming = asyncio.ensure_future(asyncio.gather(*(self.preload(model) for model in models), return_exceptions=True))
+
+    def is_warm(self, model: str) -> bool:
+        info = self.models.get(model)
+        if info is None or info["state"] != "loaded":
+            return False
+        expires_at = info["expires_at"]
+        return expires_at is None or expires_at > time.time()
+
+    async def _load(self, model: str):
+        info = self.models[model]
+        info["state"] = "loading"
+        started = time.monotonic()
+        try:
+            # Prompt'suz istek modeli sadece belleğe yükler
+            response = await self.client.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive}
+            )
+            response.raise_for_status()
+            # Eski (evicted) kaydın geçmiş expires_at'i is_warm'ı yanıltmasın; gerçek süre sync_state'te okunur
+            info.update(state="loaded", loaded_at=time.time(), expires_at=None, error=None)
+            metrics.increment("ollama_model_loads", model=model)
+            metrics.observe("ollama_model_load_seconds", time.monotonic() - started, model=model)
+        except Exception as e:
+            info.update(state="error", error=str(e))
+            metrics.increment("ollama_model_load_errors", model=model)
+            app_logger.warning("Ollama model yüklenemedi (%s): %s", model, str(e))
+            raise
+        finally:
+            self._loading.pop(model, None)
+
+    async def preload(self, model: str):
+        """Modeli yükler ya da süren yüklemeyi bekler"""
+        self.register([model])
+        task = self._loading.get(model)
+        if task is None:
+            task = asyncio.create_task(self._load(model))
+            self._loading[model] = task
+        await asyncio.shield(task)
+
+    async def ensure_loaded(self, model: str):
+        """Kullanıcı isteğinden önce çağrılır; model sıcaksa hemen döner"""
+        if self.is_warm(model):
+            return
+        metrics.increment("ollama_cold_requests", model=model)
+        await self.preload(model)
+
+    async def sync_state(self):
+        """Sunucuda yüklü modelleri (/api/ps) okuyup durumu günceller"""
+        response = await self.client.get(f"{self.base_url}/api/ps")
+        response.raise_for_status()
+        loaded = {}
+        for item in response.json().get("models", []):
+            expires_at = item.get("expires_at")
+            try:
+                expires = datetime.fromisoformat(expires_at).timestamp() if expires_at else None
+            except ValueError:
+                expires = None
+            loaded[item.get("name", "")] = {"expires_at": expires, "size_vram": item.get("size_vram")}
+            # "llama3" ve "llama3:latest" aynı model
+            loaded[item.get("model", "").removesuffix(":latest")] = loaded[item.get("name", "")]
+
+        for model, info in self.models.items():
+            current = loaded.get(model) or loaded.get(model.removesuffix(":latest"))
+            if current is not None:
+                info.update(state="loaded", expires_at=current["expires_at"], size_vram=current["size_vram"])
+            elif info["state"] == "loaded":
+                info["state"] = "evicted"
+                metrics.increment("ollama_model_evictions", model=model)
+
+    async def refresh(self):
+        """Durumu senkronlar ve tüm kayıtlı modellerin keep-alive süresini yeniler"""
+        try:
+            await self.sync_state()
+        except Exception as e:
+            app_logger.warning("Ollama durum sorgusu başarısız: %s", str(e))
+        results = await asyncio.gather(*(self.preload(model) for model in list(self.models)), return_exceptions=True)
+        metrics.set_gauge("ollama_models_warm", sum(1 for model in self.models if self.is_warm(model)))
+        return results
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        await self.client.aclose()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "keep_alive": self.keep_alive,
+            "refresh_interval": self.refresh_interval,
+            "models": {model: {**info, "warm": self.is_warm(model)} for model, info in self.models.items()}
+        }
+
+
+# Uygulama geneli havuz
+ollama_pool = OllamaWarmPool(
+    settings.OLLAMA_BASE_URL,
+    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+    refresh_interval=settings.OLLAMA_KEEPALIVE_REFRESH_SECONDS
+)
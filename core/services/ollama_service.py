@@ -3,16 +3,42 @@
 from .base_model import BaseLanguageModel
 import httpx
 from typing import List, Optional, AsyncGenerator, Union, AsyncIterator
+from contextlib import asynccontextmanager
 import json
 import os
+import asyncio
 import aiohttp
+from config.settings import settings
+from core.services.rate_limiter import get_limiter, estimate_tokens
+from core.services.ollama_pool import ollama_pool
 
 class OllamaService(BaseLanguageModel):
     def __init__(self, model: str = "llama2"):
-        self.base_url = "http://localhost:11434"
+        self.base_url = settings.OLLAMA_BASE_URL
         self.model = model
-        self.timeout = 30
+        # Bağlantı kısa sürede kurulmalı; okuma zaman aşımı ilk token / token arası beklemeyi sınırlar.
+        # httpx'te toplam süre sınırı yoktur; o _deadline() / stream döngüsündeki kontrolle uygulanır.
+        self.timeout = httpx.Timeout(
+            settings.OLLAMA_FIRST_TOKEN_TIMEOUT,
+            connect=settings.OLLAMA_CONNECT_TIMEOUT
+        )
         self.client = httpx.AsyncClient(timeout=self.timeout)
+        # Yerel sunucu üretimleri zaten sıraya koyar; fazlasını burada bekletiriz
+        self.limiter = get_limiter("ollama")
+
+    @asynccontextmanager
+    async def _deadline(self):
+        """Tek parça (stream olmayan) isteklerin toplam süre sınırı"""
+        try:
+            async with asyncio.timeout(settings.OLLAMA_TOTAL_TIMEOUT):
+                yield
+        except TimeoutError:
+            raise Exception(f"Ollama total timeout ({settings.OLLAMA_TOTAL_TIMEOUT}s)")
+
+    def _check_deadline(self, deadline: float):
+        """Stream'lerde satır başına kontrol; satır arası bekleme zaten read zaman aşımıyla sınırlı"""
+        if asyncio.get_running_loop().time() > deadline:
+            raise Exception(f"Ollama total timeout ({settings.OLLAMA_TOTAL_TIMEOUT}s)")
 
     async def generate(self, 
                       prompt: str, 
@@ -22,20 +48,25 @@ class OllamaService(BaseLanguageModel):
             if system_message:
                 prompt = f"{system_message}\n\n{prompt}"
             
-            response = await self.client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    **kwargs
-                }
-            )
+            await ollama_pool.ensure_loaded(self.model)
+            async with self.limiter.slot(tokens=estimate_tokens(prompt)) as lease, self._deadline():
+                response = await self.client.post(
+                    f"{self.base_url}/api/generate",
+                    json={
+                        "model": self.model,
+                        "prompt": prompt,
+                        "stream": False,
+                        **kwargs
+                    }
+                )
             
-            if response.status_code != 200:
-                raise Exception(f"Ollama API error: {response.text}")
-                
-            return response.json()["response"]
+                if response.status_code != 200:
+                    raise Exception(f"Ollama API error: {response.text}")
+
+                data = response.json()
+                lease.add_completion(data.get("response"))
+                lease.set_usage(data.get("eval_count"))
+            return data["response"]
 
         except Exception as e:
             print(f"Ollama Generate Error: {str(e)}")
@@ -49,20 +80,28 @@ class OllamaService(BaseLanguageModel):
             if system_message:
                 prompt = f"{system_message}\n\n{prompt}"
                 
-            async with self.client.stream(
+            await ollama_pool.ensure_loaded(self.model)
+            deadline = asyncio.get_running_loop().time() + settings.OLLAMA_TOTAL_TIMEOUT
+            async with self.limiter.slot(tokens=estimate_tokens(prompt)) as lease, self.client.stream(
                 "POST",
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
                     "prompt": prompt,
                     "stream": True,
+                    "keep_alive": settings.OLLAMA_KEEP_ALIVE,
                     **kwargs
                 }
             ) as response:
                 async for line in response.aiter_lines():
+                    self._check_deadline(deadline)
                     if line:
+                        lease.first_token()
                         data = json.loads(line)
+                        # Son satırdaki eval_count üretilen token sayısıdır
+                        lease.set_usage(data.get("eval_count"))
                         if "response" in data:
+                            lease.add_completion(data["response"])
                             yield data["response"]
                             
         except Exception as e:
@@ -73,13 +112,14 @@ class OllamaService(BaseLanguageModel):
         try:
             embeddings = []
             for text in texts:
-                response = await self.client.post(
-                    f"{self.base_url}/api/embeddings",
-                    json={
-                        "model": self.model,
-                        "prompt": text
-                    }
-                )
+                async with self.limiter.slot(tokens=estimate_tokens(text)), self._deadline():
+                    response = await self.client.post(
+                        f"{self.base_url}/api/embeddings",
+                        json={
+                            "model": self.model,
+                            "prompt": text
+                        }
+                    )
                 
                 if response.status_code != 200:
                     raise Exception(f"Ollama API error: {response.text}")
@@ -103,24 +143,44 @@ class OllamaService(BaseLanguageModel):
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": prompt})
 
-        async with aiohttp.ClientSession() as session:
+        timeout = aiohttp.ClientTimeout(
+            total=settings.OLLAMA_TOTAL_TIMEOUT,
+            sock_connect=settings.OLLAMA_CONNECT_TIMEOUT
+        )
+        async with aiohttp.ClientSession(timeout=timeout) as session:
             try:
-                async with session.post(
+                # Soğuk model önce (uzun yükleme zaman aşımıyla) yüklenir; ilk token süresine yükleme girmez
+                await ollama_pool.ensure_loaded(self.model)
+
+                async with self.limiter.slot(tokens=estimate_tokens(system_message, prompt)) as lease, session.post(
                     f"{self.base_url}/api/chat",
                     json={
                         "model": self.model,
                         "messages": messages,
-                        "stream": True
+                        "stream": True,
+                        "keep_alive": settings.OLLAMA_KEEP_ALIVE
                     }
                 ) as response:
                     if response.status != 200:
                         error = await response.text()
                         raise Exception(f"Ollama API error: {error}")
 
-                    async for line in response.content:
+                    lines = response.content.__aiter__()
+                    line_timeout = settings.OLLAMA_FIRST_TOKEN_TIMEOUT
+                    while True:
+                        try:
+                            line = await asyncio.wait_for(lines.__anext__(), line_timeout)
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            raise Exception(f"Ollama first token timeout ({line_timeout}s)")
                         if line:
+                            lease.first_token()
+                            line_timeout = None
                             chunk = json.loads(line)
+                            lease.set_usage(chunk.get("eval_count"))
                             if "message" in chunk and "content" in chunk["message"]:
+                                lease.add_completion(chunk["message"]["content"])
                                 yield chunk["message"]["content"]
                                 
             except Exception as e:
@@ -133,15 +193,23 @@ class OllamaService(BaseLanguageModel):
             if system_message:
                 prompt = f"{system_message}\n\nUser: {message}\nAssistant:"
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            # Soğuk model yüklemesi istek süresine sayılmasın
+            await ollama_pool.ensure_loaded(self.model)
+            async with self.limiter.slot(tokens=estimate_tokens(prompt)) as lease, self._deadline():
+                response = await self.client.post(
                     f"{self.base_url}/api/generate",
                     json={
                         "model": self.model,
-                        "prompt": prompt
+                        "prompt": prompt,
+                        "stream": False,
+                        "keep_alive": settings.OLLAMA_KEEP_ALIVE
                     }
                 )
+                if response.status_code != 200:
+                    raise Exception(f"Ollama API error: {response.text}")
                 data = response.json()
+                lease.add_completion(data.get("response"))
+                lease.set_usage(data.get("eval_count"))
                 return data.get("response", "")
 
         except Exception as e:
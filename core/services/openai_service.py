@@ -3,11 +3,14 @@
 from typing import AsyncIterator, Optional, List
 from openai import AsyncOpenAI
 import os
+from core.services.rate_limiter import get_limiter, estimate_tokens
 
 class OpenAIService:
     def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo"):
         self.client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
         self.model = model
+        # OpenAI istekleri (sohbet + embedding) ortak bütçeyi paylaşır
+        self.limiter = get_limiter("openai")
 
     async def list_models(self) -> List[str]:
         """OpenAI modellerini listeler."""
@@ -27,20 +30,32 @@ class OpenAIService:
             messages.append({"role": "system", "content": system_message})
         messages.append({"role": "user", "content": message})
 
+        stream = None
         try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                stream=True
-            )
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            async with self.limiter.slot(tokens=estimate_tokens(system_message, message)) as lease:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    stream=True,
+                    # Son chunk'ta usage gelir; çıktı token'ları TPM bütçesinden düşülür
+                    stream_options={"include_usage": True}
+                )
+
+                async for chunk in stream:
+                    lease.first_token()
+                    if chunk.usage is not None:
+                        lease.set_usage(chunk.usage.completion_tokens)
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        lease.add_completion(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
 
         except Exception as e:
             print(f"OpenAI stream error: {str(e)}")
             yield f"Error: {str(e)}"
+        finally:
+            # Tüketici erken ayrılırsa (iptal / kopan istemci) HTTP bağlantısını hemen kapat
+            if stream is not None:
+                await stream.close()
 
     async def chat(self, message: str, system_message: Optional[str] = None) -> str:
         messages = []
@@ -49,10 +64,14 @@ class OpenAIService:
         messages.append({"role": "user", "content": message})
 
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages
-            )
+            async with self.limiter.slot(tokens=estimate_tokens(system_message, message)) as lease:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages
+                )
+                lease.add_completion(response.choices[0].message.content)
+                if response.usage is not None:
+                    lease.set_usage(response.usage.completion_tokens)
             return response.choices[0].message.content
         except Exception as e:
             print(f"OpenAI chat error: {str(e)}")
@@ -0,0 +1,140 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+import gzip
+import hashlib
+import json
+import os
+import threading
+import uuid
+from config.logger import app_logger
+from config.settings import settings
+from core.services.metrics import metrics
+
+# Öğe biçimi: {"type": "NarrativeText" | "Table" | "Page" ..., "text": "...", "page": 3, "html": "<table>..."}
+Element = Dict[str, Any]
+
+
+def parse_cache_key(file_checksum: str, parser: str, strategy: str, version: str) -> str:
+    payload = json.dumps(
+        {"sha256": file_checksum, "parser": parser, "strategy": strategy, "version": version},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """
+    Ayrıştırma sonuçları için kalıcı disk önbelleği.
+
+    Anahtar (dosya sha256, parser, strategy, version) dörtlüsüdür; parser
+    ya da kütüphane sürümü değişince eski kayıtlar kendiliğinden geçersiz
+    olur. Her kayıt gzip'li JSON satırlarıdır (ilk satır başlık, sonrası
+    öğeler), böylece okurken de yazarken de dosya bütün olarak belleğe
+    alınmaz. Yazma geçici dosyaya yapılır; ayrıştırma yarıda kalırsa
+    önbelleğe hiçbir şey girmez.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.jsonl.gz"
+
+    def contains(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def read(self, key: str) -> Iterator[Element]:
+        path = self._path(key)
+        # Son kullanım zamanı: budama en eski kullanılanlardan başlar
+        os.utime(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            next(f)  # başlık
+            for line in f:
+                yield json.loads(line)
+
+    def write_through(self, key: str, header: Dict[str, Any], elements: Iterable[Element]) -> Iterator[Element]:
+        """Öğeleri üretildikçe hem döndürür hem önbelleğe yazar; sadece tamamlanınca kaydeder"""
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        completed = False
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                for element in elements:
+                    f.write(json.dumps(element, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    yield element
+            tmp_path.replace(self._path(key))
+            completed = True
+            metrics.increment("parse_cache_writes", parser=header.get("parser", ""))
+        finally:
+            if not completed:
+                tmp_path.unlink(missing_ok=True)
+        self.prune()
+
+    def get_or_parse(
+        self,
+        file_checksum: str,
+        parser: str,
+        strategy: str,
+        version: str,
+        parse: Callable[[], Iterable[Element]]
+    ) -> Iterator[Element]:
+        """Önbellekte varsa kayıtlı öğeleri, yoksa parse() çıktısını (yazarak) döndürür"""
+        key = parse_cache_key(file_checksum, parser, strategy, version)
+        if self.contains(key):
+            try:
+                elements = self.read(key)
+                first = next(elements, None)
+            except (OSError, EOFError, ValueError) as e:
+                # Bozuk kayıt: sil ve yeniden ayrıştır
+                app_logger.warning("Bozuk ayrıştırma önbelleği kaydı siliniyor (%s): %s", key, str(e))
+                self._path(key).unlink(missing_ok=True)
+            else:
+                metrics.increment("parse_cache_hits", parser=parser, strategy=strategy)
+                if first is not None:
+                    yield first
+                    yield from elements
+                return
+
+        metrics.increment("parse_cache_misses", parser=parser, strategy=strategy)
+        header = {"sha256": file_checksum, "parser": parser, "strategy": strategy, "version": version}
+        yield from self.write_through(key, header, parse())
+
+    def prune(self):
+        """Toplam boyut max_bytes'ı aşarsa en uzun süredir kullanılmayan kayıtları siler"""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.glob("*.jsonl.gz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                metrics.increment("parse_cache_evictions")
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [path.stat().st_size for path in self.cache_dir.glob("*.jsonl.gz")]
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+
+_parse_cache: Optional[ParseCache] = None
+
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """Ayarlarda kapalıysa None döner"""
+    global _parse_cache
+    if not settings.PARSE_CACHE_ENABLED:
+        return None
+    if _parse_cache is None:
+        _parse_cache = ParseCache(settings.PARSE_CACHE_DIR, max_bytes=settings.PARSE_CACHE_MAX_BYTES)
+    return _parse_cache
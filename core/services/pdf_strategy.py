@@ -0,0 +1,103 @@
+from typing import Any, Dict, List
+from config.settings import settings
+
+# Ayrıştırma yolları: pypdf metin katmanı (hızlı) ya da unstructured layout analizi (yavaş)
+TEXT, LAYOUT = "text", "layout"
+# Doküman düzeyinde karar: hepsi metin, hepsi layout ya da sayfa bazında karışık
+MIXED = "mixed"
+
+
+def _image_count(page) -> int:
+    """Sayfa kaynaklarındaki görsel XObject sayısı (görseller açılmadan sayılır)"""
+    try:
+        resources = page.get("/Resources") or {}
+        xobjects = resources.get("/XObject") or {}
+        return sum(1 for obj in xobjects.values() if obj.get_object().get("/Subtype") == "/Image")
+    except Exception:
+        return 0
+
+
+def profile_page(page, text: str) -> Dict[str, Any]:
+    """
+    Sayfanın metin katmanı ölçümleri.
+
+    density: 1000 pt² başına karakter (A4 dolu bir sayfada ~4, taranmış sayfada ~0)
+    short_line_ratio: 25 karakterden kısa satırların oranı; tablo ve çok
+    sütunlu düzenlerde metin katmanı kısa parçalara bölünür
+    """
+    try:
+        box = page.mediabox
+        area = float(box.width) * float(box.height)
+    except Exception:
+        area = 0.0
+    chars = len(text.strip())
+    lines = [line for line in text.splitlines() if line.strip()]
+    short_lines = sum(1 for line in lines if len(line.strip()) < 25)
+    return {
+        "chars": chars,
+        "density": chars / area * 1000 if area else 0.0,
+        "images": _image_count(page),
+        "lines": len(lines),
+        "short_line_ratio": short_lines / len(lines) if lines else 0.0
+    }
+
+
+class PdfStrategySelector:
+    """
+    Sayfa ya da doküman için ayrıştırma yolunu seçer.
+
+    Metin katmanı seyrekse (taranmış sayfa), sayfada çok görsel varsa ya da
+    satırların çoğu kısa parçalardan oluşuyorsa (tablo / çok sütun) layout
+    yolu seçilir; aksi halde pypdf metni yeterlidir.
+    """
+
+    def __init__(
+        self,
+        min_density: float = 0.2,
+        max_images: int = 3,
+        short_line_ratio: float = 0.6,
+        sample_pages: int = 5
+    ):
+        self.min_density = min_density
+        self.max_images = max_images
+        self.short_line_ratio = short_line_ratio
+        self.sample_pages = sample_pages
+
+    def choose(self, profile: Dict[str, Any]) -> str:
+        if profile["density"] < self.min_density:
+            return LAYOUT
+        if profile["images"] >= self.max_images:
+            return LAYOUT
+        if profile["lines"] >= 10 and profile["short_line_ratio"] > self.short_line_ratio:
+            return LAYOUT
+        return TEXT
+
+    def sample_indexes(self, page_count: int) -> List[int]:
+        """Dokümana yayılmış örnek sayfalar (ilk ve son sayfa dahil)"""
+        if page_count <= self.sample_pages:
+            return list(range(page_count))
+        if self.sample_pages <= 1:
+            return [0]
+        step = (page_count - 1) / (self.sample_pages - 1)
+        return sorted({round(i * step) for i in range(self.sample_pages)})
+
+    def select_document(self, reader) -> str:
+        """Örnek sayfalara bakarak doküman düzeyinde karar verir"""
+        choices = set()
+        for index in self.sample_indexes(len(reader.pages)):
+            page = reader.pages[index]
+            choices.add(self.choose(profile_page(page, page.extract_text() or "")))
+        if choices == {TEXT}:
+            return TEXT
+        if choices == {LAYOUT}:
+            return LAYOUT
+        return MIXED
+
+
+def get_pdf_strategy_selector() -> PdfStrategySelector:
+    return PdfStrategySelector(
+        min_density=settings.PDF_TEXT_MIN_DENSITY,
+        max_images=settings.PDF_LAYOUT_MAX_IMAGES,
+        short_line_ratio=settings.PDF_LAYOUT_SHORT_LINE_RATIO,
+        sample_pages=settings.PDF_STRATEGY_SAMPLE_PAGES
+    )
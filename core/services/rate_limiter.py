@@ -0,0 +1,275 @@
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import time
+from config.settings import settings
+from core.services.metrics import metrics
+
+# Öncelik sınıfları: küçük değer önce çalışır. Sohbet istekleri etkileşimli,
+# doküman yükleme / backfill embedding'leri toplu (batch) sınıfındadır.
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+_current_priority: ContextVar[str] = ContextVar("provider_priority", default="interactive")
+
+
+@contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """
+    Bu blok içinden (ve içinden beklenen coroutine'lerden) yapılan sağlayıcı
+    çağrılarının öncelik sınıfını belirler.
+
+    Örnek:
+        with request_priority("batch"):
+            await rag_service.add_documents(docs)
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority class: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """TPM bütçesi için kaba token tahmini (~4 karakter / token)"""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """OpenAI / httpx / aiohttp hatalarında 429 durumunu yakalar"""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    response = getattr(error, "response", None)
+    for status in (
+        getattr(error, "status_code", None),
+        getattr(error, "status", None),
+        getattr(response, "status_code", None)
+    ):
+        if status == 429:
+            return True
+    return False
+
+
+class TokenBucket:
+    """Dakika başına bütçe; sürekli dolan kova. rate_per_minute <= 0 ise sınırsız."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount kadar bütçe için beklenecek süre (0 = hemen)"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        # Kova kapasitesinden büyük istekler kova dolunca geçer, aksi halde hiç geçemezdi
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+
+
+class ProviderLimiter:
+    """
+    Bir sağlayıcı (OpenAI, Ollama) için ortak istek bütçesi.
+
+    - İstek/dakika ve token/dakika kovaları
+    - AIMD eşzamanlılık sınırı: gecikme hedefin altındaysa sınır yavaşça
+      artar, hedefi aşan gecikmede ya da 429'da yarıya iner
+    - Öncelik sınıfları: etkileşimli istekler kuyrukta her zaman önce
+      alınır; toplu istekler sınırın en fazla batch_share kadarını kullanır
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        target_latency: float = 10.0,
+        batch_share: float = 0.75
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.batch_share = batch_share
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._in_flight_by_class: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._waiters: List[Tuple[int, int, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _class_limit(self, priority: str) -> float:
+        if priority == "batch":
+            return max(1.0, self.limit * self.batch_share)
+        return self.limit
+
+    def _dispatch(self):
+        """Kuyruk başındaki istekleri bütçe ve eşzamanlılık izin verdikçe başlatır"""
+        self._timer = None
+        while self._waiters:
+            _, _, amount, priority, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= int(self.limit) or self._in_flight_by_class[priority] >= int(self._class_limit(priority)):
+                # Bir istek bitince release() tekrar dağıtım yapar
+                return
+            delay = max(self.requests.wait_time(1), self.tokens.wait_time(amount))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.consume(1)
+            self.tokens.consume(amount)
+            self.in_flight += 1
+            self._in_flight_by_class[priority] += 1
+            future.set_result(None)
+
+    async def acquire(self, tokens: int = 1, priority: Optional[str] = None) -> str:
+        priority = priority or _current_priority.get()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._sequence), tokens, priority, future))
+        queued_at = time.monotonic()
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot verilmişti ama bekleyen iptal edildi: geri bırak
+                self._release_slot(priority)
+            raise
+        metrics.observe("provider_queue_wait_seconds", time.monotonic() - queued_at, provider=self.name, priority=priority)
+        return priority
+
+    def _release_slot(self, priority: str):
+        self.in_flight -= 1
+        self._in_flight_by_class[priority] -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    def release(self, priority: str, latency: float, throttled: bool = False):
+        """İsteğin sonucuna göre eşzamanlılık sınırını günceller (AIMD)"""
+        if throttled or latency > self.target_latency:
+            self.limit = max(float(self.min_concurrency), self.limit / 2)
+            if throttled:
+                metrics.increment("provider_throttled", provider=self.name)
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        metrics.set_gauge("provider_concurrency_limit", self.limit, provider=self.name)
+        metrics.observe("provider_latency_seconds", latency, provider=self.name, priority=priority)
+        self._release_slot(priority)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 1, priority: Optional[str] = None) -> AsyncIterator["Lease"]:
+        """
+        Örnek:
+            async with limiter.slot(tokens=estimate_tokens(prompt)) as lease:
+                stream = await client.create(...)
+                async for chunk in stream:
+                    lease.first_token()
+                    lease.add_completion(text)
+                    ...
+
+        tokens sadece prompt tahminidir; üretilen çıktı bırakılırken (usage
+        varsa ondan, yoksa sayılan metinden) token kovasından ayrıca düşülür.
+        """
+        priority = await self.acquire(tokens, priority)
+        lease = Lease()
+        throttled = False
+        try:
+            yield lease
+        except Exception as e:
+            throttled = is_rate_limited(e)
+            raise
+        finally:
+            # Çıktı token'ları da dakikalık bütçeye sayılır; kova eksiye düşerse sonraki istekler bekler
+            self.tokens.consume(lease.completion_tokens())
+            self.release(priority, lease.latency(), throttled)
+
+
+class Lease:
+    """
+    Alınmış bir slot. Stream'lerde AIMD için ilk token gecikmesi (TTFT)
+    kullanılır; uzun yanıtlar gecikme sinyalini bozmasın diye.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self._completion_chars = 0
+        self._usage_tokens: Optional[int] = None
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def latency(self) -> float:
+        return (self.first_token_at or time.monotonic()) - self.started
+
+    def add_completion(self, text: Optional[str]):
+        """Üretilen metni sayar (usage bilgisi gelmezse tahmin için)"""
+        if text:
+            self._completion_chars += len(text)
+
+    def set_usage(self, completion_tokens: Optional[int]):
+        """Sağlayıcının bildirdiği gerçek çıktı token sayısı; tahminin yerine geçer"""
+        if completion_tokens is not None:
+            self._usage_tokens = completion_tokens
+
+    def completion_tokens(self) -> int:
+        if self._usage_tokens is not None:
+            return self._usage_tokens
+        return self._completion_chars // 4 + 1 if self._completion_chars else 0
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Sağlayıcı başına tek limiter; sohbet ve embedding aynı bütçeyi paylaşır"""
+    if provider not in _limiters:
+        if provider == "openai":
+            _limiters[provider] = ProviderLimiter(
+                "openai",
+                requests_per_minute=settings.OPENAI_RPM,
+                tokens_per_minute=settings.OPENAI_TPM,
+                max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+                target_latency=settings.OPENAI_TARGET_LATENCY,
+                batch_share=settings.RATE_LIMIT_BATCH_SHARE
+            )
+        elif provider == "ollama":
+            _limiters[provider] = ProviderLimiter(
+                "ollama",
+                requests_per_minute=settings.OLLAMA_RPM,
+                tokens_per_minute=settings.OLLAMA_TPM,
+                max_concurrency=settings.OLLAMA_MAX_CONCURRENCY,
+                target_latency=settings.OLLAMA_TARGET_LATENCY,
+                batch_share=settings.RATE_LIMIT_BATCH_SHARE
+            )
+        else:
+            raise ValueError(f"Unknown provider: {provider}")
+    return _limiters[provider]
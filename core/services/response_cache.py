@@ -0,0 +1,236 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from config.settings import settings
+from core.services.metrics import metrics
+
+
+def response_cache_key(
+    assistant_name: str,
+    system_message: Optional[str],
+    model_type: str,
+    model_name: Optional[str],
+    message: str,
+    params: Optional[Dict[str, Any]] = None
+) -> str:
+    """Tüm prompt ve üretim parametrelerinin deterministik özeti"""
+    payload = json.dumps(
+        {
+            "assistant": assistant_name,
+            "system_message": system_message or "",
+            "model_type": model_type,
+            "model": model_name or "",
+            "message": message,
+            "params": params or {}
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Yanıt önbelleği için depolama arayüzü"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Kayıt sayısı ve toplam bayt sınırlı LRU önbellek"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._items:
+            self._bytes -= len(self._items.pop(key).encode("utf-8"))
+        self._items[key] = value
+        self._bytes += size
+        while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= len(evicted.encode("utf-8"))
+            metrics.increment("response_cache_evictions", backend="memory")
+
+    async def clear(self) -> None:
+        self._items.clear()
+        self._bytes = 0
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._items), "bytes": self._bytes}
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    SQLite dosyasında tutulan LRU önbellek; süreç yeniden başlasa da kalıcıdır.
+
+    Sorgular küçük olsa da disk erişimi event loop'u bloklamasın diye thread'de çalışır.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)")
+            self._conn.commit()
+            # Sınır kontrolü için tutulan toplamlar; sadece açılışta tablo taranır
+            self._count, self._bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def _set(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            count = self._count + (0 if previous else 1)
+            total = self._bytes + size - (previous[0] if previous else 0)
+            # En uzun süredir erişilmeyenleri sınırlar sağlanana kadar sil
+            while count > self.max_entries or total > self.max_bytes:
+                oldest = self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access LIMIT 1"
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (oldest[0],))
+                count -= 1
+                total -= oldest[1]
+                metrics.increment("response_cache_evictions", backend="disk")
+            self._conn.commit()
+            # Toplamlar commit başarılı olunca güncellenir
+            self._count, self._bytes = count, total
+
+    def _clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._count, self._bytes = 0, 0
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    def _stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "disk", "path": str(self.path), "entries": self._count, "bytes": self._bytes}
+
+    async def stats(self) -> Dict[str, Any]:
+        # Kilit bir yazma sürerken beklenebilir; event loop bloklanmasın
+        return await asyncio.to_thread(self._stats)
+
+
+class ResponseCache:
+    """Birebir aynı prompt'lar için LLM yanıt önbelleği"""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            print(f"Response cache read error: {str(e)}")
+            value = None
+        metrics.increment("response_cache_hits" if value is not None else "response_cache_misses")
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            print(f"Response cache write error: {str(e)}")
+
+    async def stats(self) -> Dict[str, Any]:
+        hits = metrics.get_counter("response_cache_hits")
+        misses = metrics.get_counter("response_cache_misses")
+        total = hits + misses
+        return {**(await self.backend.stats()), "hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Ayarlara göre uygulama geneli önbelleği döndürür; kapalıysa None"""
+    global _response_cache
+    if _response_cache is None and settings.RESPONSE_CACHE_BACKEND != "none":
+        if settings.RESPONSE_CACHE_BACKEND == "memory":
+            backend = InMemoryCacheBackend(
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                max_bytes=settings.RESPONSE_CACHE_MAX_BYTES
+            )
+        elif settings.RESPONSE_CACHE_BACKEND == "disk":
+            backend = DiskCacheBackend(
+                settings.RESPONSE_CACHE_PATH,
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                max_bytes=settings.RESPONSE_CACHE_MAX_BYTES
+            )
+        else:
+            raise ValueError(f"Unsupported response cache backend: {settings.RESPONSE_CACHE_BACKEND}")
+        _response_cache = ResponseCache(backend)
+    return _response_cache
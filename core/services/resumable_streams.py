@@ -0,0 +1,163 @@
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import uuid
+from config.settings import settings
+from core.services.metrics import metrics
+from core.services.streaming import format_sse
+
+
+class ResumableStream:
+    """
+    Bir konuşmadaki tek bir yanıt üretimi ve son frame'lerinin halka buffer'ı.
+
+    Üretim istek generator'ından bağımsız bir task'ta sürer. Frame id'leri
+    "<stream_id>:<sıra>" biçimindedir; yeniden bağlanan istemci Last-Event-ID
+    ile kaldığı yerden devam eder. Dinleyen kalmazsa üretim grace süresi
+    boyunca açık tutulur, süre dolarsa iptal edilir.
+    """
+
+    def __init__(self, conversation_id: str, user_id: str, buffer_size: int, grace_seconds: float):
+        self.stream_id = uuid.uuid4().hex[:12]
+        self.conversation_id = conversation_id
+        self.user_id = user_id
+        self.grace_seconds = grace_seconds
+        self.frames: Deque[Tuple[int, str]] = deque(maxlen=buffer_size)
+        self.chunks: List[str] = []
+        self.seq = 0
+        # Son metin parçasının sırası; buffer'dan düşen kısım için reset frame'i bununla üretilir
+        self.chunk_seq = 0
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+        self._grace_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.stream_id}:{seq}"
+
+    def _position(self, last_event_id: Optional[str]) -> int:
+        """Last-Event-ID'yi bu stream'deki sıraya çevirir; başka bir stream'e aitse baştan başlanır"""
+        if not last_event_id:
+            return 0
+        stream_id, _, seq = last_event_id.partition(":")
+        if stream_id != self.stream_id or not seq.isdigit():
+            return 0
+        return min(int(seq), self.seq)
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, data: str, event: Optional[str] = None):
+        self.seq += 1
+        self.frames.append((self.seq, format_sse(data, event=event, event_id=self.event_id(self.seq))))
+        self._notify()
+
+    def publish_chunk(self, chunk: str):
+        self.chunks.append(chunk)
+        self.publish(chunk)
+        self.chunk_seq = self.seq
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    def _attach(self):
+        self.subscribers += 1
+        if self._grace_handle is not None:
+            self._grace_handle.cancel()
+            self._grace_handle = None
+
+    def _detach(self):
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            self._grace_handle = asyncio.get_running_loop().call_later(self.grace_seconds, self._expire)
+
+    def _expire(self):
+        """Grace süresinde kimse geri bağlanmadı: upstream üretimi iptal et"""
+        self._grace_handle = None
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            metrics.increment("resumable_stream_expired")
+            self.task.cancel()
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Last-Event-ID'den sonraki frame'leri, ardından canlı frame'leri döndürür"""
+        position = self._position(last_event_id)
+        self._attach()
+        try:
+            while True:
+                # İstenen kısım buffer'dan düşmüş (geç bağlanan ya da yavaş okuyan abone):
+                # o ana kadarki metni tek frame'de yeniden gönder
+                if self.frames and position < self.frames[0][0] - 1:
+                    metrics.increment("resumable_stream_resets")
+                    position = self.chunk_seq
+                    yield format_sse(self.text, event="reset", event_id=self.event_id(position))
+                    continue
+
+                pending = [(seq, frame) for seq, frame in self.frames if seq > position]
+                for seq, frame in pending:
+                    position = seq
+                    yield frame
+                if self.done and position >= self.seq:
+                    break
+                if position < self.seq:
+                    continue
+                await self._changed.wait()
+        finally:
+            self._detach()
+
+
+class ResumableStreamRegistry:
+    """Konuşma id'sine göre süren (ve yakın zamanda biten) yanıt üretimleri"""
+
+    def __init__(self, buffer_size: int = 512, grace_seconds: float = 30):
+        self.buffer_size = buffer_size
+        self.grace_seconds = grace_seconds
+        self._streams: Dict[str, ResumableStream] = {}
+
+    def get(self, conversation_id: str, user_id: str) -> Optional[ResumableStream]:
+        stream = self._streams.get(conversation_id)
+        if stream is None or stream.user_id != user_id:
+            return None
+        return stream
+
+    def start(
+        self,
+        conversation_id: str,
+        user_id: str,
+        produce: Callable[[ResumableStream], Awaitable[None]]
+    ) -> ResumableStream:
+        """
+        produce(stream) arka planda çalıştırılır ve frame'leri stream.publish* ile yazar.
+        Grace süresi dolduğunda produce içinde CancelledError fırlatılır.
+        """
+        stream = ResumableStream(conversation_id, user_id, self.buffer_size, self.grace_seconds)
+        self._streams[conversation_id] = stream
+        stream.task = asyncio.create_task(self._run(stream, produce))
+        metrics.set_gauge("resumable_streams_active", len(self._streams))
+        return stream
+
+    async def _run(self, stream: ResumableStream, produce: Callable[[ResumableStream], Awaitable[None]]):
+        try:
+            await produce(stream)
+        finally:
+            stream.finish()
+            # Biten stream de grace süresi kadar tutulur; geç bağlanan istemci sonunu alabilsin
+            asyncio.get_running_loop().call_later(self.grace_seconds, self._forget, stream)
+
+    def _forget(self, stream: ResumableStream):
+        if self._streams.get(stream.conversation_id) is stream:
+            del self._streams[stream.conversation_id]
+        metrics.set_gauge("resumable_streams_active", len(self._streams))
+
+
+# Uygulama geneli kayıt
+resumable_streams = ResumableStreamRegistry(
+    buffer_size=settings.STREAM_RESUME_BUFFER_FRAMES,
+    grace_seconds=settings.STREAM_RESUME_GRACE_SECONDS
+)
@@ -0,0 +1,165 @@
+from typing import List, Optional, Tuple, Callable, Awaitable
+import hashlib
+import time
+import numpy as np
+from config.logger import app_logger
+from core.services.metrics import metrics
+
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def assistant_fingerprint(system_message: Optional[str], model_name: Optional[str], rag_sources: List[str]) -> str:
+    """
+    Asistanın yanıtlarını etkileyen ayarların özeti.
+
+    Sistem mesajı, model veya RAG kaynak listesi değişince parmak izi değişir
+    ve eski önbellek kayıtları geçersiz sayılır. RAG kaynakları sadece adlarıyla
+    girer; kaynaklara doküman eklenmesi parmak izini değiştirmez.
+    """
+    payload = "\x1f".join([system_message or "", model_name or "", *sorted(rag_sources)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    Tek bir asistan için anlamsal yanıt önbelleği.
+
+    Gelen mesaj embed edilir; önbellekteki sorulardan kosinüs benzerliği
+    eşiği geçen en yakın kayıt varsa onun yanıtı döndürülür. Vektörler
+    normalize edilmiş küçük bir numpy matrisinde tutulur.
+    """
+
+    def __init__(
+        self,
+        assistant_name: str,
+        embed: Embedder,
+        threshold: float = 0.92,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000
+    ):
+        self.assistant_name = assistant_name
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._vectors: Optional[np.ndarray] = None
+        self._questions: List[str] = []
+        self._answers: List[str] = []
+        self._created_at: List[float] = []
+        self._fingerprints: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def _drop(self, keep: np.ndarray):
+        """keep maskesinde False olan kayıtları siler"""
+        self._vectors = self._vectors[keep] if keep.any() else None
+        self._questions = [q for q, k in zip(self._questions, keep) if k]
+        self._answers = [a for a, k in zip(self._answers, keep) if k]
+        self._created_at = [c for c, k in zip(self._created_at, keep) if k]
+        self._fingerprints = [f for f, k in zip(self._fingerprints, keep) if k]
+
+    def _purge(self, fingerprint: str):
+        """Süresi dolmuş ya da asistan ayarları değişmiş kayıtları temizler"""
+        if not self._answers:
+            return
+        now = time.monotonic()
+        keep = np.array([
+            now - created < self.ttl_seconds and fp == fingerprint
+            for created, fp in zip(self._created_at, self._fingerprints)
+        ])
+        if not keep.all():
+            metrics.increment("semantic_cache_evictions", int((~keep).sum()), assistant=self.assistant_name)
+            self._drop(keep)
+
+    async def _embed(self, message: str) -> np.ndarray:
+        vector = np.asarray((await self.embed([message]))[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def lookup(self, message: str, fingerprint: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Returns:
+            (önbellekteki yanıt veya None, mesajın embedding'i) - embedding store() için tekrar kullanılır
+        """
+        try:
+            vector = await self._embed(message)
+        except Exception as e:
+            app_logger.warning("Semantic cache embedding hatası (%s): %s", self.assistant_name, str(e))
+            metrics.increment("semantic_cache_errors", assistant=self.assistant_name)
+            return None, None
+
+        self._purge(fingerprint)
+        if self._vectors is not None:
+            similarities = self._vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                metrics.increment("semantic_cache_hits", assistant=self.assistant_name)
+                metrics.observe("semantic_cache_hit_similarity", float(similarities[best]), assistant=self.assistant_name)
+                return self._answers[best], vector
+
+        metrics.increment("semantic_cache_misses", assistant=self.assistant_name)
+        return None, vector
+
+    def store(self, message: str, answer: str, vector: np.ndarray, fingerprint: str):
+        if not answer or vector is None:
+            return
+        if len(self._answers) >= self.max_entries:
+            # En eski kaydı at
+            keep = np.ones(len(self._answers), dtype=bool)
+            keep[0] = False
+            self._drop(keep)
+
+        row = vector.reshape(1, -1)
+        self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+        self._questions.append(message)
+        self._answers.append(answer)
+        self._created_at.append(time.monotonic())
+        self._fingerprints.append(fingerprint)
+        metrics.set_gauge("semantic_cache_entries", len(self._answers), assistant=self.assistant_name)
+
+    def invalidate(self):
+        """Asistanın tüm önbelleğini temizler"""
+        if self._answers:
+            metrics.increment("semantic_cache_evictions", len(self._answers), assistant=self.assistant_name)
+        self._vectors = None
+        self._questions, self._answers, self._created_at, self._fingerprints = [], [], [], []
+        metrics.set_gauge("semantic_cache_entries", 0, assistant=self.assistant_name)
+
+    def stats(self) -> dict:
+        hits = metrics.get_counter("semantic_cache_hits", assistant=self.assistant_name)
+        misses = metrics.get_counter("semantic_cache_misses", assistant=self.assistant_name)
+        total = hits + misses
+        return {
+            "entries": len(self._answers),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+def create_semantic_cache(assistant_name: str, config: Optional[dict] = None) -> Optional[SemanticCache]:
+    """
+    Asistan config'i ve ayarlara göre önbellek oluşturur; kapalıysa None döner.
+
+    Config örneği: {"semantic_cache": {"enabled": true, "threshold": 0.95, "ttl_seconds": 600}}
+    """
+    from config.settings import settings
+    from core.rag.embedding_spaces import get_embedder
+
+    cache_config = (config or {}).get("semantic_cache", {})
+    if not isinstance(cache_config, dict):
+        cache_config = {"enabled": bool(cache_config)}
+    if not cache_config.get("enabled", settings.SEMANTIC_CACHE_ENABLED):
+        return None
+
+    return SemanticCache(
+        assistant_name,
+        embed=get_embedder(cache_config.get("embedding_model", settings.SEMANTIC_CACHE_EMBEDDING_MODEL)),
+        threshold=float(cache_config.get("threshold", settings.SEMANTIC_CACHE_THRESHOLD)),
+        ttl_seconds=float(cache_config.get("ttl_seconds", settings.SEMANTIC_CACHE_TTL_SECONDS)),
+        max_entries=int(cache_config.get("max_entries", settings.SEMANTIC_CACHE_MAX_ENTRIES))
+    )
@@ -0,0 +1,129 @@
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+import asyncio
+from config.settings import settings
+from core.services.metrics import metrics
+
+_DONE = object()
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Kuyruğu dolan (yavaş) ya da sonradan katılan abone, eksiklerini ortak buffer'dan okur
+        self.lagging = True
+        self.position = 0
+
+
+class _Flight:
+    """Aynı anahtar için süren tek bir upstream üretim"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.buffer: List[str] = []
+        self.subscribers: Set[_Subscriber] = set()
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamCoalescer:
+    """
+    Eşzamanlı ve aynı prompt'lu istekleri tek bir upstream stream'e bağlar (single-flight).
+
+    İlk istek upstream'i başlatır; aynı anahtarla gelen diğer istekler abone
+    olur. Token'lar her aboneye sınırlı kuyruklarla dağıtılır; geç katılan ya
+    da kuyruğu dolan abone, o ana kadar üretilmiş kısmı ortak buffer'dan
+    okuyarak yetişir. Upstream'i okuyan abone kalmazsa üretim iptal edilir.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._flights: Dict[str, _Flight] = {}
+
+    @property
+    def active_flights(self) -> int:
+        return len(self._flights)
+
+    async def _produce(self, flight: _Flight, upstream: AsyncIterator[str]):
+        try:
+            async for token in upstream:
+                flight.buffer.append(token)
+                for subscriber in flight.subscribers:
+                    if subscriber.lagging:
+                        continue
+                    try:
+                        subscriber.queue.put_nowait(token)
+                    except asyncio.QueueFull:
+                        subscriber.lagging = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            metrics.set_gauge("single_flight_active", len(self._flights))
+            for subscriber in flight.subscribers:
+                if subscriber.lagging:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(_DONE)
+                except asyncio.QueueFull:
+                    subscriber.lagging = True
+            aclose = getattr(upstream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Args:
+            key: Prompt anahtarı (aynı anahtar = aynı üretim)
+            factory: Upstream stream'i başlatan fonksiyon; sadece lider istekte çağrılır
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._produce(flight, factory()))
+            metrics.increment("single_flight_leaders")
+            metrics.set_gauge("single_flight_active", len(self._flights))
+        else:
+            metrics.increment("single_flight_followers")
+
+        subscriber = _Subscriber(self.queue_size)
+        flight.subscribers.add(subscriber)
+        try:
+            while True:
+                if subscriber.lagging and subscriber.queue.empty():
+                    # Buffer'dan yetiş; yield sırasında yeni token'lar eklenebilir
+                    while subscriber.position < len(flight.buffer):
+                        token = flight.buffer[subscriber.position]
+                        subscriber.position += 1
+                        yield token
+                    if flight.done:
+                        break
+                    subscriber.lagging = False
+                    continue
+
+                item = await subscriber.queue.get()
+                if item is _DONE:
+                    break
+                subscriber.position += 1
+                yield item
+
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers.discard(subscriber)
+            if not flight.subscribers and not flight.done and flight.task is not None:
+                # Kimse dinlemiyorsa upstream üretimi (ve HTTP bağlantısını) kapat
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                metrics.increment("single_flight_cancelled")
+                metrics.set_gauge("single_flight_active", len(self._flights))
+
+
+# Uygulama geneli coalescer (anahtar asistan adını içerir)
+stream_coalescer = StreamCoalescer(queue_size=settings.SINGLE_FLIGHT_QUEUE_SIZE)
@@ -0,0 +1,189 @@
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+import asyncio
+import contextlib
+import time
+
+
+async def replay_text(text: str, chunk_chars: int = 24, delay: float = 0.0) -> AsyncIterator[str]:
+    """
+    Önbellekteki bir yanıtı model stream'i gibi parça parça geri oynatır.
+
+    Args:
+        text: Oynatılacak yanıt
+        chunk_chars: Parça başına yaklaşık karakter sayısı (kelime ortasında bölmez)
+        delay: Parçalar arası bekleme (saniye); 0 ise beklemeden gönderilir
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            # Bir sonraki boşluğa kadar uzat ki kelimeler bölünmesin
+            space = text.find(" ", end)
+            end = length if space == -1 or space - end > chunk_chars else space + 1
+        yield text[start:end]
+        start = end
+        if delay and start < length:
+            await asyncio.sleep(delay)
+
+
+class StreamCancelled(Exception):
+    """İstemci bağlantıyı kapattığı için stream yarıda bırakıldı"""
+
+
+async def cancel_on_disconnect(
+    source: AsyncIterator[str],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float = 0.5
+) -> AsyncIterator[str]:
+    """
+    Kaynak stream'i okur; istemci koptuğunda bekleyen upstream okumasını iptal eder.
+
+    Upstream'den parça beklenirken de bağlantı poll_interval aralıklarla
+    kontrol edilir, böylece model yavaş üretse bile iptal gecikmez. İptalde
+    kaynak generator kapatılır (HTTP bağlantısı da onunla kapanır) ve
+    StreamCancelled fırlatılır.
+    """
+    iterator = source.__aiter__()
+    last_check = time.monotonic()
+    try:
+        while True:
+            next_chunk = asyncio.ensure_future(iterator.__anext__())
+            while True:
+                done, _ = await asyncio.wait({next_chunk}, timeout=poll_interval)
+                if done:
+                    break
+                last_check = time.monotonic()
+                if await is_disconnected():
+                    next_chunk.cancel()
+                    with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                        await next_chunk
+                    raise StreamCancelled()
+
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                return
+
+            # Hızlı akan stream'lerde her parçada değil, poll aralığında bir kontrol et
+            if time.monotonic() - last_check >= poll_interval:
+                last_check = time.monotonic()
+                if await is_disconnected():
+                    raise StreamCancelled()
+            yield chunk
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def format_sse(data: str, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """
+    Tek bir SSE frame'i üretir.
+
+    Veri içindeki satır sonları (\\n, \\r\\n, \\r) her satır için ayrı bir
+    `data:` alanına bölünür; istemci bunları tekrar \\n ile birleştirir.
+    Böylece çok satırlı yanıtlar frame sınırlarını bozmaz.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    for line in data.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        lines.append(f"data: {line}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _CoalesceBuffer:
+    """coalesce_tokens'ın okuyucu task'ı ile tüketici arasında paylaşılan durum"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.size = 0
+        self.first_at = 0.0
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.data = asyncio.Event()   # en az bir parça var (ya da kaynak bitti)
+        self.full = asyncio.Event()   # max_bytes'a ulaşıldı (ya da kaynak bitti)
+        self.drained = asyncio.Event()  # tüketici tamponu aldı; dolu tamponda okuyucu bunu bekler
+
+    def take(self) -> str:
+        frame = "".join(self.parts)
+        self.parts, self.size = [], 0
+        self.data.clear()
+        self.full.clear()
+        self.drained.set()
+        return frame
+
+
+async def coalesce_tokens(
+    source: AsyncIterator[str],
+    window_ms: float = 30,
+    max_bytes: int = 1024
+) -> AsyncIterator[str]:
+    """
+    Küçük upstream parçalarını zaman penceresi veya boyuta göre birleştirir.
+
+    İlk parça geldikten sonra en fazla window_ms beklenir ya da birikenler
+    max_bytes'a ulaşınca gönderilir. window_ms <= 0 ise parçalar olduğu gibi geçer.
+
+    Kaynağı tek bir okuyucu task tüketip tampona ekler; tüketici token başına
+    değil frame başına bir kez bekler (pencere ya da boyut sınırı), böylece
+    birleştirmenin CPU maliyeti token sayısıyla büyümez.
+    """
+    iterator = source.__aiter__()
+    if window_ms <= 0:
+        async for chunk in iterator:
+            yield chunk
+        return
+
+    window = window_ms / 1000
+    buffer = _CoalesceBuffer()
+
+    async def read():
+        try:
+            async for chunk in iterator:
+                if not chunk:
+                    continue
+                if not buffer.parts:
+                    buffer.first_at = time.monotonic()
+                    buffer.data.set()
+                buffer.parts.append(chunk)
+                buffer.size += len(chunk.encode("utf-8"))
+                if buffer.size >= max_bytes:
+                    # Tampon sınırsız büyümesin: frame gönderilene kadar kaynaktan okunmaz
+                    buffer.drained.clear()
+                    buffer.full.set()
+                    await buffer.drained.wait()
+        except Exception as e:
+            buffer.error = e
+        finally:
+            buffer.finished = True
+            buffer.data.set()
+            buffer.full.set()
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            await buffer.data.wait()
+            remaining = buffer.first_at + window - time.monotonic()
+            if not buffer.finished and buffer.size < max_bytes and remaining > 0:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(buffer.full.wait(), remaining)
+            finished = buffer.finished
+            frame = buffer.take()
+            if frame:
+                yield frame
+            if finished and not buffer.parts:
+                break
+        if buffer.error is not None:
+            raise buffer.error
+    finally:
+        if not reader.done():
+            reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await reader
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
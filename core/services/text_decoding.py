@@ -0,0 +1,132 @@
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+import codecs
+from config.logger import app_logger
+from config.settings import settings
+from core.services.metrics import metrics
+
+try:
+    # chardet'ten çok daha hızlı; kurulu değilse chardet'e düşülür
+    from charset_normalizer import from_bytes as _normalizer_from_bytes
+except ImportError:
+    _normalizer_from_bytes = None
+
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+)
+
+def _normalize(encoding: str) -> Optional[str]:
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return None
+
+
+# Dedektörlerin Türkçe metin için sık verdiği Batı Avrupa tahminleri; ğ/ı/ş bu kodlamalarda yok,
+# bu yüzden güvenilmez sayılıp bilinen sıraya (cp1254, iso-8859-9) geçilir
+# Karşılaştırma codecs.lookup().name ile yapılır ("iso8859-1", "mac-roman" ...)
+_LATIN1_FAMILY = {_normalize(encoding) for encoding in ("latin_1", "iso8859_15", "cp1252", "mac_roman")}
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    """Örnek, sonu yarım karakterle kesilmiş olsa da hatasız çözülüyor mu"""
+    try:
+        codecs.getincrementaldecoder(encoding)(errors="strict").decode(sample, final=False)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+class TextDecodingService:
+    """
+    Yüklenen metin dosyaları için ortak kodlama tespiti ve çözme.
+
+    Sıra: BOM -> UTF-8 (hızlı yol) -> sınırlı bir örnek üzerinde dedektör
+    (charset-normalizer, yoksa chardet) -> bilinen yedek sıra
+    (varsayılan cp1254, iso-8859-9). Büyük dosyalar incremental decoder
+    ile blok blok çözülür; dosyanın tamamı bayt olarak belleğe alınmaz.
+    """
+
+    def __init__(self, sample_bytes: int = 64 * 1024, fallbacks: Optional[List[str]] = None):
+        self.sample_bytes = sample_bytes
+        self.fallbacks = fallbacks or ["cp1254", "iso-8859-9"]
+
+    def _detect(self, sample: bytes) -> Optional[str]:
+        if _normalizer_from_bytes is not None:
+            best = _normalizer_from_bytes(sample).best()
+            return best.encoding if best is not None else None
+        if chardet is not None:
+            return chardet.detect(sample).get("encoding")
+        return None
+
+    def detect_encoding(self, sample: bytes) -> str:
+        """Örneğin kodlaması; sample_bytes'tan uzun örneklerin sadece başı incelenir"""
+        sample = sample[:self.sample_bytes]
+        for bom, encoding in _BOMS:
+            if sample.startswith(bom):
+                return encoding
+        if _decodes(sample, "utf-8"):
+            return "utf-8"
+
+        detected = _normalize(self._detect(sample) or "")
+        if detected and detected not in _LATIN1_FAMILY and detected != "utf-8" and _decodes(sample, detected):
+            return detected
+        for encoding in self.fallbacks:
+            if _decodes(sample, encoding):
+                return encoding
+        # iso-8859-9 her baytı çözer; buraya ancak yedek listesi değiştirilirse düşülür
+        return self.fallbacks[-1]
+
+    def decode(self, data: bytes) -> Tuple[str, str]:
+        """(metin, kodlama); geçerli UTF-8 tek C çağrısıyla çözülür"""
+        try:
+            text, encoding = data.decode("utf-8"), "utf-8"
+            if text.startswith("\ufeff"):
+                text = text[1:]
+        except UnicodeDecodeError as e:
+            # Hatanın olduğu yer örneğe dahil edilir: baştaki ASCII kısım yanıltmasın
+            start = max(0, e.start - self.sample_bytes // 2)
+            encoding = self.detect_encoding(data[start:start + self.sample_bytes])
+            text = data.decode(encoding, errors="replace")
+        metrics.increment("text_decode", encoding=encoding)
+        return text, encoding
+
+    def iter_decode(self, path: Union[str, Path], block_size: Optional[int] = None) -> Iterator[str]:
+        """Dosyayı bloklar halinde okuyup çözer; UTF-8 sanılan dosyada geçersiz bayt çıkarsa kalan kısım için kodlama yeniden seçilir"""
+        block_size = block_size or settings.UPLOAD_CHUNK_SIZE
+        with open(path, "rb") as f:
+            block = f.read(max(block_size, self.sample_bytes))
+            encoding = self.detect_encoding(block)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="strict" if encoding == "utf-8" else "replace")
+            while block:
+                try:
+                    yield decoder.decode(block)
+                except UnicodeDecodeError as e:
+                    # e.object: decoder'da bekleyen yarım karakter baytları + bu blok
+                    data, offset = e.object, e.start
+                    yield data[:offset].decode("utf-8")
+                    encoding = self.detect_encoding(data[offset:])
+                    app_logger.warning("Geçersiz UTF-8; %s kalanı %s ile çözülüyor", path, encoding)
+                    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                    yield decoder.decode(data[offset:])
+                block = f.read(block_size)
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+        metrics.increment("text_decode", encoding=encoding)
+
+    def read_file(self, path: Union[str, Path]) -> str:
+        return "".join(self.iter_decode(path))
+
+
+text_decoding = TextDecodingService(
+    sample_bytes=settings.TEXT_DECODE_SAMPLE_BYTES,
+    fallbacks=[encoding.strip() for encoding in settings.TEXT_DECODE_FALLBACKS.split(",") if encoding.strip()]
+)
@@ -176,39 +176,37 @@ class ChatApp {
             assistantMessage.className = 'message assistant';
             this.chatMessages.appendChild(assistantMessage);
 
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            let buffer = '';
-
-            try {
-                while (true) {
-                    const { done, value } = await reader.read();
-                    if (done) break;
-
-                    buffer += decoder.decode(value, { stream: true });
-                    let lines = buffer.split('\n');
-                    buffer = lines.pop() || '';
-
-                    for (const line of lines) {
-                        const trimmedLine = line.trim();
-                        if (trimmedLine.startsWith('data: ')) {
-                            const token = trimmedLine.slice(6);
-                            if (token && token !== '[DONE]') {
-                                if (token.startsWith('error:')) {
-                                    throw new Error(token.slice(6));
-                                }
-                                assistantMessage.textContent += token;
-                                this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
-                            }
-                        }
+            // Bağlantı koparsa son event id ile kaldığı yerden devam et (yeni üretim başlatmaz)
+            const state = { lastEventId: null, finished: false };
+            let currentResponse = response;
+            for (let attempt = 0; ; attempt++) {
+                try {
+                    await this.readStream(currentResponse, assistantMessage, state);
+                    if (state.finished || !state.lastEventId) break;
+                } catch (streamError) {
+                    if (streamError.fromServer || !state.lastEventId || attempt >= 5) throw streamError;
+                    console.warn('Stream koptu, yeniden bağlanılıyor:', streamError);
+                }
+                if (attempt >= 5) break;
+
+                await new Promise(resolve => setTimeout(resolve, 1000 * (attempt + 1)));
+                const resumeUrl = new URL(`${this.apiUrl}/assistants/${encodeURIComponent(this.currentAssistant)}/chat/stream`);
+                currentResponse = await fetch(resumeUrl, {
+                    headers: {
+                        'Authorization': `Bearer ${this.token}`,
+                        'Accept': 'text/event-stream',
+                        'Last-Event-ID': state.lastEventId,
+                        'X-Conversation-Id': this.currentConversationId
+                    }
+                });
+                if (!currentResponse.ok) {
+                    // Stream süresi dolmuş: kaydedilmiş mesajlardan yükle
+                    if (currentResponse.status === 410 && this.currentConversationId) {
+                        await this.loadChat(this.currentConversationId);
+                        return;
                     }
+                    throw new Error(`HTTP ${currentResponse.status}: ${await currentResponse.text()}`);
                 }
-            } catch (streamError) {
-                console.error('Stream error:', streamError);
-                throw streamError;
-            } finally {
-                // Reader'ı sonlandır
-                reader.cancel();
             }
 
         } catch (error) {
@@ -218,6 +216,60 @@ class ChatApp {
         }
     }
 
+    async readStream(response, assistantMessage, state) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        try {
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                // SSE event'leri boş satırla ayrılır; bir event birden çok data: satırı içerebilir
+                let events = buffer.split('\n\n');
+                buffer = events.pop() || '';
+
+                for (const event of events) {
+                    const fields = { data: [], event: 'message', id: null };
+                    for (const line of event.split('\n')) {
+                        const separator = line.indexOf(':');
+                        if (separator <= 0) continue;
+                        const field = line.slice(0, separator);
+                        let value = line.slice(separator + 1);
+                        if (value.startsWith(' ')) value = value.slice(1);
+                        if (field === 'data') fields.data.push(value);
+                        else if (field === 'event') fields.event = value;
+                        else if (field === 'id') fields.id = value;
+                    }
+                    if (fields.id !== null) state.lastEventId = fields.id;
+                    if (!fields.data.length) continue;
+
+                    const token = fields.data.join('\n');
+                    if (fields.event === 'reset') {
+                        // Kaçırılan kısım buffer'da yok: sunucu o ana kadarki metni tek parça gönderir
+                        assistantMessage.textContent = token;
+                    } else if (token === '[DONE]') {
+                        state.finished = true;
+                    } else if (token) {
+                        if (token.startsWith('error:')) {
+                            state.finished = true;
+                            const error = new Error(token.slice(6));
+                            error.fromServer = true;
+                            throw error;
+                        }
+                        assistantMessage.textContent += token;
+                    }
+                    this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+                }
+            }
+        } finally {
+            // Reader'ı sonlandır
+            reader.cancel();
+        }
+    }
+
     showError(message) {
         const alertContainer = document.getElementById('alert-container') || document.body;
         const alertDiv = document.createElement('div');
@@ -1,4 +1,5 @@
 import os
+from typing import Iterator
 
 # === SETTINGS (Customize as needed) / AYARLAR (İsteğinize göre düzenleyin) ===
 
@@ -18,48 +19,48 @@ FILE_EXTENSIONS = ["cs", "cshtml","config"]
 OUTPUT_FILE = os.path.join(DIRECTORY_TO_SCAN, "merged_content_with_headers.txt")
 
 
-def get_directory_tree(directory: str, prefix: str = "", ignored_dirs: list[str] = None) -> str:
+def iter_directory_tree(directory: str, prefix: str = "", ignored_dirs: list[str] = None) -> Iterator[str]:
     """
-    Creates a tree structure of directories and files
-    Dizin ve dosyaların ağaç yapısını oluşturur
+    Yields the tree structure of directories and files line by line
+    Dizin ve dosyaların ağaç yapısını satır satır üretir
     """
     if ignored_dirs is None:
         ignored_dirs = []
-        
-    tree = ""
-    entries = os.listdir(directory)
-    entries = [e for e in entries if e not in ignored_dirs]
-    entries.sort()
-    
+
+    entries = sorted(e for e in os.listdir(directory) if e not in ignored_dirs)
+
     for i, entry in enumerate(entries):
         path = os.path.join(directory, entry)
         is_last = i == len(entries) - 1
-        
+
         if os.path.isdir(path):
-            tree += f"{prefix}{'└──' if is_last else '├──'} {entry}/\n"
+            yield f"{prefix}{'└──' if is_last else '├──'} {entry}/\n"
             extension = "    " if is_last else "│   "
-            tree += get_directory_tree(path, prefix + extension, ignored_dirs)
+            yield from iter_directory_tree(path, prefix + extension, ignored_dirs)
         else:
-            tree += f"{prefix}{'└──' if is_last else '├──'} {entry}\n"
-            
-    return tree
+            yield f"{prefix}{'└──' if is_last else '├──'} {entry}\n"
 
 
-def read_files_with_directory_headers(
+def get_directory_tree(directory: str, prefix: str = "", ignored_dirs: list[str] = None) -> str:
+    """
+    Creates a tree structure of directories and files
+    Dizin ve dosyaların ağaç yapısını oluşturur
+    """
+    return "".join(iter_directory_tree(directory, prefix, ignored_dirs))
+
+
+def iter_files_with_directory_headers(
     directory: str,
     extensions: list[str],
     ignored_dirs: list[str] = None,
     ignored_files: list[str] = None
-) -> str:
+) -> Iterator[str]:
     """
-    Reads files in the specified directory and merges their content with directory information.
-    Belirtilen dizindeki dosyaları okur ve dizin bilgisi ile birlikte içeriklerini birleştirir.
+    Yields the merged output piece by piece, so it can be written without holding it in memory.
+    Birleşik çıktıyı parça parça üretir; çıktı belleğe alınmadan dosyaya yazılabilir.
 
-    :param directory: Directory to scan / Taranacak dizin.
-    :param extensions: List of file extensions (e.g., ["py", "js"]) / Dosya uzantıları listesi (örn. ["py", "js"]).
-    :param ignored_dirs: List of folders to exclude from scanning / Taranması istenmeyen klasörlerin listesi.
-    :param ignored_files: List of files to completely ignore / Dosya adından tamamen kaçınılacak dosyaların listesi.
-    :return: Returns the content as a single text / İçeriği tek bir metin olarak döndürür.
+    Parameters are the same as read_files_with_directory_headers.
+    Parametreler read_files_with_directory_headers ile aynıdır.
     """
     if ignored_dirs is None:
         ignored_dirs = []
@@ -67,12 +68,12 @@ def read_files_with_directory_headers(
         ignored_files = []
 
     # First add directory tree / Önce dizin ağacını ekle
-    all_content = "Directory Tree / Dizin Ağacı:\n"
-    all_content += "========================\n"
-    all_content += get_directory_tree(directory, ignored_dirs=ignored_dirs)
-    all_content += "\n\nFile Contents / Dosya İçerikleri:\n"
-    all_content += "========================\n\n"
-    all_content += f"Directory: {directory}\n\n"
+    yield "Directory Tree / Dizin Ağacı:\n"
+    yield "========================\n"
+    yield from iter_directory_tree(directory, ignored_dirs=ignored_dirs)
+    yield "\n\nFile Contents / Dosya İçerikleri:\n"
+    yield "========================\n\n"
+    yield f"Directory: {directory}\n\n"
 
     for root, dirs, files in os.walk(directory):
         # Remove folders to be excluded / Hariç tutulması istenen klasörleri çıkar
@@ -87,29 +88,51 @@ def read_files_with_directory_headers(
 
             file_path = os.path.join(root, file)
             try:
-                # File header / Dosya başlığı
-                all_content += f"==== File: {file_path} ====\n"
-
                 # Read file content / Dosya içeriğini oku
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    all_content += f.read() + "\n\n"
+                    content = f.read()
             except Exception as e:
+                # The header is written anyway, as before / Başlık önceki gibi yine de yazılır
+                yield f"==== File: {file_path} ====\n"
                 print(f"Error reading file: {file_path}\nError: {e}\n")  # Error message / Hata mesajı
+                continue
+
+            # File header / Dosya başlığı
+            yield f"==== File: {file_path} ====\n"
+            yield content + "\n\n"
 
-    return all_content
+
+def read_files_with_directory_headers(
+    directory: str,
+    extensions: list[str],
+    ignored_dirs: list[str] = None,
+    ignored_files: list[str] = None
+) -> str:
+    """
+    Reads files in the specified directory and merges their content with directory information.
+    Belirtilen dizindeki dosyaları okur ve dizin bilgisi ile birlikte içeriklerini birleştirir.
+
+    For incremental ingestion into the RAG store see scripts/sync_directory.py.
+    RAG deposuna artımlı aktarım için scripts/sync_directory.py'ye bakın.
+
+    :param directory: Directory to scan / Taranacak dizin.
+    :param extensions: List of file extensions (e.g., ["py", "js"]) / Dosya uzantıları listesi (örn. ["py", "js"]).
+    :param ignored_dirs: List of folders to exclude from scanning / Taranması istenmeyen klasörlerin listesi.
+    :param ignored_files: List of files to completely ignore / Dosya adından tamamen kaçınılacak dosyaların listesi.
+    :return: Returns the content as a single text / İçeriği tek bir metin olarak döndürür.
+    """
+    # Pieces are joined once instead of repeated += / Parçalar tekrarlı += yerine tek seferde birleştirilir
+    return "".join(iter_files_with_directory_headers(directory, extensions, ignored_dirs, ignored_files))
 
 
 if __name__ == "__main__":
-    # Read the content of all files / Tüm dosyaların içeriğini oku
-    merged_content = read_files_with_directory_headers(
-        DIRECTORY_TO_SCAN,
-        FILE_EXTENSIONS,
-        IGNORED_DIRS,
-        IGNORED_FILES
-    )
-
-    # Save the content to the specified file / İçeriği belirlenen dosyaya kaydet
+    # Stream the content of all files to the output file / Tüm dosyaların içeriğini çıktı dosyasına akıt
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        f.write(merged_content)
+        f.writelines(iter_files_with_directory_headers(
+            DIRECTORY_TO_SCAN,
+            FILE_EXTENSIONS,
+            IGNORED_DIRS,
+            IGNORED_FILES
+        ))
 
     print(f"The content of all files with headers has been written to '{OUTPUT_FILE}'.")  # Success message / Başarı mesajı
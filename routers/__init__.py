@@ -1,9 +1,13 @@
 from .assistants import router as assistants_router
 from .rag import router as rag_router
 from .documents import router as documents_router
+from .chat_ws import router as chat_ws_router
+from .batch import router as batch_router
 
 __all__ = [
     "assistants_router",
     "rag_router",
     "documents_router", 
+    "chat_ws_router",
+    "batch_router",
 ] 
\ No newline at end of file
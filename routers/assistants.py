@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
 from fastapi.responses import StreamingResponse
-from typing import List, AsyncGenerator, Optional, Dict
+from typing import List, AsyncGenerator, Optional, Dict, Set
 from sqlalchemy import select, delete, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.database.models import Assistant as AssistantModel, Conversation, Message, User
-from core.database import get_db
+from core.database import get_db, async_session
 from api.schemas import AssistantResponse, AssistantCreate, ConversationResponse, MessageResponse
-from core.services.openai_service import OpenAIService
-from core.services.ollama_service import OllamaService
-from core.models.assistant import Assistant as AssistantClass
+from core.services.model_catalog import get_model_catalog
+from core.services.ollama_pool import ollama_pool, ollama_models_for
+from core.models.assistant import Assistant as AssistantClass, build_assistant
+from core.services.response_cache import get_response_cache
+from core.services.streaming import cancel_on_disconnect, coalesce_tokens, StreamCancelled
+from core.services.resumable_streams import ResumableStream, resumable_streams
+from core.services.metrics import metrics
+from core.services.rate_limiter import estimate_tokens
+from config.settings import settings
 from api.dependencies import get_current_user
 import uuid
 from datetime import datetime
@@ -20,12 +26,76 @@ from sqlalchemy.exc import IntegrityError
 # Global (in-memory) Assistants Dictionary
 assistants: Dict[str, AssistantClass] = {}
 
+# Arka plan kayıt task'ları; event loop task'ları zayıf referansla tuttuğu için burada saklanır
+_background_tasks: Set[asyncio.Task] = set()
+
 router = APIRouter(
     prefix="/assistants",
     tags=["assistants"]
 )
 
 
+def _build_runtime_assistant(
+    name: str,
+    model_type: str,
+    model_name: str,
+    system_message: Optional[str],
+    config: Optional[dict]
+) -> AssistantClass:
+    """DB kaydından (veya create isteğinden) bellekteki asistan nesnesini oluşturur."""
+    try:
+        return build_assistant(name, model_type, model_name, system_message, config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _persist_assistant_message(conversation_id: str, content: str):
+    """İstek session'ından bağımsız olarak asistan mesajını kaydeder."""
+    try:
+        async with async_session() as session:
+            session.add(Message(
+                id=str(uuid.uuid4()),
+                conversation_id=conversation_id,
+                role="assistant",
+                content=content,
+                created_at=datetime.utcnow()
+            ))
+            await session.commit()
+    except Exception as e:
+        print(f"Error persisting assistant message: {str(e)}")
+
+
+def _persist_in_background(conversation_id: str, content: str):
+    """İptal edilen turun yarım yanıtını, iptali bekletmeden kaydeder."""
+    task = asyncio.create_task(_persist_assistant_message(conversation_id, content))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _record_completed_stream(assistant_name: str, text: str):
+    """Tamamlanan yanıtın token sayısı (iptal tasarrufu tahmini için referans)"""
+    metrics.observe("chat_stream_completion_tokens", estimate_tokens(text), assistant=assistant_name)
+
+
+def _record_cancelled_stream(assistant_name: str, emitted_text: str):
+    """
+    İptal edilen stream için metrik yazar.
+
+    Tamamlanan yanıtların ortalama token sayısından, iptal sayesinde
+    üretilmeyen yaklaşık token sayısı tahmin edilir. İki taraf da metinden
+    sayılır; birleştirilmiş (coalesce) frame sayısı token yerine geçmez.
+    """
+    emitted_tokens = estimate_tokens(emitted_text) if emitted_text else 0
+    metrics.increment("chat_stream_cancelled", assistant=assistant_name)
+    metrics.increment("chat_stream_cancelled_emitted_tokens", emitted_tokens, assistant=assistant_name)
+    completed = metrics.snapshot()["histograms"].get(
+        f"chat_stream_completion_tokens{{assistant={assistant_name}}}"
+    )
+    if completed:
+        saved = max(0.0, completed["avg"] - emitted_tokens)
+        metrics.increment("chat_stream_saved_tokens_estimate", saved, assistant=assistant_name)
+
+
 @router.get("/list", response_model=List[AssistantResponse])
 async def list_assistants(
     db: AsyncSession = Depends(get_db),
@@ -43,11 +113,38 @@ async def list_assistants(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _relay_stream(request: Request, stream: ResumableStream, last_event_id: Optional[str] = None):
+    """Stream'in frame'lerini istemciye aktarır; istemci koparsa sadece aboneliği bırakır."""
+    async def relay() -> AsyncGenerator[str, None]:
+        try:
+            async for frame in cancel_on_disconnect(
+                stream.subscribe(last_event_id),
+                request.is_disconnected,
+                poll_interval=settings.DISCONNECT_POLL_INTERVAL
+            ):
+                yield frame
+        except StreamCancelled:
+            # Üretim grace süresi boyunca sürer; istemci Last-Event-ID ile geri dönebilir
+            pass
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={
+            "X-Conversation-Id": str(stream.conversation_id),
+            "Cache-Control": "no-cache"
+        }
+    )
+
+
 @router.get("/{assistant_name}/chat/stream")
 async def chat_stream(
+    request: Request,
     assistant_name: str,
-    message: str,
+    message: Optional[str] = None,
     conversation_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+    x_conversation_id: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -55,7 +152,25 @@ async def chat_stream(
     Streaming endpoint (SSE) ile asistan sohbeti.
     conversation_id verilirse o konuşmaya devam eder,
     verilmezse yeni bir Conversation kaydı oluşturur.
+
+    Last-Event-ID ve X-Conversation-Id header'ları ile gelen istek yeni bir
+    üretim başlatmaz; süren (veya yeni biten) yanıta kaldığı yerden bağlanır.
     """
+    # 0. Yeniden bağlanma: LLM çağrısı tekrar yapılmaz, buffer'dan devam edilir
+    if last_event_id:
+        resume_conversation_id = x_conversation_id or conversation_id
+        stream = resumable_streams.get(resume_conversation_id, current_user.id) if resume_conversation_id else None
+        if stream is None:
+            raise HTTPException(
+                status_code=410,
+                detail="Stream is no longer available; fetch the conversation messages instead"
+            )
+        metrics.increment("resumable_stream_resumed")
+        return _relay_stream(request, stream, last_event_id)
+
+    if not message:
+        raise HTTPException(status_code=422, detail="message is required")
+
     try:
         # 1. Asistanı DB'den bul
         query = select(AssistantModel).where(AssistantModel.name == assistant_name)
@@ -103,76 +218,66 @@ async def chat_stream(
 
         # 4. Bellekte asistan var mı? Yoksa oluştur.
         if assistant_name not in assistants:
-            config = db_assistant.config if isinstance(db_assistant.config, dict) else {}
-            if db_assistant.model_type == "openai":
-                model = OpenAIService(model=db_assistant.model_name)
-            elif db_assistant.model_type == "ollama":
-                model = OllamaService(model=db_assistant.model_name)
-            else:
-                raise HTTPException(status_code=400, detail="Invalid model type")
-
-            new_assistant = AssistantClass(
-                name=db_assistant.name,
-                model=model,
-                system_message=db_assistant.system_message,
-                config=config
+            assistants[assistant_name] = _build_runtime_assistant(
+                db_assistant.name,
+                db_assistant.model_type,
+                db_assistant.model_name,
+                db_assistant.system_message,
+                db_assistant.config
             )
-            assistants[assistant_name] = new_assistant
 
-        # 5. Yanıtı stream şeklinde döndüren generator
-        async def generate() -> AsyncGenerator[str, None]:
-            full_response = ""
+        conversation_key = str(conversation.id)
+
+        # 5. Yanıtı istekten bağımsız bir task'ta üret. İstek kapsamı (ve DB session'ı)
+        # istemci koptuğunda kapanabileceği için kayıtlar ayrı session'da yapılır.
+        async def produce(stream: ResumableStream):
             try:
                 # Asistan objesini memory'den al
                 current_assistant = assistants[assistant_name]
 
-                # Asistan yanıtını parça parça al
-                async for chunk in current_assistant.process_message(message, stream=True):
+                # Küçük token'lar zaman/boyut penceresinde birleştirilip tek frame olarak yazılır
+                async for chunk in coalesce_tokens(
+                    current_assistant.process_message(message, stream=True),
+                    window_ms=settings.SSE_COALESCE_WINDOW_MS,
+                    max_bytes=settings.SSE_COALESCE_MAX_BYTES
+                ):
                     if chunk:
-                        full_response += chunk
-                        yield f"data: {chunk}\n\n"
+                        stream.publish_chunk(chunk)
 
                 # Yanıt tamamlanınca asistan mesajını kaydet
+                full_response = stream.text
                 if full_response:
-                    assistant_message = Message(
-                        id=str(uuid.uuid4()),
-                        conversation_id=conversation.id,
-                        role="assistant",
-                        content=full_response,
-                        created_at=datetime.utcnow()
+                    await _persist_assistant_message(conversation_key, full_response)
+                _record_completed_stream(assistant_name, full_response)
+
+                stream.publish("[DONE]")
+
+            except asyncio.CancelledError:
+                # Grace süresinde kimse geri bağlanmadı: yarım yanıtı işaretleyip kaydet
+                _record_cancelled_stream(assistant_name, stream.text)
+                if stream.chunks:
+                    _persist_in_background(
+                        conversation_key,
+                        stream.text + settings.TRUNCATION_MARKER
                     )
-                    db.add(assistant_message)
-                    await db.commit()
-
-                yield "data: [DONE]\n\n"
+                raise
 
             except Exception as e:
                 error_msg = f"Stream generation error: {str(e)}"
                 print(error_msg)
 
                 # Hata mesajını DB'ye de kaydedebiliriz
-                error_message = Message(
-                    id=str(uuid.uuid4()),
-                    conversation_id=conversation.id,
-                    role="assistant",
-                    content=f"Error: {str(e)}",
-                    created_at=datetime.utcnow()
-                )
-                db.add(error_message)
-                await db.commit()
+                await _persist_assistant_message(conversation_key, f"Error: {str(e)}")
+
+                stream.publish(f"error: {str(e)}")
 
-                yield f"data: error: {str(e)}\n\n"
+        stream = resumable_streams.start(conversation_key, current_user.id, produce)
 
         # 6. SSE response
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={
-                "X-Conversation-Id": str(conversation.id),
-                "Cache-Control": "no-cache"
-            }
-        )
+        return _relay_stream(request, stream)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Chat stream error: {str(e)}")
         await db.rollback()
@@ -186,13 +291,14 @@ async def create_assistant(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        # Model servisini oluştur
-        if assistant.model_type == "openai":
-            model_service = OpenAIService(model=assistant.model_name)
-        elif assistant.model_type == "ollama":
-            model_service = OllamaService(model=assistant.model_name)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid model type")
+        # Model servisini ve bellekteki asistanı oluştur
+        new_assistant = _build_runtime_assistant(
+            assistant.name,
+            assistant.model_type,
+            assistant.model_name,
+            assistant.system_message,
+            assistant.config
+        )
         
         # Veritabanına kaydet
         db_assistant = AssistantModel(
@@ -208,14 +314,9 @@ async def create_assistant(
         await db.commit()
         await db.refresh(db_assistant)
         
-        # Asistanı memory'ye ekle
-        new_assistant = AssistantClass(
-            name=assistant.name,
-            model=model_service,
-            system_message=assistant.system_message,
-            config=assistant.config
-        )
+        # Asistanı memory'ye ekle (eski önbellek yeni nesneyle birlikte düşer)
         assistants[assistant.name] = new_assistant
+        ollama_pool.warm(ollama_models_for(assistant.model_type, assistant.model_name, assistant.config))
         
         return db_assistant
         
@@ -338,18 +439,9 @@ async def delete_conversation(
 
 @router.get("/models", response_model=Dict[str, List[str]])
 async def list_models(current_user: User = Depends(get_current_user)):
-    """OpenAI ve Ollama modellerini listeler."""
+    """OpenAI ve Ollama modellerini listeler (bellekteki katalogdan)."""
     try:
-        openai_service = OpenAIService()
-        ollama_service = OllamaService()
-
-        openai_models = await openai_service.list_models()
-        ollama_models = await ollama_service.list_models()
-
-        return {
-            "openai": openai_models,
-            "ollama": ollama_models
-        }
+        return await get_model_catalog().get()
 
     except Exception as e:
         print(f"Error in list_models: {str(e)}")
@@ -357,3 +449,47 @@ async def list_models(current_user: User = Depends(get_current_user)):
             status_code=500,
             detail=f"Failed to fetch models: {str(e)}"
         )
+
+
+@router.get("/ollama/status")
+async def ollama_status(current_user: User = Depends(get_current_user)):
+    """Ollama modellerinin yüklenme / boşaltılma durumu."""
+    return ollama_pool.status()
+
+
+@router.get("/{assistant_name}/cache/stats")
+async def semantic_cache_stats(
+    assistant_name: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Asistanın anlamsal önbellek istatistiklerini (hit oranı vb.) döndürür."""
+    current_assistant = assistants.get(assistant_name)
+    if not current_assistant or current_assistant.semantic_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **current_assistant.semantic_cache.stats()}
+
+
+@router.get("/cache/responses/stats")
+async def response_cache_stats(current_user: User = Depends(get_current_user)):
+    """Birebir eşleşme yanıt önbelleğinin istatistikleri."""
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await response_cache.stats())}
+
+
+@router.delete("/{assistant_name}/cache")
+async def invalidate_semantic_cache(
+    assistant_name: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Asistanın anlamsal önbelleğini temizler.
+
+    Önbellek içerik değişikliklerini kendisi fark etmez; yanıtları etkileyen
+    veriler (ör. RAG dokümanları) güncellendiğinde elle çağrılmalıdır.
+    """
+    current_assistant = assistants.get(assistant_name)
+    if current_assistant and current_assistant.semantic_cache is not None:
+        current_assistant.semantic_cache.invalidate()
+    return {"message": f"Cache cleared for assistant {assistant_name}"}
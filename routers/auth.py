@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from core.database import get_db
@@ -109,6 +110,20 @@ async def login(
 async def logout():
     return {"message": "Successfully logged out"}
 
+async def get_user_from_token(token: str, db: AsyncSession) -> Optional[User]:
+    """JWT'yi çözer ve kullanıcıyı döndürür; geçersizse None"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        email: str = payload.get("sub")
+        if email is None:
+            return None
+    except JWTError:
+        return None
+
+    query = select(User).where(User.email == email)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
 # Dependency for protected routes
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -120,18 +135,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    query = select(User).where(User.email == email)
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
-    
+    user = await get_user_from_token(token, db)
     if user is None:
         raise credentials_exception
     
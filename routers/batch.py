@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import FileResponse
+from typing import Dict
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_db
+from core.database.models import Assistant as AssistantModel, User
+from core.services.batch_runner import BatchJob, run_batch
+from config.settings import settings
+from api.dependencies import get_current_user
+from routers.assistants import assistants, _build_runtime_assistant
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["batch"]
+)
+
+# Çalışan işler (job_id -> task); durum bilgisi diskteki job.json'dadır
+_running: Dict[str, asyncio.Task] = {}
+
+
+async def _get_assistant(assistant_name: str, db: AsyncSession):
+    if assistant_name not in assistants:
+        result = await db.execute(select(AssistantModel).where(AssistantModel.name == assistant_name))
+        db_assistant = result.scalar_one_or_none()
+        if not db_assistant:
+            raise HTTPException(status_code=404, detail="Assistant not found")
+        assistants[assistant_name] = _build_runtime_assistant(
+            db_assistant.name,
+            db_assistant.model_type,
+            db_assistant.model_name,
+            db_assistant.system_message,
+            db_assistant.config
+        )
+    return assistants[assistant_name]
+
+
+def _start(job: BatchJob, assistant):
+    task = asyncio.create_task(run_batch(job, assistant))
+    _running[job.job_id] = task
+    task.add_done_callback(lambda _: _running.pop(job.job_id, None))
+
+
+def _load_job(job_id: str, user_id) -> BatchJob:
+    try:
+        job = BatchJob.load(job_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    # Başkasının işi de "yok" olarak görünür; varlığı sızdırılmaz
+    if job.user_id != str(user_id):
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.post("/{assistant_name}")
+async def create_batch_job(
+    assistant_name: str,
+    file: UploadFile = File(...),
+    concurrency: int = settings.BATCH_DEFAULT_CONCURRENCY,
+    prompt_field: str = "message",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """JSONL prompt dosyasını yükler ve işi arka planda başlatır."""
+    assistant = await _get_assistant(assistant_name, db)
+    job = BatchJob.create(
+        assistant_name,
+        concurrency=max(1, concurrency),
+        prompt_field=prompt_field,
+        user_id=str(current_user.id)
+    )
+
+    # Dosya parça parça diske yazılır; büyük girdiler belleğe alınmaz
+    with open(job.input_path, "wb") as f:
+        while chunk := await file.read(1024 * 1024):
+            f.write(chunk)
+
+    _start(job, assistant)
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def get_batch_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """İşin durumu ve ilerleme sayaçları."""
+    job = _load_job(job_id, current_user.id)
+    return {**job.to_dict(), "active": job_id in _running}
+
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_batch_job(
+    job_id: str,
+    retry_failed: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Yarıda kalan işi checkpoint'ten (çıktıdaki tamamlanmış id'ler) devam ettirir."""
+    job = _load_job(job_id, current_user.id)
+    if job_id in _running:
+        raise HTTPException(status_code=409, detail="Batch job is already running")
+    job.retry_failed = retry_failed
+    _start(job, await _get_assistant(job.assistant_name, db))
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_batch_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """İşi durdurur; tamamlanan sonuçlar korunur ve resume ile devam edilebilir."""
+    _load_job(job_id, current_user.id)
+    task = _running.get(job_id)
+    if task is None:
+        raise HTTPException(status_code=409, detail="Batch job is not running")
+    task.cancel()
+    return {"message": f"Batch job {job_id} paused"}
+
+
+@router.get("/jobs/{job_id}/results")
+async def get_batch_results(job_id: str, current_user: User = Depends(get_current_user)):
+    """Sonuç JSONL dosyası (iş sürerken o ana kadarki sonuçlar)."""
+    job = _load_job(job_id, current_user.id)
+    if not job.output_path.exists():
+        raise HTTPException(status_code=404, detail="No results yet")
+    return FileResponse(job.output_path, media_type="application/x-ndjson", filename=f"{job_id}.jsonl")
@@ -0,0 +1,283 @@
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from typing import Any, Dict, Optional, Set, Union
+from sqlalchemy import select, and_
+from core.database.models import Assistant as AssistantModel, Conversation, Message, User
+from core.database import async_session
+from core.services.streaming import coalesce_tokens
+from core.services.metrics import metrics
+from config.settings import settings
+from routers.auth import get_user_from_token
+from routers.assistants import (
+    assistants,
+    _build_runtime_assistant,
+    _persist_assistant_message,
+    _persist_in_background,
+    _record_cancelled_stream,
+    _record_completed_stream
+)
+import uuid
+from datetime import datetime
+import asyncio
+import json
+
+router = APIRouter(
+    prefix="/ws",
+    tags=["chat"]
+)
+
+# İstemci -> sunucu (JSON text frame):
+#   {"type": "auth", "token": "..."}                       (token query'de yoksa ilk mesaj)
+#   {"type": "chat", "id": "m1", "assistant": "x", "message": "...", "conversation_id": "..."}
+#   {"type": "cancel", "id": "m1"}
+# Sunucu -> istemci:
+#   {"type": "ready"} / {"type": "start", "id", "conversation_id"} / {"type": "done", "id"}
+#   {"type": "error", "id", "detail"}
+#   token: format=json ise {"type": "token", "id", "data"};
+#          format=binary ise binary frame: <id utf-8> 0x00 <token utf-8>
+
+Frame = Union[str, bytes]
+
+
+class ChatConnection:
+    """
+    Tek bir WebSocket bağlantısının durumu.
+
+    Kullanıcı bağlantı başında bir kez doğrulanır; asistan ve konuşma
+    kayıtları ilk kullanımda DB'den okunup bağlantı boyunca önbellekte
+    tutulur. Giden frame'ler sınırlı bir kuyruktan tek bir yazıcı task'la
+    gönderilir: istemci yavaş okursa kuyruk dolar ve token üreten turlar
+    beklemeye girer (backpressure).
+    """
+
+    def __init__(self, websocket: WebSocket, user: User, binary: bool = False):
+        self.websocket = websocket
+        self.user = user
+        self.binary = binary
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self.turns: Dict[str, asyncio.Task] = {}
+        # Asistan adı -> DB kaydının id'si
+        self.assistant_ids: Dict[str, str] = {}
+        # Kullanıcıya ait olduğu doğrulanmış konuşmalar
+        self.conversation_ids: Set[str] = set()
+
+    async def send_json(self, payload: Dict[str, Any]):
+        await self.outbox.put(json.dumps(payload, ensure_ascii=False))
+
+    async def send_token(self, message_id: str, token: str):
+        if self.binary:
+            await self.outbox.put(message_id.encode("utf-8") + b"\x00" + token.encode("utf-8"))
+        else:
+            await self.send_json({"type": "token", "id": message_id, "data": token})
+
+    async def writer(self):
+        """Kuyruktaki frame'leri sırayla gönderir"""
+        while True:
+            frame: Frame = await self.outbox.get()
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+
+    async def get_assistant_id(self, assistant_name: str) -> str:
+        """Asistanın DB id'si; runtime asistan yoksa oluşturulur. Sonuç bağlantıda önbelleklenir."""
+        if assistant_name in self.assistant_ids and assistant_name in assistants:
+            return self.assistant_ids[assistant_name]
+
+        async with async_session() as session:
+            result = await session.execute(select(AssistantModel).where(AssistantModel.name == assistant_name))
+            db_assistant = result.scalar_one_or_none()
+        if not db_assistant:
+            raise LookupError("Assistant not found")
+
+        if assistant_name not in assistants:
+            assistants[assistant_name] = _build_runtime_assistant(
+                db_assistant.name,
+                db_assistant.model_type,
+                db_assistant.model_name,
+                db_assistant.system_message,
+                db_assistant.config
+            )
+        self.assistant_ids[assistant_name] = db_assistant.id
+        return db_assistant.id
+
+    async def start_turn(self, assistant_name: str, conversation_id: Optional[str], message: str) -> str:
+        """Konuşmayı doğrular/oluşturur ve kullanıcı mesajını kaydeder; tek session, tek commit"""
+        assistant_id = await self.get_assistant_id(assistant_name)
+        async with async_session() as session:
+            if conversation_id and conversation_id not in self.conversation_ids:
+                result = await session.execute(
+                    select(Conversation.id).where(
+                        and_(
+                            Conversation.id == conversation_id,
+                            Conversation.user_id == self.user.id
+                        )
+                    )
+                )
+                if result.scalar_one_or_none() is None:
+                    raise LookupError("Conversation not found")
+            elif not conversation_id:
+                conversation_id = str(uuid.uuid4())
+                session.add(Conversation(
+                    id=conversation_id,
+                    name=f"Chat with {assistant_name}",
+                    assistant_id=assistant_id,
+                    session_id=str(uuid.uuid4()),
+                    user_id=self.user.id,
+                    created_at=datetime.utcnow()
+                ))
+
+            session.add(Message(
+                id=str(uuid.uuid4()),
+                conversation_id=conversation_id,
+                role="user",
+                content=message,
+                created_at=datetime.utcnow()
+            ))
+            await session.commit()
+
+        self.conversation_ids.add(conversation_id)
+        return conversation_id
+
+    async def run_turn(self, frame: Dict[str, Any]):
+        message_id = frame["id"]
+        assistant_name = frame.get("assistant")
+        message = frame.get("message")
+        chunks = []
+        conversation_id = None
+        try:
+            if not assistant_name or not message:
+                raise LookupError("assistant and message are required")
+            conversation_id = await self.start_turn(assistant_name, frame.get("conversation_id"), message)
+            await self.send_json({"type": "start", "id": message_id, "conversation_id": conversation_id})
+
+            async for chunk in coalesce_tokens(
+                assistants[assistant_name].process_message(message, stream=True),
+                window_ms=settings.SSE_COALESCE_WINDOW_MS,
+                max_bytes=settings.SSE_COALESCE_MAX_BYTES
+            ):
+                if chunk:
+                    chunks.append(chunk)
+                    await self.send_token(message_id, chunk)
+
+            full_response = "".join(chunks)
+            if full_response:
+                await _persist_assistant_message(conversation_id, full_response)
+            _record_completed_stream(assistant_name, full_response)
+            await self.send_json({"type": "done", "id": message_id})
+
+        except asyncio.CancelledError:
+            # İstemci turu iptal etti ya da bağlantı kapandı
+            _record_cancelled_stream(assistant_name, "".join(chunks))
+            if chunks and conversation_id:
+                _persist_in_background(
+                    conversation_id,
+                    "".join(chunks) + settings.TRUNCATION_MARKER
+                )
+            raise
+
+        except LookupError as e:
+            await self.send_json({"type": "error", "id": message_id, "detail": str(e)})
+
+        except Exception as e:
+            print(f"WebSocket turn error: {str(e)}")
+            if conversation_id:
+                await _persist_assistant_message(conversation_id, f"Error: {str(e)}")
+            await self.send_json({"type": "error", "id": message_id, "detail": str(e)})
+
+        finally:
+            self.turns.pop(message_id, None)
+
+    async def handle(self, frame: Dict[str, Any]):
+        frame_type = frame.get("type")
+        message_id = frame.get("id")
+        if not isinstance(message_id, str) or not message_id or "\x00" in message_id:
+            await self.send_json({"type": "error", "id": message_id, "detail": "A string message id is required"})
+            return
+
+        if frame_type == "cancel":
+            task = self.turns.get(message_id)
+            if task is not None:
+                task.cancel()
+            return
+
+        if frame_type != "chat":
+            await self.send_json({"type": "error", "id": message_id, "detail": f"Unknown frame type: {frame_type}"})
+            return
+        if message_id in self.turns:
+            await self.send_json({"type": "error", "id": message_id, "detail": "Message id already in use"})
+            return
+        if len(self.turns) >= settings.WS_MAX_CONCURRENT_TURNS:
+            await self.send_json({"type": "error", "id": message_id, "detail": "Too many concurrent messages"})
+            return
+
+        self.turns[message_id] = asyncio.create_task(self.run_turn(frame))
+
+    async def close(self):
+        for task in list(self.turns.values()):
+            task.cancel()
+        if self.turns:
+            await asyncio.gather(*self.turns.values(), return_exceptions=True)
+
+
+async def _authenticate(websocket: WebSocket, token: Optional[str]) -> Optional[User]:
+    """Token query parametresinden ya da ilk {"type": "auth"} mesajından okunur"""
+    if not token:
+        try:
+            frame = await asyncio.wait_for(websocket.receive_json(), timeout=settings.WS_AUTH_TIMEOUT)
+        except (asyncio.TimeoutError, ValueError):
+            return None
+        if not isinstance(frame, dict) or frame.get("type") != "auth":
+            return None
+        token = frame.get("token")
+        if not token:
+            return None
+
+    async with async_session() as session:
+        return await get_user_from_token(token, session)
+
+
+@router.websocket("/chat")
+async def chat_socket(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    frame_format: str = Query("json", alias="format")
+):
+    """
+    Kalıcı sohbet bağlantısı: bir kez doğrulanır, aynı bağlantı üzerinden
+    birden çok konuşma mesaj id'leriyle eşzamanlı yürütülür.
+    """
+    await websocket.accept()
+    user = await _authenticate(websocket, token)
+    if user is None:
+        await websocket.close(code=4401, reason="Could not validate credentials")
+        return
+
+    connection = ChatConnection(websocket, user, binary=(frame_format == "binary"))
+    writer = asyncio.create_task(connection.writer())
+    metrics.increment("ws_connections")
+    await connection.send_json({"type": "ready"})
+    try:
+        while True:
+            receive = asyncio.create_task(websocket.receive_json())
+            done, _ = await asyncio.wait({receive, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if writer in done:
+                # Gönderim hatası: bağlantı kopmuş
+                receive.cancel()
+                break
+            try:
+                frame = receive.result()
+            except ValueError:
+                await connection.send_json({"type": "error", "id": None, "detail": "Invalid JSON frame"})
+                continue
+            if isinstance(frame, dict):
+                await connection.handle(frame)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"WebSocket error: {str(e)}")
+    finally:
+        await connection.close()
+        if writer.done() and not writer.cancelled():
+            writer.exception()
+        writer.cancel()
+        metrics.increment("ws_disconnections")
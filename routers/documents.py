@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import uuid
 
 from core.database import get_db, AsyncSessionLocal
 from core.database.models import RAGDocument
 from core.schemas.enums import FileType
 from core.services.file_upload import FileUploadService
+from core.services.chunked_upload import ChunkedUploadService
 from core.services.document_processing import DocumentProcessor
 from api.dependencies import get_current_user
-from api.schemas import RAGDocumentResponse
+from api.schemas import RAGDocumentResponse, ChunkedUploadInit
 from core.database.crud import create_rag_document
 
 router = APIRouter(
@@ -17,6 +18,30 @@ router = APIRouter(
     tags=["documents"]
 )
 
+async def _ingest_upload(upload_data: dict, current_user, db: AsyncSession):
+    """Diske yazılmış yüklemeyi işler ve doküman kaydını oluşturur (tek parça ve parçalı yükleme ortak)"""
+    processor = DocumentProcessor()
+    print("upload_data['temp_path']::", upload_data["temp_path"])
+    # Metin pipeline'da dosyadan sayfa sayfa okunur; yükleme kaydındaki
+    # "content" sadece önizlemedir, tam metin yerine geçmez
+    doc_record = await processor.process_document(
+        upload_data["temp_path"],
+        None,
+        current_user.id,
+        file_checksum=upload_data["checksum"]
+    )
+    print(doc_record)
+
+    document_data = {
+        "title": upload_data["original_name"],
+        "content": upload_data["content"],
+        "file_path": upload_data["temp_path"],
+        "file_type": upload_data["file_type"],
+        "user_id": current_user.id
+    }
+
+    return await create_rag_document(db, document_data)
+
 @router.post("/upload", response_model=RAGDocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
@@ -32,21 +57,7 @@ async def upload_document(
         upload_service = FileUploadService()
         upload_data = await upload_service.save_temp_file(file, current_user)
         print("upload_data::", upload_data)
-        processor = DocumentProcessor()
-        print("upload_data['temp_path']::", upload_data["temp_path"])
-        doc_record = await processor.process_document(upload_data["temp_path"],upload_data["content"], current_user.id)
-        print(doc_record)
-
-        document_data = {
-            "title": upload_data["original_name"],
-            "content": upload_data["content"],
-            "file_path": upload_data["temp_path"],
-            "file_type": upload_data["file_type"],
-            "user_id": current_user.id
-        }
-        
-        new_doc = await create_rag_document(db, document_data)
-        return new_doc
+        return await _ingest_upload(upload_data, current_user, db)
 
     except HTTPException as he:
         raise he
@@ -63,4 +74,70 @@ async def list_user_documents(
         docs = await processor.get_user_documents(current_user.id)
         return docs
     except Exception as e:
-        raise HTTPException(500, f"Dökümanlar getirilemedi: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(500, f"Dökümanlar getirilemedi: {str(e)}") 
+
+# Parçalı (resumable) yükleme:
+#   POST   /documents/uploads                          {"filename", "size", "checksum"?}
+#   PUT    /documents/uploads/{id}/parts?offset=N      gövde: ham parça baytları, X-Content-SHA256 başlığı
+#   GET    /documents/uploads/{id}                     alınan offset'ler (devam etmek için)
+#   POST   /documents/uploads/{id}/complete
+#   DELETE /documents/uploads/{id}
+
+@router.post("/uploads")
+async def init_chunked_upload(
+    upload: ChunkedUploadInit,
+    current_user = Depends(get_current_user)
+):
+    return await ChunkedUploadService().init_upload(
+        current_user.id,
+        upload.filename,
+        upload.size,
+        upload.checksum,
+        upload.content_type
+    )
+
+@router.get("/uploads/{upload_id}")
+async def get_chunked_upload(
+    upload_id: str,
+    current_user = Depends(get_current_user)
+):
+    return await ChunkedUploadService().get_status(upload_id, current_user.id)
+
+@router.put("/uploads/{upload_id}/parts")
+async def upload_part(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    x_content_sha256: Optional[str] = Header(None),
+    current_user = Depends(get_current_user)
+):
+    # Gövde belleğe alınmadan doğrudan diske akıtılır
+    return await ChunkedUploadService().write_part(
+        upload_id,
+        current_user.id,
+        offset,
+        request.stream(),
+        x_content_sha256
+    )
+
+@router.post("/uploads/{upload_id}/complete", response_model=RAGDocumentResponse)
+async def complete_chunked_upload(
+    upload_id: str,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        upload_data = await ChunkedUploadService().complete_upload(upload_id, current_user.id)
+        return await _ingest_upload(upload_data, current_user, db)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(500, f"Dosya işleme hatası: {str(e)}")
+
+@router.delete("/uploads/{upload_id}")
+async def abort_chunked_upload(
+    upload_id: str,
+    current_user = Depends(get_current_user)
+):
+    await ChunkedUploadService().abort_upload(upload_id, current_user.id)
+    return {"status": "aborted"}
@@ -0,0 +1,97 @@
+# Path: chatbot_framework/scripts/benchmark_chunking.py
+"""
+Token chunker benchmark'ı: her örtüşen pencereyi ayrı decode eden eski
+chunk_text ile offset tabanlı iter_token_chunks'ın süre ve tepe bellek
+karşılaştırması.
+
+"streamed" satırı aynı metni 64 KB'lık parçalar halinde (dosyadan okunuyormuş
+gibi) verir; tüm metin hiç tek string olarak tutulmaz.
+
+Kullanım:
+    python scripts/benchmark_chunking.py --size-mb 10 --chunk-size 500 --overlap 50
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Proje kök dizinini Python path'ine ekle
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+import tiktoken
+from core.rag.embedding_service import iter_token_chunks
+
+WORDS = (
+    "belge sözleşme madde müşteri hizmet ödeme süre tarih taraf yükümlülük "
+    "the contract service payment term party obligation notice section clause"
+).split()
+
+
+def generate_text(size_bytes: int, seed: int = 42) -> str:
+    """Cümle ve paragraf yapısı olan sentetik Türkçe/İngilizce metin"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+        if rng.random() < 0.15:
+            sentence += "\n\n"
+        parts.append(sentence)
+        size += len(sentence.encode("utf-8")) + 1
+    return " ".join(parts)
+
+
+def naive_chunk_text(tokenizer, text: str, chunk_size: int, overlap: int):
+    """Eski EmbeddingService.chunk_text"""
+    tokens = tokenizer.encode(text)
+    chunks = []
+    i = 0
+    while i < len(tokens):
+        chunks.append(tokenizer.decode(tokens[i:i + chunk_size]))
+        i += chunk_size - overlap
+    return chunks
+
+
+def measure(name: str, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = sentence_ends = 0
+    for chunk in fn():
+        count += 1
+        sentence_ends += chunk.rstrip().endswith(".")
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<10} time={elapsed:7.2f} s  peak_mem={peak / 1024 / 1024:8.1f} MB  "
+        f"chunks={count:6d}  sentence_end={sentence_ends / max(count, 1):.0%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token chunker benchmark")
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+    text = generate_text(int(args.size_mb * 1024 * 1024))
+    print(f"{len(text.encode('utf-8')) / 1024 / 1024:.1f} MB metin, chunk_size={args.chunk_size}, overlap={args.overlap}\n")
+
+    def pieces():
+        for i in range(0, len(text), 64 * 1024):
+            yield text[i:i + 64 * 1024]
+
+    measure("naive", lambda: naive_chunk_text(tokenizer, text, args.chunk_size, args.overlap))
+    # chunk_text gibi liste döndüren kullanım
+    measure("offsets", lambda: list(iter_token_chunks(tokenizer, [text], args.chunk_size, args.overlap)))
+    # Generator kullanımı: chunk'lar tüketildikçe bırakılır
+    measure("streamed", lambda: iter_token_chunks(tokenizer, pieces(), args.chunk_size, args.overlap))
+
+
+if __name__ == "__main__":
+    main()
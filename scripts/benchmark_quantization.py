@@ -0,0 +1,78 @@
+# Path: chatbot_framework/scripts/benchmark_quantization.py
+"""
+Kuantizasyon katmanları için bellek / recall@10 raporu.
+
+Kullanım:
+    python scripts/benchmark_quantization.py --vectors 20000 --dim 768 --queries 200
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+# Proje kök dizinini Python path'ine ekle
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from core.rag.quantization import QuantizedIndex, QUANTIZATION_TIERS
+
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Gerçek embedding'lere benzer kümelenmiş, normalize vektörler üretir"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int):
+    results = []
+    for query in queries:
+        distances = np.linalg.norm(vectors - query, axis=1)
+        results.append(set(np.argsort(distances)[:k].tolist()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized embedding storage benchmark")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    k = 10
+    corpus = make_corpus(args.vectors + args.queries, args.dim, args.clusters, args.seed)
+    vectors, queries = corpus[:args.vectors], corpus[args.vectors:]
+    truth = exact_top_k(vectors, queries, k)
+    float32_bytes = vectors.astype(np.float32).nbytes
+
+    print(f"{args.vectors} vektör x {args.dim} boyut, {args.queries} sorgu, rescore faktörü {args.rescore_factor}\n")
+    print(f"{'katman':<10}{'bellek (MB)':>14}{'oran':>8}{'recall@10':>12}{'+rescore':>12}{'ms/sorgu':>12}")
+
+    for tier in QUANTIZATION_TIERS:
+        index = QuantizedIndex(tier=tier, rescore_factor=args.rescore_factor).build(vectors)
+
+        recalls = {}
+        started = time.perf_counter()
+        for rescore in (False, True):
+            hits = 0
+            for query, expected in zip(queries, truth):
+                found = {i for i, _ in index.search(query, k=k, rescore=rescore)}
+                hits += len(found & expected)
+            recalls[rescore] = hits / (k * len(queries))
+        elapsed_ms = (time.perf_counter() - started) * 1000 / (2 * len(queries))
+
+        print(
+            f"{tier:<10}{index.code_nbytes / 1024 / 1024:>14.2f}"
+            f"{float32_bytes / max(index.code_nbytes, 1):>7.1f}x"
+            f"{recalls[False]:>12.3f}{recalls[True]:>12.3f}{elapsed_ms:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Path: chatbot_framework/scripts/benchmark_stream_framing.py
+"""
+SSE framing benchmark'ı: token başına frame (eski yöntem) ile zaman/boyut
+penceresinde birleştirilmiş frame'lerin CPU ve yazma sayısı karşılaştırması.
+
+Frame'ler gerçek bir socket çiftine yazılır; "sends" sütunu yapılan
+socket.send çağrısı (syscall) sayısıdır, karşı uç ayrı bir thread'de okunur.
+
+Kullanım:
+    python scripts/benchmark_stream_framing.py --tokens 2000 --responses 20 --token-interval-ms 2
+"""
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Proje kök dizinini Python path'ine ekle
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from core.services.streaming import coalesce_tokens, format_sse
+
+
+async def fake_model(tokens: int, interval: float):
+    """LLM benzeri küçük token akışı; bazı token'lar satır sonu içerir"""
+    for i in range(tokens):
+        if interval:
+            await asyncio.sleep(interval)
+        yield "\n" if i % 50 == 49 else f" tok{i % 100}"
+
+
+class SocketSink:
+    """Frame'leri bir socket'e yazar ve send çağrılarını sayar"""
+
+    def __init__(self):
+        self.sender, self.receiver = socket.socketpair()
+        self.sends = 0
+        self._drain = threading.Thread(target=self._read, daemon=True)
+        self._drain.start()
+
+    def _read(self):
+        while self.receiver.recv(65536):
+            pass
+
+    def write(self, frame: str):
+        self.sender.sendall(frame.encode("utf-8"))
+        self.sends += 1
+
+    def close(self):
+        self.sender.close()
+        self._drain.join()
+        self.receiver.close()
+
+
+async def naive(sink: SocketSink, tokens: int, interval: float):
+    """Eski chat_stream: her token ayrı frame, yanıt += ile biriktirilir"""
+    full_response = ""
+    async for chunk in fake_model(tokens, interval):
+        full_response += chunk
+        sink.write(f"data: {chunk}\n\n")
+    return len(full_response)
+
+
+async def coalesced(sink: SocketSink, tokens: int, interval: float, window_ms: float, max_bytes: int):
+    """Yeni chat_stream: birleştirilmiş frame'ler, parçalar listede toplanıp bir kez join edilir"""
+    chunks = []
+    async for chunk in coalesce_tokens(fake_model(tokens, interval), window_ms, max_bytes):
+        chunks.append(chunk)
+        sink.write(format_sse(chunk))
+    return len("".join(chunks))
+
+
+async def measure(name: str, factory, responses: int, tokens: int):
+    sink = SocketSink()
+    # process_time okuma thread'ini de sayar; her iki yöntem için aynı ek yük
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(responses):
+        await factory(sink)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    sink.close()
+    print(
+        f"{name:<12} cpu/response={cpu / responses * 1000:8.2f} ms  "
+        f"wall/response={wall / responses * 1000:8.1f} ms  "
+        f"sends/response={sink.sends / responses:8.1f}  "
+        f"sends/token={sink.sends / (responses * tokens):.3f}"
+    )
+
+
+async def run(args):
+    interval = args.token_interval_ms / 1000
+    print(f"{args.responses} yanıt x {args.tokens} token, token aralığı {args.token_interval_ms} ms\n")
+    await measure("naive", lambda sink: naive(sink, args.tokens, interval), args.responses, args.tokens)
+    await measure(
+        "coalesced",
+        lambda sink: coalesced(sink, args.tokens, interval, args.window_ms, args.max_bytes),
+        args.responses,
+        args.tokens
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE token coalescing benchmark")
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--responses", type=int, default=20)
+    parser.add_argument("--token-interval-ms", type=float, default=2)
+    parser.add_argument("--window-ms", type=float, default=30)
+    parser.add_argument("--max-bytes", type=int, default=1024)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Path: chatbot_framework/scripts/run_batch.py
+"""
+JSONL prompt dosyasını bir asistan üzerinden toplu çalıştırır.
+
+Her satır {"id": ..., "message": ...} biçimindedir ("prompt" veya "body"
+alanları da okunur). Sonuçlar output.jsonl'e anında eklenir; yarıda kesilen
+iş --resume ile kaldığı yerden devam eder.
+
+Kullanım:
+    python scripts/run_batch.py --assistant my-assistant --input prompts.jsonl --concurrency 8
+    python scripts/run_batch.py --resume <job_id> [--retry-failed]
+"""
+import argparse
+import asyncio
+import shutil
+import sys
+from pathlib import Path
+
+# Proje kök dizinini Python path'ine ekle
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from config.settings import settings
+from core.services.batch_runner import BatchJob, load_assistant, run_batch
+
+
+async def run(args):
+    if args.resume:
+        job = BatchJob.load(args.resume, jobs_dir=args.jobs_dir)
+        job.retry_failed = args.retry_failed
+        if args.concurrency:
+            job.concurrency = args.concurrency
+    else:
+        if not args.assistant or not args.input:
+            raise SystemExit("--assistant and --input are required for a new job")
+        job = BatchJob.create(
+            args.assistant,
+            jobs_dir=args.jobs_dir,
+            concurrency=args.concurrency or settings.BATCH_DEFAULT_CONCURRENCY,
+            prompt_field=args.prompt_field
+        )
+        shutil.copyfile(args.input, job.input_path)
+
+    print(f"Job {job.job_id} -> {job.output_path}")
+    assistant = await load_assistant(job.assistant_name)
+    job = await run_batch(job, assistant)
+    print(f"Status: {job.status} {job.counts}")
+    if job.error:
+        print(f"Error: {job.error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch inference runner")
+    parser.add_argument("--assistant", help="Asistan adı (DB kaydı)")
+    parser.add_argument("--input", help="JSONL prompt dosyası")
+    parser.add_argument("--prompt-field", default="message")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--jobs-dir", default=settings.BATCH_JOBS_DIR)
+    parser.add_argument("--resume", metavar="JOB_ID", help="Yarıda kalan işi devam ettir")
+    parser.add_argument("--retry-failed", action="store_true", help="Resume'da hatalı öğeleri tekrar dene")
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("Interrupted; resume with --resume <job_id>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Path: chatbot_framework/scripts/sync_directory.py
+"""
+Bir dizini kullanıcının RAG dokümanlarıyla artımlı olarak senkronize eder.
+
+Sadece yeni ya da değişen dosyalar işlenir (manifest: yol, mtime, boyut,
+sha256); silinen dosyaların chunk'ları tombstone'lanır. Yarıda kesilen
+senkronizasyon aynı komutla tekrar çalıştırıldığında kaldığı yerden devam
+eder.
+
+Kullanım:
+    python scripts/sync_directory.py --root /data/docs --user-id <user_id>
+    python scripts/sync_directory.py --root /data/docs --user-id <user_id> --ext .pdf --ext .docx
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Proje kök dizinini Python path'ine ekle
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from config.settings import settings
+from core.services.directory_sync import DirectorySync
+
+
+class ProgressPrinter:
+    """İlerlemeyi en fazla saniyede bir, tek satırda yazar"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, progress):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        print(
+            f"\rscanned={progress['scanned']} unchanged={progress['unchanged']} "
+            f"ingested={progress['ingested']}/{progress['changed']} failed={progress['failed']} "
+            f"chunks={progress['chunks']} {progress['bytes'] / 1024 / 1024:.1f} MB",
+            end="", flush=True
+        )
+
+
+async def run(args):
+    sync = DirectorySync(
+        args.root,
+        args.user_id,
+        extensions=args.ext,
+        ignored_dirs=args.ignore_dir,
+        ignored_files=args.ignore_file,
+        state_dir=args.state_dir,
+        on_progress=ProgressPrinter()
+    )
+    print(f"Sync {sync.sync_id} -> {sync.manifest_path}")
+    result = await sync.run()
+    print()
+    for key in ("scanned", "unchanged", "ingested", "failed", "deleted", "chunks", "duplicates", "tombstoned_chunks", "reingested"):
+        print(f"{key:<18} {result[key]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental directory sync into the RAG document store")
+    parser.add_argument("--root", required=True, help="Senkronize edilecek dizin")
+    parser.add_argument("--user-id", required=True, help="Chunk'ların sahibi olan kullanıcı")
+    parser.add_argument("--ext", action="append", default=None, help="Dosya uzantısı (tekrarlanabilir)")
+    parser.add_argument("--ignore-dir", action="append", default=None, help="Atlanacak dizin adı (tekrarlanabilir)")
+    parser.add_argument("--ignore-file", action="append", default=None, help="Atlanacak dosya adı (tekrarlanabilir)")
+    parser.add_argument("--state-dir", default=settings.DIRECTORY_SYNC_STATE_DIR)
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# Path: chatbot_framework/test_text_decoding.py
+import pytest
+from core.services.text_decoding import TextDecodingService
+
+TURKISH = "Ağaçların gölgesinde ışığı gördük; şu güzel öğleden sonra İstanbul'da."
+
+
+@pytest.mark.parametrize("guess", ["ISO-8859-1", "MacRoman", "ISO-8859-15", "windows-1252"])
+def test_latin1_family_guess_falls_back_to_turkish(monkeypatch, guess):
+    # Dedektörün Batı Avrupa tahmini her baytı çözse de kabul edilmemeli
+    monkeypatch.setattr(TextDecodingService, "_detect", lambda self, sample: guess)
+    service = TextDecodingService(fallbacks=["cp1254", "iso-8859-9"])
+    data = TURKISH.encode("cp1254")
+
+    assert service.detect_encoding(data) == "cp1254"
+    assert service.decode(data) == (TURKISH, "cp1254")
+
+
+def test_non_latin1_guess_is_used(monkeypatch):
+    monkeypatch.setattr(TextDecodingService, "_detect", lambda self, sample: "ISO-8859-9")
+    service = TextDecodingService(fallbacks=["cp1254"])
+
+    assert service.detect_encoding(TURKISH.encode("iso-8859-9")) == "iso8859-9"